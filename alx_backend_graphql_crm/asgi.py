@@ -13,4 +13,9 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'alx_backend_graphql_crm.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# GraphQL subscriptions are served over WebSockets next to the Django app.
+from crm.subscriptions import websocket_router  # noqa: E402
+
+application = websocket_router(django_application)
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -87,9 +88,33 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Closed after each request by default: under ASGI (/graphql/async,
+        # subscriptions) every request may run on a new thread, so kept
+        # connections would pile up. WSGI deployments can opt in to reuse
+        # (e.g. CRM_DB_CONN_MAX_AGE=60), checked before reuse.
+        'CONN_MAX_AGE': int(os.environ.get('CRM_DB_CONN_MAX_AGE', 0)),
+        'CONN_HEALTH_CHECKS': True,
     }
 }
 
+# Optional read connection: GraphQL queries read from it, mutations and
+# writes use "default" (crm.database.ReadReplicaRouter). On SQLite it is
+# the same file opened read-only, served concurrently by WAL.
+if os.environ.get('CRM_DB_READ_REPLICA'):
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'NAME': f"file:{BASE_DIR / 'db.sqlite3'}?mode=ro",
+        'OPTIONS': {'uri': True},
+        'TEST': {'MIRROR': 'default'},
+    }
+    CRM_DB_READ_ALIAS = 'replica'
+    DATABASE_ROUTERS = ['crm.database.ReadReplicaRouter']
+
+# SQLite pragmas run on every new connection, over the defaults in
+# crm.database.DEFAULT_SQLITE_PRAGMAS (WAL, synchronous=NORMAL, mmap,
+# cache and busy timeout); None disables one.
+CRM_SQLITE_PRAGMAS = {}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -133,12 +158,17 @@ STATIC_URL = 'static/'
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 GRAPHENE = {
-    "SCHEMA": "alx_backend_graphql_crm.schema.schema"
+    "SCHEMA": "alx_backend_graphql_crm.schema.schema",
+    "MIDDLEWARE": ["crm.instrumentation.ResolverTimingMiddleware"],
+    # WebSocket path of the subscriptions, served by the ASGI application.
+    "SUBSCRIPTION_PATH": "/graphql",
 }
 
 # Celery settings
-CELERY_BROKER_URL = 'redis://localhost:6379/0'
-CELERY_RESULT_BACKEND = 'redis://localhost:6379/0'
+CELERY_BROKER_URL = os.environ.get('CELERY_BROKER_URL', 'redis://localhost:6379/0')
+CELERY_RESULT_BACKEND = os.environ.get('CELERY_RESULT_BACKEND', 'redis://localhost:6379/0')
+# Local testing: CELERY_TASK_ALWAYS_EAGER=1, or memory:// with cache+memory://
+CELERY_TASK_ALWAYS_EAGER = os.environ.get('CELERY_TASK_ALWAYS_EAGER') == '1'
 CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
@@ -151,5 +181,68 @@ CELERY_BEAT_SCHEDULE = {
         'task': 'crm.tasks.generate_crm_report',
         'schedule': crontab(day_of_week='mon', hour=6, minute=0),
     },
+    # Yesterday only: record_orders keeps the rollup current, the nightly
+    # rebuild just corrects the last complete day.
+    'rebuild-revenue-rollup': {
+        'task': 'crm.tasks.rebuild_revenue_rollup',
+        'schedule': crontab(hour=3, minute=0),
+        'kwargs': {'days': 1},
+    },
+    'send-order-reminders': {
+        'task': 'crm.tasks.send_order_reminders',
+        'schedule': crontab(hour=8, minute=0),
+    },
 }
 
+
+# CRM bulk operations
+CRM_BULK_CHUNK_SIZE = 500
+
+# GraphQL persisted queries: optional JSON list (or hash -> query map) of
+# operations shipped with the deployment, and the parsed-document LRU size.
+CRM_PERSISTED_QUERIES_FILE = None
+CRM_DOCUMENT_CACHE_SIZE = 256
+
+# GraphQL response cache for allCustomers/allProducts/allOrders, in seconds
+# per model; responses expire after the shortest TTL of the models they read.
+CRM_RESPONSE_CACHE_ALIAS = "default"
+CRM_RESPONSE_CACHE_TTLS = {
+    "crm.customer": 300,
+    "crm.product": 60,
+    "crm.order": 30,
+}
+
+# Page size of nested connections (customer orders, order products, ...)
+# queried without first/last.
+CRM_NESTED_PAGE_SIZE = 20
+
+# GraphQL query cost limits: depth in fields, cost in resolved objects
+# (page sizes multiply), weights keyed "Type.field", and a per-client budget
+# of CRM_QUERY_COST_BUDGET cost units every CRM_QUERY_COST_WINDOW seconds.
+# The heaviest shipped query, 100 orders with their customer and products,
+# costs 2200.
+CRM_QUERY_MAX_DEPTH = 12
+CRM_QUERY_MAX_COST = 5000
+CRM_QUERY_FIELD_WEIGHTS = {
+    "Query.crmStats": 50,
+    "Mutation.bulkCreateCustomers": 100,
+    "Mutation.bulkCreateOrders": 100,
+}
+CRM_QUERY_COST_BUDGET = 50000
+CRM_QUERY_COST_WINDOW = 60
+
+# Addresses allowed to read /metrics besides staff users (always in DEBUG)
+CRM_METRICS_ALLOWED_IPS = ["127.0.0.1"]
+
+# Operation names with their own /metrics series, besides those of the
+# persisted queries; any other operationName is counted as "other".
+CRM_METRICS_OPERATIONS = []
+
+# Backend behind the `search` argument and the *_icontains filters: FTS5 on
+# SQLite when unset, or e.g. "crm.search.TrigramSearchBackend" elsewhere.
+# Run `manage.py rebuild_search_index` after switching.
+CRM_SEARCH_BACKEND = None
+
+# Pub/sub feeding the GraphQL subscriptions: in-process when unset, or
+# "crm.pubsub.ChannelLayerPubSub" to fan out across processes.
+CRM_PUBSUB_BACKEND = None
@@ -16,11 +16,15 @@ Including another URLconf
 """
 from django.contrib import admin
 from django.urls import path
-from graphene_django.views import GraphQLView
 from django.views.decorators.csrf import csrf_exempt
+from crm.instrumentation import metrics_view
+from crm.views import AsyncCRMGraphQLView, CRMGraphQLView, bulk_import
 
 urlpatterns = [
     path('admin/', admin.site.urls),
-    path("graphql", csrf_exempt(GraphQLView.as_view(graphiql=True))),
+    path("graphql", csrf_exempt(CRMGraphQLView.as_view(graphiql=True))),
+    path("graphql/async", csrf_exempt(AsyncCRMGraphQLView.as_view(graphiql=True)), name="graphql-async"),
+    path("metrics", metrics_view, name="metrics"),
+    path("import/<str:kind>", csrf_exempt(bulk_import), name="bulk-import"),
 ]
 
@@ -0,0 +1,79 @@
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from inspect import isawaitable
+
+from asgiref.sync import sync_to_async
+from django.db import connection
+from graphql import get_named_type, is_leaf_type
+
+ASYNC_FLAG = "crm_async"
+
+# The wrapper installed by the innermost execute_wrapper() of the running
+# task; sync_to_async carries it to the database thread.
+_current_wrapper = ContextVar("crm_execute_wrapper", default=None)
+
+
+def is_async(info):
+    """True while ``info`` belongs to an operation executed by the async view."""
+    return getattr(info.context, ASYNC_FLAG, False)
+
+
+def async_capable(resolver):
+    """
+    Mark a resolver that returns an awaitable when :func:`is_async`, so
+    :class:`SyncResolverMiddleware` calls it on the event loop.
+    """
+    setattr(resolver, ASYNC_FLAG, True)
+    return resolver
+
+
+class SyncResolverMiddleware:
+    """
+    Run the synchronous resolvers of an async operation off the event loop.
+
+    Object-valued fields that are not :func:`async_capable` may query the
+    database (DataLoaders, nested connections, stats), so they run through
+    ``sync_to_async`` on the request's database thread while sibling fields
+    keep resolving. Scalars and connection plumbing read loaded attributes
+    and are called directly. Must be the last middleware.
+    """
+
+    def resolve(self, next, root, info, **args):
+        if not is_async(info) or (root is not None and (
+            is_leaf_type(get_named_type(info.return_type))
+            or info.parent_type.name.endswith(("Connection", "Edge"))
+        )):
+            return next(root, info, **args)
+        if getattr(info.parent_type.fields[info.field_name].resolve, ASYNC_FLAG, False):
+            return next(root, info, **args)
+        return self._resolve_sync(next, root, info, args)
+
+    async def _resolve_sync(self, next, root, info, args):
+        result = await sync_to_async(next)(root, info, **args)
+        if isawaitable(result):
+            result = await result
+        return result
+
+
+@asynccontextmanager
+async def execute_wrapper(wrapper):
+    """
+    ``connection.execute_wrapper()`` for the connection that ``sync_to_async``
+    and the async ORM use, which lives on the request's database thread.
+
+    That connection is shared by the tasks of a request (batch entries run
+    concurrently), so ``wrapper`` only sees the statements of the task that
+    installed it.
+    """
+    def scoped(execute, sql, params, many, context):
+        if _current_wrapper.get() is wrapper:
+            return wrapper(execute, sql, params, many, context)
+        return execute(sql, params, many, context)
+
+    token = _current_wrapper.set(wrapper)
+    await sync_to_async(lambda: connection.execute_wrappers.append(scoped))()
+    try:
+        yield
+    finally:
+        await sync_to_async(lambda: connection.execute_wrappers.remove(scoped))()
+        _current_wrapper.reset(token)
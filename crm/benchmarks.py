@@ -0,0 +1,389 @@
+import json
+import random
+import sqlite3
+import threading
+import time
+import tracemalloc
+from dataclasses import dataclass, field
+from decimal import Decimal
+from types import SimpleNamespace
+
+from django.db import connection, transaction
+from django.utils import timezone
+from graphene.utils.str_converters import to_camel_case
+
+from . import seeding
+from .filters import CustomerFilter, OrderFilter, ProductFilter
+from .instrumentation import OperationTrace
+from .models import Customer, Order, OrderItem, Product
+
+# ----------------------------
+# Synthetic dataset
+# ----------------------------
+def generate_dataset(customers, products, orders, items_per_order=3, days=365,
+                     batch_size=5000, seed=0, log=None):
+    """
+    Append a reproducible synthetic dataset with the ``crm.seeding`` loader.
+
+    Ids are assigned after the current maximum and each batch of
+    ``batch_size`` rows commits on its own; orders draw from the existing
+    customers and products when none are added. Returns the id ranges
+    written per model.
+    """
+    log = log or (lambda message: None)
+    plan, _ = seeding.seed(
+        seeding.SeedPlan(
+            customers=customers,
+            products=products,
+            orders=orders,
+            items_per_order=items_per_order,
+            days=days,
+            seed=seed,
+            chunk_size=batch_size,
+        ),
+        pragmas=False,
+        log=lambda kind, done, total: log(f"{kind}: {done}/{total}"),
+    )
+    return plan.ranges()
+
+
+# ----------------------------
+# Operation catalog
+# ----------------------------
+@dataclass
+class Operation:
+    name: str
+    query: str
+    variables: dict = field(default_factory=dict)
+    # Called once before timing, returns extra variables (e.g. a deep cursor).
+    setup: object = None
+    # Mutations run in a transaction that is rolled back after every run.
+    rollback: bool = False
+
+
+CONNECTIONS = (
+    ("allCustomers", CustomerFilter),
+    ("allProducts", ProductFilter),
+    ("allOrders", OrderFilter),
+)
+
+SAMPLE_VALUES = {
+    "CharFilter": "ali",
+    "TrigramFilter": "ali",
+    "NumberFilter": 100,
+    "DateTimeFilter": "2000-01-01T00:00:00+00:00",
+}
+SAMPLE_OVERRIDES = {"phone_pattern": "+15", "product_id": 1}
+
+
+def _filter_operations(schema, page_size):
+    query_type = schema.graphql_schema.query_type
+    for root, filterset in CONNECTIONS:
+        for name, filter_ in filterset.base_filters.items():
+            kind = type(filter_).__name__
+            argument = to_camel_case(name)
+            argument_type = query_type.fields[root].args[argument].type
+            yield Operation(
+                f"{root}.{argument}",
+                f"query($v: {argument_type}, $n: Int) {{ {root}({argument}: $v, first: $n) "
+                f"{{ edges {{ node {{ id }} }} }} }}",
+                {"v": SAMPLE_OVERRIDES.get(name, SAMPLE_VALUES[kind]), "n": page_size},
+            )
+
+
+def _deep_cursor(root, pages, page_size):
+    """Return a setup hook walking ``pages`` pages into ``root`` for its cursor."""
+    query = f"query($n: Int, $a: String) {{ {root}(first: $n, after: $a) {{ pageInfo {{ endCursor }} }} }}"
+
+    def setup(execute):
+        after = None
+        for _ in range(pages):
+            result = execute(query, {"n": page_size, "a": after})
+            after = result.data[root]["pageInfo"]["endCursor"] or after
+        return {"a": after}
+    return setup
+
+
+def _order_variables(execute):
+    customer = Customer.objects.order_by("pk").values_list("pk", flat=True).first()
+    products = list(Product.objects.order_by("pk").values_list("pk", flat=True)[:3])
+    return {"c": customer, "p": products}
+
+
+def _bulk_order_variables(execute, orders=50):
+    variables = _order_variables(execute)
+    return {"i": [{"customerId": variables["c"], "productIds": variables["p"]}] * orders}
+
+
+def build_catalog(schema, page_size=20, deep_pages=50):
+    """Every filter, deep cursor/offset pagination, search, analytics and every mutation."""
+    node = "edges { node { id } }"
+    nested = "edges { node { id totalAmount customer { name } products { edges { node { name } } } } }"
+    catalog = list(_filter_operations(schema, page_size))
+    catalog += [
+        Operation("allOrders.nested", f"query($n: Int) {{ allOrders(first: $n) {{ totalCount {nested} }} }}",
+                  {"n": page_size}),
+        Operation("allCustomers.nestedOrders",
+                  f"query($n: Int) {{ allCustomers(first: $n) {{ edges {{ node {{ name orders(first: 5) "
+                  f"{{ {node} }} }} }} }} }}", {"n": page_size}),
+        Operation("allOrders.deepCursor", f"query($n: Int, $a: String) {{ allOrders(first: $n, after: $a) {{ {node} }} }}",
+                  {"n": page_size}, setup=_deep_cursor("allOrders", deep_pages, page_size)),
+        Operation("allOrders.deepOffset", f"query($n: Int, $o: Int) {{ allOrders(first: $n, offset: $o) {{ {node} }} }}",
+                  {"n": page_size, "o": deep_pages * page_size}),
+        Operation("allCustomers.orderByName", f"query($n: Int) {{ allCustomers(first: $n, orderBy: \"name\") {{ {node} }} }}",
+                  {"n": page_size}),
+        Operation("allCustomers.search", f"query($n: Int) {{ allCustomers(first: $n, search: \"ali smi\") {{ {node} }} }}",
+                  {"n": page_size}),
+        Operation("allOrders.search", f"query($n: Int) {{ allOrders(first: $n, search: \"laptop\") {{ {node} }} }}",
+                  {"n": page_size}),
+        Operation("crmStats", "{ crmStats(period: MONTH, topProducts: 10) { customerCount orderCount revenue "
+                              "revenueByPeriod { periodStart revenue } revenueByProduct { productId revenue } } }"),
+    ]
+
+    catalog += [
+        Operation("createCustomer",
+                  'mutation { createCustomer(input: {name: "Bench", email: "bench-new@example.com", '
+                  'phone: "+1234567890"}) { customer { id } message } }', rollback=True),
+        Operation("bulkCreateCustomers",
+                  "mutation($i: [CustomerInput]!) { bulkCreateCustomers(input: $i) { customers { id } errors } }",
+                  {"i": [{"name": f"Bench {i}", "email": f"bench-bulk-{i}@example.com"} for i in range(100)]},
+                  rollback=True),
+        Operation("createProduct",
+                  'mutation { createProduct(input: {name: "Bench", price: 9.99, stock: 5}) { product { id } } }',
+                  rollback=True),
+        Operation("createOrder",
+                  "mutation($c: ID!, $p: [ID]!) { createOrder(input: {customerId: $c, productIds: $p}) "
+                  "{ order { id } message } }", setup=_order_variables, rollback=True),
+        Operation("bulkCreateOrders",
+                  "mutation($i: [OrderInput]!) { bulkCreateOrders(input: $i) { orders { id } errors } }",
+                  setup=_bulk_order_variables, rollback=True),
+        Operation("updateLowStockProducts",
+                  "mutation { updateLowStockProducts { updatedProducts { id stock } message } }", rollback=True),
+    ]
+    return catalog
+
+
+# ----------------------------
+# Runner
+# ----------------------------
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered) + 0.5) - 1))]
+
+
+def run_catalog(schema, catalog, iterations=20, warmup=2, only=None, log=None):
+    """
+    Time every operation and return ``{name: stats}``.
+
+    Stats hold p50/p95/p99/mean latency in ms, SQL statements per run and
+    the peak ``tracemalloc`` allocation of one extra, untimed run in KiB.
+    """
+    log = log or (lambda message: None)
+
+    def execute(query, variables):
+        result = schema.execute(query, variable_values=variables, context_value=SimpleNamespace())
+        if result.errors:
+            raise result.errors[0]
+        return result
+
+    def run_once(operation, variables):
+        trace = OperationTrace(operation.name)
+        with transaction.atomic(), connection.execute_wrapper(trace):
+            start = time.perf_counter()
+            execute(operation.query, variables)
+            elapsed = time.perf_counter() - start
+            if operation.rollback:
+                transaction.set_rollback(True)
+        return elapsed, trace.sql_count
+
+    results = {}
+    for operation in catalog:
+        if only and not any(pattern in operation.name for pattern in only):
+            continue
+        variables = dict(operation.variables)
+        if operation.setup is not None:
+            variables.update(operation.setup(execute))
+        for _ in range(warmup):
+            run_once(operation, variables)
+        timings, statements = [], []
+        for _ in range(iterations):
+            elapsed, sql_count = run_once(operation, variables)
+            timings.append(elapsed * 1000)
+            statements.append(sql_count)
+
+        tracemalloc.start()
+        try:
+            run_once(operation, variables)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+        results[operation.name] = {
+            "p50_ms": round(percentile(timings, 50), 3),
+            "p95_ms": round(percentile(timings, 95), 3),
+            "p99_ms": round(percentile(timings, 99), 3),
+            "mean_ms": round(sum(timings) / len(timings), 3),
+            "sql": max(statements),
+            "peak_kib": round(peak / 1024, 1),
+        }
+        log(operation.name, results[operation.name])
+    return results
+
+
+def compare(results, baseline, tolerance=0.25):
+    """
+    Return regression messages of ``results`` against a ``baseline``.
+
+    Latency regresses when p95 exceeds the baseline by more than
+    ``tolerance``; SQL statement counts regress on any increase.
+    """
+    regressions = []
+    for name, stats in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        if stats["sql"] > base["sql"]:
+            regressions.append(f"{name}: {stats['sql']} SQL statements (baseline {base['sql']})")
+        if stats["p95_ms"] > base["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {stats['p95_ms']}ms (baseline {base['p95_ms']}ms)")
+    return regressions
+
+
+def load_baseline(path):
+    with open(path) as f:
+        return json.load(f)["operations"]
+
+
+def save_baseline(path, results, dataset):
+    with open(path, "w") as f:
+        json.dump({"dataset": dataset, "operations": results}, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+# ----------------------------
+# Database concurrency
+# ----------------------------
+# The connection setups compared by run_db_workload: Django's defaults
+# before tuning (rollback journal, a new connection per request) and the
+# crm.database pragmas over persistent connections, as a WSGI deployment
+# gets with CRM_DB_CONN_MAX_AGE set.
+BASELINE_PRAGMAS = {"journal_mode": "DELETE", "synchronous": "FULL", "busy_timeout": 5000}
+
+
+def copy_database(path):
+    """Copy the default SQLite database to ``path`` with the backup API."""
+    connection.ensure_connection()
+    target = sqlite3.connect(path)
+    try:
+        connection.connection.backup(target)
+    finally:
+        target.close()
+
+
+def _workload_sql():
+    qn = connection.ops.quote_name
+    order, customer, product, item = (
+        model._meta for model in (Order, Customer, Product, OrderItem)
+    )
+    read = (
+        f"SELECT o.{qn('id')}, o.{qn('total_amount')}, c.{qn('name')} "
+        f"FROM {qn(order.db_table)} o JOIN {qn(customer.db_table)} c ON c.{qn('id')} = o.{qn('customer_id')} "
+        f"WHERE o.{qn('id')} > ? ORDER BY o.{qn('id')} LIMIT 20"
+    )
+    writes = (
+        f"INSERT INTO {qn(order.db_table)} ({qn('customer_id')}, {qn('total_amount')}, {qn('order_date')}) "
+        f"VALUES (?, ?, ?)",
+        f"INSERT INTO {qn(item.db_table)} ({qn('order_id')}, {qn('product_id')}, {qn('quantity')}, "
+        f"{qn('unit_price')}) VALUES (?, ?, 1, ?)",
+        f"UPDATE {qn(product.db_table)} SET {qn('stock')} = {qn('stock')} + 1 WHERE {qn('id')} = ?",
+    )
+    return read, writes
+
+
+def run_db_workload(path, pragmas, persistent, readers=4, writers=2, duration=5.0, seed=0):
+    """
+    Hammer the SQLite file at ``path`` from ``readers`` threads paging
+    orders and ``writers`` threads creating orders and touching stock, for
+    ``duration`` seconds. Returns per-kind throughput, latency percentiles
+    and the operations that failed with ``database is locked``.
+    """
+    from .database import apply_pragmas
+
+    read_sql, write_sql = _workload_sql()
+    setup = sqlite3.connect(path, isolation_level=None)
+    try:
+        apply_pragmas(setup, pragmas)
+        max_order, max_customer, max_product = setup.execute(
+            f"SELECT (SELECT MAX(id) FROM {Order._meta.db_table}), "
+            f"(SELECT MAX(id) FROM {Customer._meta.db_table}), "
+            f"(SELECT MAX(id) FROM {Product._meta.db_table})"
+        ).fetchone()
+    finally:
+        setup.close()
+
+    def connect():
+        conn = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        apply_pragmas(conn, {name: value for name, value in pragmas.items() if name != "journal_mode"})
+        return conn
+
+    def read(conn, rng):
+        conn.execute(read_sql, (rng.randrange(max_order or 1),)).fetchall()
+
+    def write(conn, rng):
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            price = str(Decimal(rng.randrange(100, 100000)) / 100)
+            order_id = conn.execute(write_sql[0], (
+                rng.randint(1, max_customer), price, timezone.now().replace(tzinfo=None).isoformat(sep=" "),
+            )).lastrowid
+            product_id = rng.randint(1, max_product)
+            conn.execute(write_sql[1], (order_id, product_id, price))
+            conn.execute(write_sql[2], (product_id,))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    results = {"read": {"latencies": [], "locked": 0}, "write": {"latencies": [], "locked": 0}}
+    deadline = time.perf_counter() + duration
+
+    def worker(kind, op, index):
+        rng = random.Random(f"{seed}:{kind}:{index}")
+        stats = results[kind]
+        conn = connect() if persistent else None
+        try:
+            while time.perf_counter() < deadline:
+                start = time.perf_counter()
+                current = conn or connect()
+                try:
+                    op(current, rng)
+                except sqlite3.OperationalError as e:
+                    if "locked" not in str(e) and "busy" not in str(e):
+                        raise
+                    stats["locked"] += 1
+                else:
+                    stats["latencies"].append(time.perf_counter() - start)
+                finally:
+                    if conn is None:
+                        current.close()
+        finally:
+            if conn is not None:
+                conn.close()
+
+    threads = [threading.Thread(target=worker, args=("read", read, i)) for i in range(readers)]
+    threads += [threading.Thread(target=worker, args=("write", write, i)) for i in range(writers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    summary = {}
+    for kind, stats in results.items():
+        latencies = stats["latencies"]
+        summary[kind] = {
+            "ops_per_s": round(len(latencies) / duration, 1),
+            "p50_ms": round(percentile(latencies, 50) * 1000, 3) if latencies else None,
+            "p95_ms": round(percentile(latencies, 95) * 1000, 3) if latencies else None,
+            "locked": stats["locked"],
+        }
+    return summary
@@ -0,0 +1,313 @@
+from itertools import islice
+
+from django.conf import settings
+from django.db import connections, router, transaction
+from django.db.models import Case, F, Q, When
+from django.db.models.sql import UpdateQuery
+
+from .cache import invalidate
+from .models import Customer, Order, OrderItem, Product
+from .pubsub import publish_orders_created, publish_stock_changes
+from .rollups import record_orders
+from .search import get_backend
+from .validators import validate_phone, validate_product
+
+DEFAULT_CHUNK_SIZE = 500
+
+
+def get_chunk_size(chunk_size=None):
+    """Resolve the batch size from the argument or ``CRM_BULK_CHUNK_SIZE``."""
+    chunk_size = chunk_size or getattr(settings, "CRM_BULK_CHUNK_SIZE", DEFAULT_CHUNK_SIZE)
+    if chunk_size < 1:
+        raise ValueError("Chunk size must be positive")
+    return chunk_size
+
+
+def pk_keys(values):
+    """Return the string form of ``values`` that can be primary keys, dropping the rest."""
+    return {str(pk) for pk in values if str(pk).isdigit()}
+
+
+def chunked(iterable, size):
+    """Yield lists of at most ``size`` items without materializing the input."""
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+# ----------------------------
+# Chunk writers
+# ----------------------------
+# Each writer takes a list of ``(row number, row mapping)`` pairs and returns
+# the created instances plus ``(row number, message)`` errors. Earlier chunks
+# must already be written, so the lookups see them.
+
+def create_customers(chunk):
+    """Validate and insert customers with one ``email__in`` lookup."""
+    emails = [row.get("email") for _, row in chunk if row.get("email")]
+    existing = set(Customer.objects.filter(email__in=emails).values_list("email", flat=True))
+    customers, errors = [], []
+    for idx, row in chunk:
+        name, email, phone = row.get("name"), row.get("email"), row.get("phone")
+        if not name or not email:
+            errors.append((idx, "Name and email required"))
+            continue
+        if email in existing:
+            errors.append((idx, "Email already exists"))
+            continue
+        if phone and not validate_phone(phone):
+            errors.append((idx, "Invalid phone format"))
+            continue
+        existing.add(email)
+        customers.append(Customer(name=name, email=email, phone=phone or ""))
+    created = Customer.objects.bulk_create(customers)
+    # bulk_create skips post_save, so the search index is updated here.
+    get_backend().index(Customer, created)
+    if created:
+        invalidate(Customer)
+    return created, errors
+
+
+def create_products(chunk):
+    """Validate and insert products with the ``CreateProduct`` rules."""
+    products, errors = [], []
+    for idx, row in chunk:
+        name, price, stock = row.get("name"), row.get("price"), row.get("stock")
+        if not name:
+            errors.append((idx, "Name required"))
+            continue
+        error = validate_product(price, stock)
+        if error:
+            errors.append((idx, error))
+            continue
+        products.append(Product(name=name, price=price, stock=stock or 0))
+    created = Product.objects.bulk_create(products)
+    get_backend().index(Product, created)
+    if created:
+        invalidate(Product)
+    return created, errors
+
+
+def order_lines(product_ids, quantities=None):
+    """
+    Map each product id to its quantity, merging repeated ids.
+
+    ``quantities`` runs parallel to ``product_ids`` and defaults to one of
+    each product. Raises ``ValueError`` for mismatched or non-positive values.
+    """
+    product_ids = list(product_ids or ())
+    if quantities is None:
+        quantities = [1] * len(product_ids)
+    if len(quantities) != len(product_ids):
+        raise ValueError("Quantities must match product IDs")
+    lines = {}
+    for pk, quantity in zip(product_ids, quantities):
+        if quantity is None or quantity < 1:
+            raise ValueError("Quantities must be positive")
+        lines[str(pk)] = lines.get(str(pk), 0) + quantity
+    return lines
+
+
+class StockConflict(Exception):
+    """Stock changed between the availability check and the reservation."""
+
+
+def create_orders(chunk, reserve_stock=False):
+    """
+    Validate and insert orders with one customer and one product lookup.
+
+    Totals are computed in the same pass from the fetched prices, all
+    orders and their items are written with one ``bulk_create`` each and
+    the daily revenue rollup is upserted with one more statement.
+
+    With ``reserve_stock`` the ordered quantities are allocated in input
+    order against the fetched stock, rejecting orders that would oversell,
+    and then deducted with one conditional ``UPDATE``. If that update does
+    not match every product, :class:`StockConflict` is raised so the caller
+    can roll back. The product rows are fetched ``select_for_update()``,
+    which locks them on PostgreSQL but is a no-op on SQLite; there the
+    conditional ``UPDATE`` alone guarantees stock never goes negative.
+    """
+    customer_ids = pk_keys(row.get("customer_id") for _, row in chunk)
+    product_ids = pk_keys(pk for _, row in chunk for pk in row.get("product_ids") or ())
+    customers = {str(pk): pk for pk in Customer.objects.filter(pk__in=customer_ids).values_list("pk", flat=True)}
+    product_rows = Product.objects.filter(pk__in=product_ids)
+    if reserve_stock:
+        product_rows = product_rows.select_for_update()
+    products = {str(pk): (pk, price, stock) for pk, price, stock in product_rows.values_list("pk", "price", "stock")}
+    available = {key: stock for key, (_, _, stock) in products.items()}
+
+    orders, items, errors = [], [], []
+    for idx, row in chunk:
+        if str(row.get("customer_id")) not in customers:
+            errors.append((idx, "Invalid customer ID"))
+            continue
+        try:
+            lines = order_lines(row.get("product_ids"), row.get("quantities"))
+        except ValueError as e:
+            errors.append((idx, str(e)))
+            continue
+        if not lines:
+            errors.append((idx, "At least one product must be selected"))
+            continue
+        if any(pk not in products for pk in lines):
+            errors.append((idx, "One or more product IDs are invalid"))
+            continue
+        if reserve_stock:
+            if any(available[pk] < quantity for pk, quantity in lines.items()):
+                errors.append((idx, "Insufficient stock"))
+                continue
+            for pk, quantity in lines.items():
+                available[pk] -= quantity
+        orders.append(Order(
+            customer_id=customers[str(row.get("customer_id"))],
+            total_amount=sum(products[pk][1] * quantity for pk, quantity in lines.items()),
+        ))
+        items.append(lines)
+
+    if reserve_stock:
+        publish_stock_changes(_reserve_stock({
+            pk: stock - available[key]
+            for key, (pk, _, stock) in products.items()
+            if available[key] != stock
+        }))
+    Order.objects.bulk_create(orders)
+    OrderItem.objects.bulk_create(
+        OrderItem(order_id=order.pk, product_id=products[pk][0], quantity=quantity, unit_price=products[pk][1])
+        for order, lines in zip(orders, items)
+        for pk, quantity in lines.items()
+    )
+    record_orders(
+        orders,
+        [{products[pk][0]: quantity for pk, quantity in lines.items()} for lines in items],
+        {pk: price for pk, price, _ in products.values()},
+    )
+    if orders:
+        invalidate(Order)
+        publish_orders_created(orders)
+    return orders, errors
+
+
+def _reserve_stock(demand):
+    """
+    Deduct ``{product pk: quantity}`` only where enough stock remains.
+
+    Returns ``{product pk: stock}`` as written, re-read after the update:
+    the stock fetched before it may be stale without row locks.
+    """
+    if not demand:
+        return {}
+    enough = Q()
+    for pk, quantity in demand.items():
+        enough |= Q(pk=pk, stock__gte=quantity)
+    updated = Product.objects.filter(enough).update(
+        stock=Case(
+            *(When(pk=pk, then=F("stock") - quantity) for pk, quantity in demand.items()),
+            default=F("stock"),
+            output_field=Product._meta.get_field("stock"),
+        )
+    )
+    if updated != len(demand):
+        raise StockConflict("Stock changed while reserving, please retry")
+    invalidate(Product)
+    return dict(Product.objects.filter(pk__in=demand).values_list("pk", "stock"))
+
+
+def bulk_create_customers(rows, chunk_size=None):
+    """
+    Validate and insert customer rows in chunks, in one transaction.
+
+    Each chunk costs one ``email__in`` lookup and one ``bulk_create``, so the
+    statement count grows with the number of chunks rather than rows. An
+    email repeated within the input is rejected after its first occurrence.
+    Returns the created customers and ``"Row N: ..."`` error messages.
+    """
+    created, errors = [], []
+    with transaction.atomic():
+        for chunk in chunked(enumerate(rows, start=1), get_chunk_size(chunk_size)):
+            customers, chunk_errors = create_customers(chunk)
+            created += customers
+            errors += [f"Row {idx}: {message}" for idx, message in chunk_errors]
+    return created, errors
+
+
+
+def bulk_create_orders(rows, chunk_size=None, reserve_stock=True):
+    """
+    Validate, reserve stock for and insert order rows in chunks, in one transaction.
+
+    Each chunk costs one customer lookup, one product lookup, one stock
+    ``UPDATE`` and two ``bulk_create`` calls. Returns the created orders
+    and ``"Row N: ..."`` error messages; :class:`StockConflict` rolls back
+    the whole batch.
+    """
+    created, errors = [], []
+    with transaction.atomic():
+        for chunk in chunked(enumerate(rows, start=1), get_chunk_size(chunk_size)):
+            orders, chunk_errors = create_orders(chunk, reserve_stock=reserve_stock)
+            created += orders
+            errors += [f"Row {idx}: {message}" for idx, message in chunk_errors]
+    return created, errors
+
+
+# ----------------------------
+# Restocking
+# ----------------------------
+def restock_products(threshold=10, increment=10):
+    """
+    Add ``increment`` to the stock of every product below ``threshold``.
+
+    The restock is a single ``UPDATE ... SET stock = stock + N WHERE stock <
+    threshold``, so it stays correct under concurrent orders, and returns
+    the updated rows itself on backends with ``UPDATE ... RETURNING``.
+    Elsewhere the affected ids are locked first, then updated and fetched
+    in chunks of ``CRM_BULK_CHUNK_SIZE`` to keep the bound parameters
+    within the backend's limit.
+    """
+    low_stock = Product.objects.db_manager(router.db_for_write(Product)).filter(stock__lt=threshold)
+    stock = F("stock") + increment
+    with transaction.atomic(using=low_stock.db):
+        if _supports_update_returning(low_stock.db):
+            products = _update_returning(low_stock, stock=stock)
+        else:
+            ids = list(low_stock.select_for_update().values_list("pk", flat=True))
+            products = []
+            for chunk in chunked(ids, get_chunk_size()):
+                Product.objects.using(low_stock.db).filter(pk__in=chunk).update(stock=stock)
+                products += Product.objects.using(low_stock.db).filter(pk__in=chunk)
+    products.sort(key=lambda product: product.pk)
+    if products:
+        # Queryset updates skip post_save, so the cache is invalidated here.
+        invalidate(Product)
+        publish_stock_changes({product.pk: product.stock for product in products})
+    return products
+
+
+def _supports_update_returning(using):
+    connection = connections[using]
+    if connection.vendor == "postgresql":
+        return True
+    return connection.vendor == "sqlite" and connection.Database.sqlite_version_info >= (3, 35, 0)
+
+
+def _update_returning(queryset, **values):
+    """``queryset.update(**values)`` returning the updated model instances."""
+    using = queryset.db
+    query = queryset.query.chain(UpdateQuery)
+    query.add_update_values(values)
+    sql, params = query.get_compiler(using).as_sql()
+
+    # The model's columns, with the converters a SELECT would apply.
+    select = queryset.model._default_manager.using(using).all().query.get_compiler(using)
+    select.setup_query()
+    columns = [column for column, _, _ in select.select]
+    qn = select.quote_name_unless_alias
+    returning = ", ".join(qn(column.target.column) for column in columns)
+    with connections[using].cursor() as cursor:
+        cursor.execute(f"{sql} RETURNING {returning}", params)
+        rows = cursor.fetchall()
+    converters = select.get_converters(columns)
+    if converters:
+        rows = select.apply_converters(rows, converters)
+    attnames = [column.target.attname for column in columns]
+    return [queryset.model.from_db(using, attnames, row) for row in rows]
@@ -0,0 +1,134 @@
+import hashlib
+import json
+import time
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from graphql import FieldNode, TypeInfo, TypeInfoVisitor, Visitor, get_named_type, print_ast, visit
+
+from .models import Customer, Order, OrderItem, Product
+from .persisted_queries import get_document
+
+CACHEABLE_ROOT_FIELDS = {"allCustomers", "allProducts", "allOrders"}
+DEFAULT_TTL = 60
+KEY_PREFIX = "crm:response:"
+GENERATION_PREFIX = "crm:generation:"
+
+# Writes to a model invalidate the responses built from these models.
+INVALIDATES = {
+    Customer: (Customer,),
+    Product: (Product,),
+    Order: (Order,),
+    OrderItem: (Order,),
+}
+
+
+def get_cache():
+    return caches[getattr(settings, "CRM_RESPONSE_CACHE_ALIAS", "default")]
+
+
+# ----------------------------
+# Invalidation
+# ----------------------------
+def invalidate(*models):
+    """
+    Expire every cached response that read any of ``models``.
+
+    Each model has a generation token that is part of the response keys, so
+    replacing it orphans the old entries. Runs after the current
+    transaction commits, so a concurrent reader cannot re-cache stale rows.
+    """
+    labels = {
+        GENERATION_PREFIX + target._meta.label_lower
+        for model in models
+        for target in INVALIDATES.get(model, (model,))
+    }
+
+    def bump():
+        token = time.time_ns()
+        get_cache().set_many({label: token for label in labels}, None)
+
+    transaction.on_commit(bump)
+
+
+def _generations(models):
+    keys = sorted(GENERATION_PREFIX + model._meta.label_lower for model in models)
+    cache = get_cache()
+    generations = cache.get_many(keys)
+    missing = {key: time.time_ns() for key in keys if key not in generations}
+    if missing:
+        cache.set_many(missing, None)
+        generations.update(missing)
+    return [generations[key] for key in keys]
+
+
+# ----------------------------
+# Cache keys
+# ----------------------------
+class _ModelCollector(Visitor):
+    def __init__(self, type_info):
+        super().__init__()
+        self.type_info = type_info
+        self.models = set()
+
+    def enter_field(self, node, *args):
+        graphene_type = getattr(get_named_type(self.type_info.get_type()), "graphene_type", None)
+        meta = getattr(graphene_type, "_meta", None)
+        # Connections count rows of their node model even without a node selection.
+        node_meta = getattr(getattr(meta, "node", None), "_meta", None)
+        model = getattr(meta, "model", None) or getattr(node_meta, "model", None)
+        if model is not None:
+            self.models.add(model)
+
+
+@lru_cache(maxsize=getattr(settings, "CRM_DOCUMENT_CACHE_SIZE", 256))
+def _operation_info(schema, query, operation_name):
+    """Return the normalized-operation hash and models of a cacheable query."""
+    document, errors = get_document(schema, query)
+    if document is None or errors:
+        return None
+    operations = [
+        definition for definition in document.definitions
+        if getattr(definition, "operation", None) is not None
+        and (operation_name is None or definition.name and definition.name.value == operation_name)
+    ]
+    if len(operations) != 1 or operations[0].operation.value != "query":
+        return None
+    selections = operations[0].selection_set.selections
+    if not all(
+        isinstance(selection, FieldNode) and selection.name.value in CACHEABLE_ROOT_FIELDS
+        for selection in selections
+    ):
+        return None
+
+    type_info = TypeInfo(schema)
+    collector = _ModelCollector(type_info)
+    visit(document, TypeInfoVisitor(type_info, collector))
+    normalized = hashlib.sha256(print_ast(document).encode("utf-8")).hexdigest()
+    return normalized, frozenset(collector.models)
+
+
+def response_cache_key(schema, query, variables, operation_name):
+    """
+    Return ``(key, ttl)`` for a read-only connection query, else ``None``.
+
+    The key covers the normalized operation, its variables (which carry the
+    filterset arguments) and the generation of every model it reads. The
+    TTL is the shortest ``CRM_RESPONSE_CACHE_TTLS`` entry among those models.
+    """
+    info = _operation_info(schema, query, operation_name)
+    if info is None:
+        return None
+    normalized, models = info
+    ttls = getattr(settings, "CRM_RESPONSE_CACHE_TTLS", {})
+    ttl = min((ttls.get(model._meta.label_lower, DEFAULT_TTL) for model in models), default=DEFAULT_TTL)
+    if not ttl:
+        return None
+    payload = json.dumps(
+        [normalized, operation_name, variables or {}, _generations(models)],
+        sort_keys=True,
+        default=str,
+    )
+    return KEY_PREFIX + hashlib.sha256(payload.encode("utf-8")).hexdigest(), ttl
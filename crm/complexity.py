@@ -0,0 +1,202 @@
+from django.conf import settings
+from django.core.cache import cache
+from graphql import (
+    FieldNode,
+    FragmentSpreadNode,
+    GraphQLError,
+    InlineFragmentNode,
+    ValidationRule,
+    get_named_type,
+    is_leaf_type,
+    value_from_ast,
+)
+
+from graphene_django.settings import graphene_settings
+
+BUDGET_PREFIX = "crm:cost:"
+PAGE_ARGS = ("first", "last")
+
+
+class QueryCostError(GraphQLError):
+    def __init__(self, message, code, **extensions):
+        super().__init__(message, extensions={"code": code, **extensions})
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def nested_page_size():
+    """Page size of nested connections queried without ``first``/``last``."""
+    return _setting("CRM_NESTED_PAGE_SIZE", 20)
+
+
+# ----------------------------
+# Static cost
+# ----------------------------
+class _CostWalker:
+    """
+    Compute ``(depth, cost)`` of one operation.
+
+    Every object field costs its weight (default 1, scalars 0) times the
+    number of times it can be resolved, which multiplies by the page size
+    of each enclosing connection: ``first``/``last`` when given, else
+    ``CRM_NESTED_PAGE_SIZE`` for nested connections and the
+    ``RELAY_CONNECTION_MAX_LIMIT`` a root connection may return. A
+    connection field is charged per row of its page; its ``edges``,
+    ``node`` and ``pageInfo`` plumbing is free, as are introspection fields.
+    """
+
+    def __init__(self, schema, fragments, variables):
+        self.schema = schema
+        self.fragments = fragments
+        self.variables = variables or {}
+        self.weights = _setting("CRM_QUERY_FIELD_WEIGHTS", {})
+        self.max_page = graphene_settings.RELAY_CONNECTION_MAX_LIMIT or 100
+        self.nested_page = nested_page_size()
+
+    def walk(self, selection_set, parent_type, multiplier=1, seen=frozenset()):
+        depth, cost = 0, 0
+        for selection in selection_set.selections:
+            if isinstance(selection, FieldNode):
+                field_depth, field_cost = self._field(selection, parent_type, multiplier, seen)
+            elif isinstance(selection, InlineFragmentNode):
+                type_ = (
+                    self.schema.get_type(selection.type_condition.name.value)
+                    if selection.type_condition else parent_type
+                )
+                field_depth, field_cost = self.walk(selection.selection_set, type_, multiplier, seen)
+            elif isinstance(selection, FragmentSpreadNode):
+                name = selection.name.value
+                fragment = self.fragments.get(name)
+                if fragment is None or name in seen:
+                    continue
+                type_ = self.schema.get_type(fragment.type_condition.name.value)
+                field_depth, field_cost = self.walk(fragment.selection_set, type_, multiplier, seen | {name})
+            else:
+                continue
+            depth = max(depth, field_depth)
+            cost += field_cost
+        return depth, cost
+
+    def _field(self, node, parent_type, multiplier, seen):
+        name = node.name.value
+        fields = getattr(parent_type, "fields", {})
+        if name.startswith("__") or name not in fields:
+            return 0, 0
+        field = fields[name]
+        named_type = get_named_type(field.type)
+        if "edges" in getattr(named_type, "fields", {}):
+            # A connection costs the rows of its page.
+            multiplier *= self._page_size(node, field, nested=parent_type is not self.schema.query_type)
+        plumbing = is_leaf_type(named_type) or parent_type.name.endswith(("Connection", "Edge"))
+        cost = self.weights.get(f"{parent_type.name}.{name}", 0 if plumbing else 1) * multiplier
+        if node.selection_set is None:
+            return 1, cost
+        depth, child_cost = self.walk(node.selection_set, named_type, multiplier, seen)
+        return depth + 1, cost + child_cost
+
+    def _page_size(self, node, field, nested):
+        sizes = []
+        for argument in node.arguments:
+            if argument.name.value in PAGE_ARGS and argument.name.value in field.args:
+                value = value_from_ast(argument.value, field.args[argument.name.value].type, self.variables)
+                if isinstance(value, int) and value >= 0:
+                    sizes.append(value)
+        if not sizes and nested:
+            sizes.append(self.nested_page)
+        return min([*sizes, self.max_page])
+
+
+def query_cost(schema, document, variables=None, operation_name=None):
+    """Return ``(depth, cost)`` of the selected operation of ``document``."""
+    fragments = {}
+    operations = []
+    for definition in document.definitions:
+        if getattr(definition, "operation", None) is not None:
+            operations.append(definition)
+        elif getattr(definition, "type_condition", None) is not None:
+            fragments[definition.name.value] = definition
+    operations = [
+        operation for operation in operations
+        if operation_name is None or (operation.name and operation.name.value == operation_name)
+    ]
+    if not operations:
+        return 0, 0
+    operation = operations[0]
+    root_type = schema.get_root_type(operation.operation)
+    return _CostWalker(schema, fragments, variables).walk(operation.selection_set, root_type)
+
+
+class QueryCostRule(ValidationRule):
+    """
+    Reject operations deeper than ``CRM_QUERY_MAX_DEPTH`` or costlier than
+    ``CRM_QUERY_MAX_COST`` before they execute.
+
+    Page sizes passed as variables are read from ``variables``; use
+    :func:`cost_rule` to bind them for a request. Unbound variables count
+    as the maximum page size. The computed cost is kept in ``report``.
+    """
+
+    variables = None
+    operation_name = None
+    report = None
+
+    def enter_document(self, node, *args):
+        schema = self.context.schema
+        depth, cost = query_cost(schema, node, self.variables, self.operation_name)
+        if self.report is not None:
+            self.report.update(depth=depth, cost=cost)
+        max_depth = _setting("CRM_QUERY_MAX_DEPTH", 12)
+        max_cost = _setting("CRM_QUERY_MAX_COST", 5000)
+        if max_depth and depth > max_depth:
+            self.report_error(QueryCostError(
+                f"Query depth {depth} exceeds the maximum of {max_depth}", "QUERY_TOO_DEEP"
+            ))
+        if max_cost and cost > max_cost:
+            self.report_error(QueryCostError(
+                f"Query cost {cost} exceeds the maximum of {max_cost}", "QUERY_TOO_COMPLEX", cost=cost
+            ))
+        return self.SKIP
+
+
+def cost_rule(variables=None, operation_name=None, report=None):
+    """Return a :class:`QueryCostRule` bound to one request's variables."""
+    return type(
+        "QueryCostRule",
+        (QueryCostRule,),
+        {"variables": variables, "operation_name": operation_name, "report": report},
+    )
+
+
+# ----------------------------
+# Per-client budget
+# ----------------------------
+def charge_budget(client, cost):
+    """
+    Spend ``cost`` from the client's budget for the current window.
+
+    Each client may spend ``CRM_QUERY_COST_BUDGET`` per
+    ``CRM_QUERY_COST_WINDOW`` seconds. Raises :class:`QueryCostError` with
+    a ``retryAfter`` hint, without charging, when the query does not fit.
+    """
+    budget = _setting("CRM_QUERY_COST_BUDGET", None)
+    if not budget or not cost:
+        return
+    window = _setting("CRM_QUERY_COST_WINDOW", 60)
+    key = BUDGET_PREFIX + client
+    cache.add(key, 0, window)
+    try:
+        spent = cache.incr(key, cost)
+    except ValueError:
+        # The window expired between add() and incr().
+        cache.set(key, cost, window)
+        spent = cost
+    if spent > budget:
+        try:
+            cache.decr(key, cost)
+        except ValueError:
+            pass
+        raise QueryCostError(
+            "Query cost budget exceeded, retry later", "QUERY_BUDGET_EXCEEDED", retryAfter=window
+        )
@@ -3,12 +3,13 @@ import django
 import logging
 from datetime import datetime
 from gql import gql, Client
-from gql.transport.requests import RequestsHTTPTransport
 
 # Setup Django
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "crm.settings")
 django.setup()
 
+from crm.transport import local_client
+
 # Logging setup
 logging.basicConfig(
     filename="/tmp/cron_jobs.log",
@@ -16,13 +17,8 @@ logging.basicConfig(
     format="%(asctime)s - %(message)s"
 )
 
-# GraphQL client setup
-transport = RequestsHTTPTransport(
-    url="http://localhost:8000/graphql/",
-    verify=True,
-    retries=3,
-)
-client = Client(transport=transport, fetch_schema_from_transport=True)
+# GraphQL client setup: jobs execute against the schema in this process
+client = local_client()
 
 # ============================
 # 1) Log Heartbeat
@@ -33,6 +29,9 @@ def log_crm_heartbeat():
     status = "CRM is alive"
 
     try:
+        # The heartbeat probes the web tier itself, so it stays on HTTP.
+        from gql.transport.requests import RequestsHTTPTransport
+
         transport = RequestsHTTPTransport(
             url="http://localhost:8000/graphql",
             verify=True,
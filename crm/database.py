@@ -0,0 +1,97 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+# Applied to every new SQLite connection unless overridden by
+# ``CRM_SQLITE_PRAGMAS`` (a value of None skips a pragma).
+DEFAULT_SQLITE_PRAGMAS = {
+    # Readers no longer block the writer, nor the writer readers.
+    "journal_mode": "WAL",
+    # Durable at checkpoints; safe from corruption in WAL mode.
+    "synchronous": "NORMAL",
+    "mmap_size": 256 * 1024 * 1024,
+    "cache_size": -64 * 1024,
+    "temp_store": "MEMORY",
+    "busy_timeout": 5000,
+}
+
+# Pragmas a read-only connection may not change.
+WRITER_PRAGMAS = ("journal_mode",)
+
+
+# ----------------------------
+# Pragmas
+# ----------------------------
+def sqlite_pragmas():
+    return {
+        name: value
+        for name, value in {**DEFAULT_SQLITE_PRAGMAS, **getattr(settings, "CRM_SQLITE_PRAGMAS", {})}.items()
+        if value is not None
+    }
+
+
+def is_read_only(settings_dict):
+    return "mode=ro" in str(settings_dict.get("NAME", ""))
+
+
+def apply_pragmas(cursor, pragmas, read_only=False):
+    """Run ``PRAGMA name = value`` for each of ``pragmas`` on a DB-API cursor."""
+    for name, value in pragmas.items():
+        if read_only and name in WRITER_PRAGMAS:
+            continue
+        cursor.execute(f"PRAGMA {name} = {value}")
+
+
+@receiver(connection_created)
+def tune_sqlite_connection(sender, connection, **kwargs):
+    if connection.vendor == "sqlite":
+        with connection.cursor() as cursor:
+            apply_pragmas(cursor, sqlite_pragmas(), read_only=is_read_only(connection.settings_dict))
+
+
+# ----------------------------
+# Read replica routing
+# ----------------------------
+_use_writer = ContextVar("crm_use_writer", default=False)
+
+
+@contextmanager
+def use_writer():
+    """Send the reads in this block to the writer, e.g. for a mutation."""
+    token = _use_writer.set(True)
+    try:
+        yield
+    finally:
+        _use_writer.reset(token)
+
+
+class ReadReplicaRouter:
+    """
+    Send reads to the ``CRM_DB_READ_ALIAS`` connection and writes to the
+    default one.
+
+    Reads stay on the writer inside :func:`use_writer` (GraphQL mutations)
+    and while the writer is in a transaction, so a mutation and the
+    queries of its own transaction see the rows it wrote.
+    """
+
+    def db_for_read(self, model, **hints):
+        alias = getattr(settings, "CRM_DB_READ_ALIAS", None)
+        if not alias or alias not in settings.DATABASES or _use_writer.get():
+            return DEFAULT_DB_ALIAS
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return alias
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        return db == DEFAULT_DB_ALIAS
@@ -0,0 +1,192 @@
+import csv
+import gzip
+import json
+import os
+from contextlib import nullcontext
+from datetime import date, datetime
+from importlib.util import find_spec
+
+from django.db import transaction
+from django.utils import timezone
+
+from .bulk import chunked
+from .models import Customer, Order, OrderItem, Product
+
+DEFAULT_CHUNK_SIZE = 50000
+
+# Exported tables: model and columns (attnames), written in primary key order.
+EXPORT_TABLES = {
+    "orders": (Order, ("id", "customer_id", "order_date", "total_amount")),
+    "order_items": (OrderItem, ("id", "order_id", "product_id", "quantity", "unit_price")),
+    "customers": (Customer, ("id", "name", "email", "phone", "created_at")),
+    "products": (Product, ("id", "name", "price", "stock")),
+}
+
+
+# ----------------------------
+# Writers
+# ----------------------------
+# A writer is opened on a path with the model fields of its columns, takes
+# lists of ``values_list`` rows through ``write()`` and finishes the file on
+# ``close()``.
+class CSVGzipWriter:
+    """Gzipped CSV with a header row; dates in ISO 8601, NULL as empty."""
+
+    extension = ".csv.gz"
+
+    def __init__(self, path, fields):
+        self.file = gzip.open(path, "wt", newline="", encoding="utf-8", compresslevel=6)
+        self.writer = csv.writer(self.file)
+        self.writer.writerow([field.attname for field in fields])
+        self.dates = [
+            i for i, field in enumerate(fields)
+            if field.get_internal_type() in ("DateField", "DateTimeField")
+        ]
+
+    def write(self, rows):
+        if self.dates:
+            rows = [list(row) for row in rows]
+            for row in rows:
+                for i in self.dates:
+                    if isinstance(row[i], (date, datetime)):
+                        row[i] = row[i].isoformat()
+        self.writer.writerows(rows)
+
+    def close(self):
+        self.file.close()
+
+
+class _ArrowWriter:
+    """Typed Arrow record batches, one per chunk. Requires ``pyarrow``."""
+
+    def __init__(self, path, fields):
+        import pyarrow
+
+        self.pa = pyarrow
+        self.schema = pyarrow.schema([
+            pyarrow.field(field.attname, _arrow_type(pyarrow, field), nullable=field.null)
+            for field in fields
+        ])
+        self.writer = self.open(path)
+
+    def write(self, rows):
+        columns = zip(*rows)
+        self.writer.write_batch(self.pa.RecordBatch.from_arrays(
+            [self.pa.array(column, type=field.type) for column, field in zip(columns, self.schema)],
+            schema=self.schema,
+        ))
+
+    def close(self):
+        self.writer.close()
+
+
+class ParquetWriter(_ArrowWriter):
+    extension = ".parquet"
+
+    def open(self, path):
+        import pyarrow.parquet
+
+        return pyarrow.parquet.ParquetWriter(path, self.schema, compression="zstd")
+
+
+class ArrowIPCWriter(_ArrowWriter):
+    extension = ".arrow"
+
+    def open(self, path):
+        options = self.pa.ipc.IpcWriteOptions(compression="zstd")
+        return self.pa.ipc.new_file(path, self.schema, options=options)
+
+
+FORMATS = {"parquet": ParquetWriter, "arrow": ArrowIPCWriter, "csv": CSVGzipWriter}
+ARROW_FORMATS = ("parquet", "arrow")
+
+
+def _arrow_type(pa, field):
+    internal = field.get_internal_type()
+    if internal == "ForeignKey":
+        return _arrow_type(pa, field.target_field)
+    if internal == "DecimalField":
+        return pa.decimal128(field.max_digits, field.decimal_places)
+    if internal == "DateTimeField":
+        return pa.timestamp("us", tz="UTC")
+    if internal == "DateField":
+        return pa.date32()
+    if internal == "BooleanField":
+        return pa.bool_()
+    if internal.endswith("IntegerField") or internal.endswith("AutoField"):
+        return pa.int64()
+    return pa.string()
+
+
+def default_format():
+    """Parquet when ``pyarrow`` is installed, else gzipped CSV."""
+    return "parquet" if find_spec("pyarrow") else "csv"
+
+
+# ----------------------------
+# Export
+# ----------------------------
+def export_table(model, columns, path, writer_class, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Stream ``columns`` of ``model`` into ``path``; returns the row count.
+
+    Rows go to ``path + ".part"``, renamed once complete and removed on
+    failure.
+    """
+    fields = [model._meta.get_field(column) for column in columns]
+    rows = model._default_manager.order_by("pk").values_list(*columns).iterator(chunk_size=chunk_size)
+    partial = path + ".part"
+    count = 0
+    try:
+        writer = writer_class(partial, fields)
+        try:
+            for chunk in chunked(rows, chunk_size):
+                writer.write(chunk)
+                count += len(chunk)
+        finally:
+            writer.close()
+    except BaseException:
+        # Leave no half-written file behind.
+        if os.path.exists(partial):
+            os.remove(partial)
+        raise
+    os.replace(partial, path)
+    return count
+
+
+def export_tables(directory, tables=None, fmt=None, chunk_size=DEFAULT_CHUNK_SIZE, snapshot=True, log=None):
+    """
+    Export ``tables`` (default all of :data:`EXPORT_TABLES`) into
+    ``directory`` as ``<table><extension>`` plus a ``manifest.json``.
+
+    Rows are read with ``values_list().iterator()`` and written in chunks of
+    ``chunk_size``, so memory stays bounded by one chunk whatever the table
+    size. With ``snapshot`` all tables are read in one transaction; on
+    SQLite outside WAL mode that blocks writers for the duration.
+    Returns the manifest.
+    """
+    fmt = fmt or default_format()
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown export format '{fmt}'")
+    if fmt in ARROW_FORMATS and not find_spec("pyarrow"):
+        raise ValueError(f"The '{fmt}' format requires pyarrow")
+    tables = tables or list(EXPORT_TABLES)
+    unknown = set(tables) - set(EXPORT_TABLES)
+    if unknown:
+        raise ValueError(f"Unknown export tables: {', '.join(sorted(unknown))}")
+
+    writer_class = FORMATS[fmt]
+    os.makedirs(directory, exist_ok=True)
+    manifest = {"format": fmt, "exported_at": timezone.now().isoformat(), "tables": {}}
+    with transaction.atomic() if snapshot else nullcontext():
+        for name in tables:
+            model, columns = EXPORT_TABLES[name]
+            filename = name + writer_class.extension
+            rows = export_table(model, columns, os.path.join(directory, filename), writer_class, chunk_size)
+            manifest["tables"][name] = {"file": filename, "rows": rows, "columns": list(columns)}
+            if log:
+                log(name, rows)
+    with open(os.path.join(directory, "manifest.json"), "w") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
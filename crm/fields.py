@@ -0,0 +1,352 @@
+import json
+from base64 import b64decode, b64encode
+from collections import defaultdict
+from datetime import date, datetime
+from decimal import Decimal
+from functools import partial
+
+import graphene
+from asgiref.sync import sync_to_async
+from django.db.models import F, Model, Q, QuerySet
+from graphene.relay import PageInfo
+from graphene.utils.str_converters import to_snake_case
+from graphene_django.filter import DjangoFilterConnectionField
+from graphene_django.utils import maybe_queryset
+from graphql import GraphQLError
+
+from .async_graphql import async_capable, is_async
+from .complexity import nested_page_size
+from .loaders import get_loaders
+
+
+class CountableConnection(graphene.relay.Connection):
+    """Connection whose ``totalCount`` is only computed when it is selected."""
+
+    class Meta:
+        abstract = True
+
+    total_count = graphene.Int()
+
+    def resolve_total_count(root, info):
+        if isinstance(root.iterable, QuerySet):
+            return root.iterable.acount() if is_async(info) else root.iterable.count()
+        return len(root.iterable)
+
+
+class _FilteredRows(list):
+    """Related rows the filterset was already applied to."""
+
+
+class BatchedConnectionField(DjangoFilterConnectionField):
+    """
+    Filter connection that cooperates with the request DataLoaders.
+
+    Every resolved page queues its nodes' relation keys on the loaders, and
+    resolvers may return an already-loaded list instead of a queryset. A list
+    is paginated in memory. Filter arguments on a model relation are applied
+    by a loader per relation and arguments, in one query for all the nodes
+    of the request; other lists are narrowed back to a queryset for the
+    filterset. Nested connections queried without ``first``/``last`` return
+    pages of ``CRM_NESTED_PAGE_SIZE``, the size the query cost assumes.
+    """
+
+    def wrap_resolve(self, parent_resolver):
+        resolver = partial(
+            self.resolve_related,
+            self.resolver or parent_resolver,
+            self.connection_type,
+            self.get_queryset_resolver(),
+            self.filtering_args,
+        )
+        return partial(
+            self.connection_resolver,
+            resolver,
+            self.connection_type,
+            self.get_manager(),
+            self.get_queryset_resolver(),
+            self.max_limit,
+            self.enforce_first_or_last,
+        )
+
+    @classmethod
+    def resolve_related(cls, resolver, connection, queryset_resolver, filtering_args, root, info, **args):
+        filters = {name: args[name] for name in filtering_args if args.get(name) is not None}
+        if not filters or not isinstance(root, Model):
+            return resolver(root, info, **args)
+        relation = root._meta.get_field(to_snake_case(info.field_name))
+        # The path from the related model back to ``root``.
+        lookup = relation.field.name if relation.auto_created else relation.related_query_name()
+
+        def load(keys):
+            queryset = relation.related_model._default_manager.filter(**{f"{lookup}__in": keys})
+            queryset = queryset.annotate(crm_parent=F(lookup)).order_by("pk")
+            rows = defaultdict(list)
+            for row in queryset_resolver(connection, queryset, info, args).distinct():
+                rows[row.crm_parent].append(row)
+            return [rows[key] for key in keys]
+
+        key = (root._meta.label, info.field_name, json.dumps(filters, sort_keys=True, default=str))
+        return _FilteredRows(get_loaders(info).load_filtered(key, load, root))
+
+    @classmethod
+    def resolve_queryset(
+        cls, connection, iterable, info, args, filtering_args, filterset_class
+    ):
+        if isinstance(iterable, list):
+            if isinstance(iterable, _FilteredRows) or not any(
+                args.get(name) is not None for name in filtering_args
+            ):
+                return iterable
+            model = connection._meta.node._meta.model
+            iterable = model._default_manager.filter(pk__in=[obj.pk for obj in iterable])
+        return super().resolve_queryset(
+            connection, iterable, info, args, filtering_args, filterset_class
+        )
+
+    @classmethod
+    def connection_resolver(
+        cls,
+        resolver,
+        connection,
+        default_manager,
+        queryset_resolver,
+        max_limit,
+        enforce_first_or_last,
+        root,
+        info,
+        **args,
+    ):
+        if root is not None and args.get("first") is None and args.get("last") is None:
+            args["first"] = nested_page_size()
+        connection = super().connection_resolver(
+            resolver,
+            connection,
+            default_manager,
+            queryset_resolver,
+            max_limit,
+            enforce_first_or_last,
+            root,
+            info,
+            **args,
+        )
+        get_loaders(info).enqueue_for(edge.node for edge in connection.edges)
+        return connection
+
+
+class KeysetConnectionField(BatchedConnectionField):
+    """
+    Connection paginated on the sort key instead of row offsets.
+
+    Cursors encode the ordering and the sort-key values (with the primary
+    key as tie-breaker) of their row, and ``after``/``before`` become range
+    filters, so every page costs the same as the first. The ordering is the
+    one the resolver applied, e.g. from the ``order_by`` argument. Lists and
+    ``offset`` requests fall back to offset pagination.
+    """
+
+    def __init__(self, type_, *args, **kwargs):
+        super().__init__(type_, *args, **kwargs)
+        self._base_args = {**(self._base_args or {}), "order_by": graphene.Argument(graphene.String)}
+
+    def wrap_resolve(self, parent_resolver):
+        return async_capable(super().wrap_resolve(parent_resolver))
+
+    @classmethod
+    def connection_resolver(
+        cls,
+        resolver,
+        connection,
+        default_manager,
+        queryset_resolver,
+        max_limit,
+        enforce_first_or_last,
+        root,
+        info,
+        **args,
+    ):
+        if is_async(info):
+            if enforce_first_or_last and not (args.get("first") or args.get("last")):
+                raise GraphQLError(
+                    f"You must provide a `first` or `last` value to properly paginate the `{info.field_name}` connection."
+                )
+            return cls.aconnection_resolver(
+                resolver, connection, default_manager, queryset_resolver, max_limit, root, info, args
+            )
+        return super().connection_resolver(
+            resolver,
+            connection,
+            default_manager,
+            queryset_resolver,
+            max_limit,
+            enforce_first_or_last,
+            root,
+            info,
+            **args,
+        )
+
+    @classmethod
+    async def aconnection_resolver(
+        cls, resolver, connection, default_manager, queryset_resolver, max_limit, root, info, args
+    ):
+        """
+        Resolve a page for the async view: the resolver and the filterset
+        (which may validate against the database) run on the database
+        thread, and the page rows are fetched with the async ORM.
+        """
+        for name in ("first", "last"):
+            if max_limit and args.get(name) is not None and args[name] > max_limit:
+                raise GraphQLError(
+                    f"Requesting {args[name]} records on the `{info.field_name}` connection "
+                    f"exceeds the `{name}` limit of {max_limit} records."
+                )
+
+        def get_iterable():
+            iterable = resolver(root, info, **args)
+            if iterable is None:
+                iterable = default_manager
+            return queryset_resolver(connection, iterable, info, args)
+
+        iterable = maybe_queryset(await sync_to_async(get_iterable)())
+        page = cls._keyset_page(args, iterable, max_limit)
+        if page is None:
+            result = await sync_to_async(super().resolve_connection)(connection, args, iterable, max_limit)
+        else:
+            result = page.build(connection, [row async for row in page.queryset], iterable)
+        get_loaders(info).enqueue_for(edge.node for edge in result.edges)
+        return result
+
+    @classmethod
+    def resolve_connection(cls, connection, args, iterable, max_limit=None):
+        iterable = maybe_queryset(iterable)
+        page = cls._keyset_page(args, iterable, max_limit)
+        if page is None:
+            return super().resolve_connection(connection, args, iterable, max_limit)
+        return page.build(connection, list(page.queryset), iterable)
+
+    @staticmethod
+    def _keyset_page(args, iterable, max_limit):
+        keys = _sort_keys(iterable) if isinstance(iterable, QuerySet) else None
+        if keys is None or args.get("offset") is not None:
+            return None
+        return _KeysetPage(args, iterable, keys, max_limit)
+
+
+# ----------------------------
+# Keyset helpers
+# ----------------------------
+class _KeysetPage:
+    """The row query of one keyset page and how to turn its rows into edges."""
+
+    def __init__(self, args, iterable, keys, max_limit):
+        self.first, self.last = args.get("first"), args.get("last")
+        self.after, self.before = args.get("after"), args.get("before")
+        if max_limit is not None and self.first is None and self.last is None:
+            self.first = max_limit
+        self.keys = keys
+
+        ordering = [("-" if descending else "") + name for name, descending in keys]
+        self.spec = ",".join(ordering)
+        queryset = _load_sort_keys(iterable.order_by(*ordering), keys)
+        if self.after:
+            queryset = queryset.filter(_seek(keys, _decode_cursor(self.after, self.spec), forward=True))
+        if self.before:
+            queryset = queryset.filter(_seek(keys, _decode_cursor(self.before, self.spec), forward=False))
+        # One extra row tells whether there is a further page.
+        if self.first is not None:
+            self.queryset = queryset[:self.first + 1]
+        elif self.last is not None:
+            self.queryset = queryset.reverse()[:self.last + 1]
+        else:
+            # Neither argument and no RELAY_CONNECTION_MAX_LIMIT: every row.
+            self.queryset = queryset
+
+    def build(self, connection, rows, iterable):
+        first, last = self.first, self.last
+        if first is None and last is not None:
+            rows = rows[::-1]
+            has_previous_page, has_next_page = len(rows) > last, bool(self.before)
+            rows = rows[-last:] if last else []
+        else:
+            has_previous_page = bool(self.after)
+            has_next_page = first is not None and len(rows) > first
+            if first is not None:
+                rows = rows[:first]
+            if last is not None:
+                has_previous_page = has_previous_page or len(rows) > last
+                rows = rows[-last:] if last else []
+
+        edges = [connection.Edge(node=row, cursor=_encode_cursor(row, self.keys, self.spec)) for row in rows]
+        page = connection(
+            edges=edges,
+            page_info=PageInfo(
+                start_cursor=edges[0].cursor if edges else None,
+                end_cursor=edges[-1].cursor if edges else None,
+                has_previous_page=has_previous_page,
+                has_next_page=has_next_page,
+            ),
+        )
+        page.iterable = iterable
+        return page
+
+
+def _sort_keys(queryset):
+    """Return ``[(attname, descending)]`` ending with the pk, or ``None``."""
+    opts = queryset.model._meta
+    ordering = queryset.query.order_by or opts.ordering
+    keys = []
+    for item in ordering:
+        if not isinstance(item, str) or item == "?":
+            return None
+        name = item.lstrip("-")
+        if "__" in name:
+            return None
+        field = opts.pk if name == "pk" else opts.get_field(name)
+        if not field.concrete:
+            return None
+        keys.append((field.attname, item.startswith("-")))
+    if not keys or keys[-1][0] != opts.pk.attname:
+        keys.append((opts.pk.attname, keys[-1][1] if keys else False))
+    return keys
+
+
+def _load_sort_keys(queryset, keys):
+    # Keep the sort keys out of only() deferral so cursors need no extra query.
+    fields, defer = queryset.query.deferred_loading
+    if not defer:
+        queryset = queryset.only(*fields, *(name for name, _ in keys))
+    return queryset
+
+
+def _seek(keys, values, forward):
+    """Lexicographic ``(k1, k2, ...) > (v1, v2, ...)`` honouring each direction."""
+    condition = Q()
+    for i, (name, descending) in enumerate(keys):
+        lookup = "lt" if descending == forward else "gt"
+        term = Q(**{f"{name}__{lookup}": values[i]})
+        for (prev_name, _), prev_value in zip(keys[:i], values):
+            term &= Q(**{prev_name: prev_value})
+        condition |= term
+    return condition
+
+
+def _cursor_value(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+def _encode_cursor(row, keys, spec):
+    values = [_cursor_value(getattr(row, name)) for name, _ in keys]
+    return b64encode(json.dumps([spec, values]).encode("utf-8")).decode("ascii")
+
+
+def _decode_cursor(cursor, spec):
+    try:
+        cursor_spec, values = json.loads(b64decode(cursor.encode("ascii")))
+    except (ValueError, TypeError):
+        raise GraphQLError("Invalid cursor")
+    if cursor_spec != spec:
+        raise GraphQLError("Cursor does not match the requested order_by")
+    return values
@@ -1,10 +1,42 @@
 import django_filters
+from django_filters.constants import EMPTY_VALUES
 from .models import Customer, Product, Order
+from .search import get_backend
 from django.db.models import Q
 
+
+class TrigramFilter(django_filters.CharFilter):
+    """
+    ``icontains`` filter narrowed through the trigram index first.
+
+    A leading-wildcard ``LIKE`` cannot use a B-tree index, so candidate rows
+    are looked up by ``key`` in the search backend's index (FTS5 or
+    ``NameTrigram``) and only those are matched with ``LIKE``. Values under
+    three characters fall back to the plain scan.
+    """
+
+    def __init__(self, model, key="pk", **kwargs):
+        kwargs.setdefault("lookup_expr", "icontains")
+        super().__init__(**kwargs)
+        # Not ``self.model``: FilterSet overwrites that with its own model.
+        self.indexed_model = model
+        self.key = key
+
+    def filter(self, qs, value):
+        if value in EMPTY_VALUES:
+            return qs
+        lookups = {f"{self.field_name}__{self.lookup_expr}": value}
+        ids = get_backend().field_matching(self.indexed_model, self.field_name.split("__")[-1], value)
+        if ids is not None:
+            lookups[f"{self.key}__in"] = ids
+        # One filter() call, so a multi-valued relation is joined only once.
+        qs = self.get_method(qs)(**lookups)
+        return qs.distinct() if self.distinct else qs
+
+
 class CustomerFilter(django_filters.FilterSet):
-    name_icontains = django_filters.CharFilter(field_name='name', lookup_expr='icontains')
-    email_icontains = django_filters.CharFilter(field_name='email', lookup_expr='icontains')
+    name_icontains = TrigramFilter(Customer, field_name='name')
+    email_icontains = TrigramFilter(Customer, field_name='email')
     created_at_gte = django_filters.DateTimeFilter(field_name='created_at', lookup_expr='gte')
     created_at_lte = django_filters.DateTimeFilter(field_name='created_at', lookup_expr='lte')
     phone_pattern = django_filters.CharFilter(method='filter_phone_pattern')
@@ -17,7 +49,7 @@ class CustomerFilter(django_filters.FilterSet):
         fields = ['name_icontains', 'email_icontains', 'created_at_gte', 'created_at_lte', 'phone_pattern']
 
 class ProductFilter(django_filters.FilterSet):
-    name_icontains = django_filters.CharFilter(field_name='name', lookup_expr='icontains')
+    name_icontains = TrigramFilter(Product, field_name='name')
     price_gte = django_filters.NumberFilter(field_name='price', lookup_expr='gte')
     price_lte = django_filters.NumberFilter(field_name='price', lookup_expr='lte')
     stock_gte = django_filters.NumberFilter(field_name='stock', lookup_expr='gte')
@@ -32,8 +64,8 @@ class OrderFilter(django_filters.FilterSet):
     total_amount_lte = django_filters.NumberFilter(field_name='total_amount', lookup_expr='lte')
     order_date_gte = django_filters.DateTimeFilter(field_name='order_date', lookup_expr='gte')
     order_date_lte = django_filters.DateTimeFilter(field_name='order_date', lookup_expr='lte')
-    customer_name = django_filters.CharFilter(field_name='customer__name', lookup_expr='icontains')
-    product_name = django_filters.CharFilter(field_name='products__name', lookup_expr='icontains')
+    customer_name = TrigramFilter(Customer, key='customer', field_name='customer__name')
+    product_name = TrigramFilter(Product, key='products', field_name='products__name')
     product_id = django_filters.NumberFilter(field_name='products__id')
 
     class Meta:
@@ -0,0 +1,171 @@
+import csv
+import json
+from decimal import Decimal, InvalidOperation
+from functools import partial
+
+from django.core.exceptions import ValidationError
+from django.db import connection, transaction
+
+from .bulk import StockConflict, chunked, create_customers, create_orders, create_products
+from .models import Customer, Order, Product
+
+# Errors a malformed row may raise while it is coerced and validated.
+ROW_ERRORS = (ValueError, TypeError, ValidationError, InvalidOperation)
+
+
+# ----------------------------
+# Row coercion
+# ----------------------------
+def _number(value, cast, field, model_field=None):
+    """
+    Parse ``value`` with ``cast``; with ``model_field`` also reject values
+    the column cannot store (NaN, infinities, too many digits, overflow).
+    """
+    if value is None or value == "":
+        return None
+    try:
+        number = cast(str(value))
+        if model_field is not None and not _fits(number, model_field):
+            raise ValueError
+    except (ValueError, InvalidOperation):
+        raise ValueError(f"Invalid {field}")
+    return number
+
+
+def _fits(number, model_field):
+    if isinstance(number, Decimal):
+        if not number.is_finite():
+            return False
+        number = number.quantize(Decimal(10) ** -model_field.decimal_places)
+        return abs(number) < 10 ** (model_field.max_digits - model_field.decimal_places)
+    low, high = connection.ops.integer_field_range(model_field.get_internal_type())
+    # Negative values of positive fields are left to the validators' messages.
+    return (low is None or low == 0 or number >= low) and (high is None or number <= high)
+
+
+def _text(value, field):
+    """Accept strings and plain numbers (e.g. a phone sent as a JSON number)."""
+    if value is None or isinstance(value, str):
+        return value
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return str(value)
+    raise ValueError(f"Invalid {field}")
+
+
+def _id_list(value):
+    if isinstance(value, str):
+        return [pk.strip() for pk in value.replace(",", ";").split(";") if pk.strip()]
+    return value or []
+
+
+def _quantities(value):
+    if value is None or value == "":
+        return None
+    quantity_field = Order.products.through._meta.get_field("quantity")
+    try:
+        return [_number(quantity, int, "quantities", quantity_field) for quantity in _id_list(value)]
+    except (TypeError, ValueError):
+        raise ValueError("Invalid quantities")
+
+
+def _customer_row(row):
+    return {
+        "name": _text(row.get("name"), "name"),
+        "email": _text(row.get("email"), "email"),
+        "phone": _text(row.get("phone"), "phone") or "",
+    }
+
+
+def _product_row(row):
+    return {
+        "name": _text(row.get("name"), "name"),
+        "price": _number(row.get("price"), Decimal, "price", Product._meta.get_field("price")),
+        "stock": _number(row.get("stock"), int, "stock", Product._meta.get_field("stock")),
+    }
+
+
+def _order_row(row):
+    product_ids = _id_list(row.get("product_ids"))
+    if not isinstance(product_ids, list):
+        raise ValueError("Invalid product ID")
+    return {
+        "customer_id": _number(row.get("customer_id"), int, "customer ID", Customer._meta.pk),
+        "product_ids": [_number(pk, int, "product ID", Product._meta.pk) for pk in product_ids],
+        "quantities": _quantities(row.get("quantities")),
+    }
+
+
+IMPORTERS = {
+    "customers": (_customer_row, create_customers),
+    "products": (_product_row, create_products),
+    # Imported orders reserve stock like createOrder.
+    "orders": (_order_row, partial(create_orders, reserve_stock=True)),
+}
+
+
+# ----------------------------
+# Streaming readers
+# ----------------------------
+def read_csv(lines):
+    """Yield ``(line number, row)`` pairs from decoded CSV lines with a header."""
+    reader = csv.DictReader(lines)
+    for row in reader:
+        yield reader.line_num, row
+
+
+def read_ndjson(lines):
+    """Yield ``(line number, row)`` pairs from newline-delimited JSON."""
+    for line_num, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            row = None
+        yield line_num, row
+
+
+def _message(error):
+    if isinstance(error, ValidationError):
+        return "; ".join(error.messages)
+    return str(error) or "Invalid row"
+
+
+def import_rows(kind, rows, batch_size):
+    """
+    Import ``(line number, row)`` pairs, committing one batch at a time.
+
+    Yields ``{"line", "error"}`` events for rejected rows and a progress
+    event after every committed batch; only one batch is held in memory.
+    A batch of orders whose stock changed while reserving is rolled back
+    and reported line by line.
+    """
+    coerce, create = IMPORTERS[kind]
+    processed = created = failed = 0
+
+    for batch_num, batch in enumerate(chunked(rows, batch_size), start=1):
+        valid, invalid = [], []
+        for line_num, row in batch:
+            try:
+                if not isinstance(row, dict):
+                    raise ValueError("Invalid JSON object")
+                valid.append((line_num, coerce(row)))
+            except ROW_ERRORS as e:
+                invalid.append((line_num, _message(e)))
+
+        try:
+            with transaction.atomic():
+                instances, errors = create(valid)
+        except StockConflict as e:
+            # The batch was rolled back: none of its rows were imported.
+            instances, errors = [], [(line_num, str(e)) for line_num, _ in valid]
+        errors = sorted(invalid + errors)
+        for line_num, message in errors:
+            yield {"line": line_num, "error": message}
+
+        processed += len(batch)
+        created += len(instances)
+        failed += len(errors)
+        yield {"batch": batch_num, "processed": processed, "created": created, "errors": failed}
+
+    yield {"done": True, "processed": processed, "created": created, "errors": failed}
@@ -0,0 +1,219 @@
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from functools import lru_cache
+from inspect import isawaitable
+from threading import Lock
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+from graphql import get_named_type, is_leaf_type
+
+from .persisted_queries import persisted_operation_names
+
+DEBUG_HEADER = "HTTP_X_CRM_DEBUG"
+
+# Histogram bucket upper bounds.
+DURATION_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+SQL_COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200)
+
+# Label of the operations outside the known set, which keeps the number of
+# series bounded whatever operationName clients send.
+OTHER_OPERATION = "other"
+
+
+# ----------------------------
+# Per-operation trace
+# ----------------------------
+class OperationTrace:
+    """
+    Resolver timings and SQL statements of one GraphQL operation.
+
+    Install it as a ``connection.execute_wrapper`` to count statements, and
+    attach it to the request as ``crm_trace`` for
+    :class:`ResolverTimingMiddleware` to record into.
+    """
+
+    def __init__(self, operation_name=None):
+        self.operation_name = operation_name or "anonymous"
+        self.started = time.perf_counter()
+        self.duration = None
+        self.resolvers = defaultdict(lambda: [0, 0.0, 0.0])
+        self.sql_count = 0
+        self.sql_time = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql_count += 1
+            self.sql_time += time.perf_counter() - start
+
+    def record_resolver(self, key, elapsed):
+        stats = self.resolvers[key]
+        stats[0] += 1
+        stats[1] += elapsed
+        stats[2] = max(stats[2], elapsed)
+
+    def finish(self):
+        if self.duration is None:
+            self.duration = time.perf_counter() - self.started
+        return self
+
+    def as_extensions(self):
+        self.finish()
+        return {
+            "timing": {
+                "operation": self.operation_name,
+                "durationMs": round(self.duration * 1000, 3),
+                "sql": {"count": self.sql_count, "durationMs": round(self.sql_time * 1000, 3)},
+                "resolvers": {
+                    key: {
+                        "count": count,
+                        "totalMs": round(total * 1000, 3),
+                        "maxMs": round(longest * 1000, 3),
+                    }
+                    for key, (count, total, longest) in sorted(
+                        self.resolvers.items(), key=lambda item: -item[1][1]
+                    )
+                },
+            }
+        }
+
+
+def wants_extensions(request):
+    return request.META.get(DEBUG_HEADER, "").lower() in ("1", "true", "yes")
+
+
+class ResolverTimingMiddleware:
+    """
+    Graphene middleware timing root and object-valued fields.
+
+    Scalar fields below the root and the ``edges``/``node`` plumbing of
+    connections resolve from attributes and are not timed, which keeps the
+    overhead off the hot path. Awaitable results are timed until they
+    complete. Does nothing when the context carries no ``crm_trace``.
+    """
+
+    def resolve(self, next, root, info, **args):
+        trace = getattr(info.context, "crm_trace", None)
+        if trace is None or (root is not None and (
+            is_leaf_type(get_named_type(info.return_type))
+            or info.parent_type.name.endswith(("Connection", "Edge"))
+        )):
+            return next(root, info, **args)
+        key = f"{info.parent_type.name}.{info.field_name}"
+        start = time.perf_counter()
+        try:
+            result = next(root, info, **args)
+        except Exception:
+            trace.record_resolver(key, time.perf_counter() - start)
+            raise
+        if isawaitable(result):
+            return self._await(result, trace, key, start)
+        trace.record_resolver(key, time.perf_counter() - start)
+        return result
+
+    async def _await(self, result, trace, key, start):
+        try:
+            return await result
+        finally:
+            trace.record_resolver(key, time.perf_counter() - start)
+
+
+# ----------------------------
+# Aggregated metrics
+# ----------------------------
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+    def samples(self, name, labels):
+        label_text = ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items())
+        prefix = label_text + "," if label_text else ""
+        cumulative = 0
+        for bound, count in zip((*self.buckets, "+Inf"), self.counts):
+            cumulative += count
+            yield f'{name}_bucket{{{prefix}le="{bound}"}} {cumulative}'
+        yield f"{name}_sum{{{label_text}}} {self.sum:.3f}"
+        yield f"{name}_count{{{label_text}}} {cumulative}"
+
+
+@lru_cache(maxsize=None)
+def known_operations():
+    """``CRM_METRICS_OPERATIONS`` plus the operations of the persisted queries."""
+    return frozenset(getattr(settings, "CRM_METRICS_OPERATIONS", ())) | persisted_operation_names()
+
+
+def operation_label(name):
+    return name if name == "anonymous" or name in known_operations() else OTHER_OPERATION
+
+
+class MetricsRegistry:
+    """
+    Process-wide histograms of operation time, SQL count and resolver time.
+
+    Operations are labelled by name only when known (see
+    :func:`operation_label`); the rest share the ``other`` series.
+    """
+
+    def __init__(self):
+        self.lock = Lock()
+        self.reset()
+
+    def reset(self):
+        self.operations = defaultdict(lambda: Histogram(DURATION_BUCKETS_MS))
+        self.sql_counts = defaultdict(lambda: Histogram(SQL_COUNT_BUCKETS))
+        self.resolvers = defaultdict(lambda: Histogram(DURATION_BUCKETS_MS))
+
+    def observe(self, trace):
+        trace.finish()
+        label = operation_label(trace.operation_name)
+        with self.lock:
+            self.operations[label].observe(trace.duration * 1000)
+            self.sql_counts[label].observe(trace.sql_count)
+            for key, (count, total, _) in trace.resolvers.items():
+                # One observation per field and operation, of its mean latency.
+                self.resolvers[key].observe(total / count * 1000)
+
+    def render(self):
+        """Return the histograms in the Prometheus text exposition format."""
+        families = (
+            ("crm_graphql_operation_duration_ms", "operation", self.operations),
+            ("crm_graphql_operation_sql_statements", "operation", self.sql_counts),
+            ("crm_graphql_resolver_duration_ms", "field", self.resolvers),
+        )
+        lines = []
+        with self.lock:
+            for name, label, histograms in families:
+                lines.append(f"# TYPE {name} histogram")
+                for value, histogram in sorted(histograms.items()):
+                    lines.extend(histogram.samples(name, {label: value}))
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry()
+
+
+def metrics_view(request):
+    """Expose :data:`metrics` to staff, ``CRM_METRICS_ALLOWED_IPS`` or in DEBUG."""
+    user = getattr(request, "user", None)
+    allowed = (
+        settings.DEBUG
+        or (user is not None and user.is_staff)
+        or request.META.get("REMOTE_ADDR") in getattr(settings, "CRM_METRICS_ALLOWED_IPS", ())
+    )
+    if not allowed:
+        return HttpResponseForbidden()
+    return HttpResponse(metrics.render(), content_type="text/plain; version=0.0.4")
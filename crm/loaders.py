@@ -0,0 +1,144 @@
+from collections import defaultdict
+
+from .models import Customer, Order
+
+
+# ----------------------------
+# Batching loader
+# ----------------------------
+class DataLoader:
+    """
+    Synchronous, per-request batching loader.
+
+    Keys are queued with ``enqueue()`` (usually for every node of a
+    connection page) and fetched together by ``batch_load_fn`` the first
+    time any of them is requested through ``load()``.
+    """
+
+    def __init__(self, batch_load_fn):
+        self.batch_load_fn = batch_load_fn
+        self._cache = {}
+        self._queue = {}
+
+    def prime(self, key, value):
+        self._cache.setdefault(key, value)
+
+    def enqueue(self, keys):
+        for key in keys:
+            if key not in self._cache:
+                self._queue[key] = None
+
+    def dispatch(self):
+        keys, self._queue = list(self._queue), {}
+        if keys:
+            values = self.batch_load_fn(keys)
+            self._cache.update(zip(keys, values))
+
+    def load(self, key):
+        if key not in self._cache:
+            self.enqueue([key])
+            self.dispatch()
+        return self._cache.get(key)
+
+    def load_many(self, keys):
+        self.enqueue(keys)
+        self.dispatch()
+        return [self._cache.get(key) for key in keys]
+
+
+# ----------------------------
+# Per-request loader registry
+# ----------------------------
+class Loaders:
+    """DataLoaders for the CRM relations, shared by one GraphQL request."""
+
+    def __init__(self):
+        self.customer = DataLoader(self._load_customers)
+        self.order_products = DataLoader(self._load_order_products)
+        self.customer_orders = DataLoader(self._load_customer_orders)
+        self.product_orders = DataLoader(self._load_product_orders)
+        self._filtered = {}
+        # Primary keys of every node seen in this request, per model.
+        self._seen = defaultdict(set)
+
+    def enqueue_for(self, instances):
+        """
+        Queue the relation keys of a page of nodes so they load together.
+
+        Relations already fetched by ``select_related``/``prefetch_related``
+        prime the loaders instead, and deferred columns are never touched.
+        """
+        for instance in instances:
+            self._seen[instance._meta.concrete_model].add(instance.pk)
+            if isinstance(instance, Order):
+                if Order.customer.is_cached(instance):
+                    self.customer.prime(instance.customer_id, instance.customer)
+                    # Joined customers are nodes too: queue their orders.
+                    self.enqueue_for([instance.customer])
+                elif "customer_id" not in instance.get_deferred_fields():
+                    self.customer.enqueue([instance.customer_id])
+                self._enqueue_many(self.order_products, instance, "products")
+            elif isinstance(instance, Customer):
+                self._enqueue_many(self.customer_orders, instance, "orders")
+            else:
+                self._enqueue_many(self.product_orders, instance, "orders")
+
+    def load_filtered(self, key, batch_load_fn, instance):
+        """
+        Load a filtered relation of ``instance`` through the loader ``key``
+        (the relation and its filter arguments) names, created on first use
+        with ``batch_load_fn``. Every node of the same model seen in this
+        request is loaded in the same batch.
+        """
+        loader = self._filtered.get(key)
+        if loader is None:
+            loader = self._filtered[key] = DataLoader(batch_load_fn)
+        if instance.pk not in loader._cache:
+            loader.enqueue(self._seen[instance._meta.concrete_model])
+        return loader.load(instance.pk)
+
+    def _enqueue_many(self, loader, instance, relation):
+        prefetched = getattr(instance, "_prefetched_objects_cache", {})
+        if relation in prefetched:
+            loader.prime(instance.pk, list(prefetched[relation]))
+        else:
+            loader.enqueue([instance.pk])
+
+    def _load_customers(self, keys):
+        customers = Customer.objects.in_bulk(keys)
+        self.enqueue_for(customers.values())
+        return [customers.get(key) for key in keys]
+
+    def _load_order_products(self, keys):
+        products = defaultdict(list)
+        rows = Order.products.through.objects.filter(order_id__in=keys).select_related("product")
+        for row in rows.order_by("pk"):
+            products[row.order_id].append(row.product)
+        return [products[key] for key in keys]
+
+    def _load_customer_orders(self, keys):
+        orders = defaultdict(list)
+        for order in Order.objects.filter(customer_id__in=keys).order_by("pk"):
+            orders[order.customer_id].append(order)
+        self.enqueue_for(o for group in orders.values() for o in group)
+        return [orders[key] for key in keys]
+
+    def _load_product_orders(self, keys):
+        orders = defaultdict(list)
+        rows = Order.products.through.objects.filter(product_id__in=keys).select_related("order")
+        for row in rows.order_by("order_id"):
+            orders[row.product_id].append(row.order)
+        self.enqueue_for(o for group in orders.values() for o in group)
+        return [orders[key] for key in keys]
+
+
+def get_loaders(info):
+    """Return the loaders bound to the current request context."""
+    context = info.context
+    if context is None:
+        return Loaders()
+    loaders = getattr(context, "crm_loaders", None)
+    if loaders is None:
+        loaders = Loaders()
+        setattr(context, "crm_loaders", loaders)
+    return loaders
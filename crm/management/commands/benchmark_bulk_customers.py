@@ -0,0 +1,58 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from alx_backend_graphql_crm.schema import schema
+
+MUTATION = """
+mutation($input: [CustomerInput]!, $chunkSize: Int) {
+  bulkCreateCustomers(input: $input, chunkSize: $chunkSize) {
+    customers { id }
+    errors
+  }
+}
+"""
+
+
+class Command(BaseCommand):
+    help = "Measure SQL statements per row of the bulkCreateCustomers mutation (rolled back)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=10000)
+        parser.add_argument("--chunk-size", type=int, default=None)
+        parser.add_argument("--duplicates", type=float, default=0.1,
+                            help="Fraction of rows repeating an earlier email")
+
+    def handle(self, *args, **options):
+        rows = options["rows"]
+        repeat_every = int(1 / options["duplicates"]) if options["duplicates"] else 0
+        customers = []
+        for i in range(rows):
+            n = i - 1 if repeat_every and i and i % repeat_every == 0 else i
+            customers.append({
+                "name": f"Bench Customer {i}",
+                "email": f"bench-{n}@example.com",
+                "phone": "123-456-7890" if i % 2 else "",
+            })
+
+        with transaction.atomic():
+            with CaptureQueriesContext(connection) as queries:
+                start = time.perf_counter()
+                result = schema.execute(
+                    MUTATION,
+                    variable_values={"input": customers, "chunkSize": options["chunk_size"]},
+                )
+                elapsed = time.perf_counter() - start
+            transaction.set_rollback(True)
+
+        if result.errors:
+            raise result.errors[0]
+        data = result.data["bulkCreateCustomers"]
+        statements = len(queries.captured_queries)
+        self.stdout.write(
+            f"rows={rows} created={len(data['customers'])} errors={len(data['errors'])} "
+            f"statements={statements} statements/row={statements / max(rows, 1):.4f} "
+            f"elapsed={elapsed:.3f}s"
+        )
@@ -0,0 +1,46 @@
+import os
+import tempfile
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from crm.benchmarks import BASELINE_PRAGMAS, copy_database, run_db_workload
+from crm.database import sqlite_pragmas
+
+
+class Command(BaseCommand):
+    help = (
+        "Run concurrent order reads and writes against a copy of the SQLite database, "
+        "before and after the crm.database connection tuning."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--readers", type=int, default=4)
+        parser.add_argument("--writers", type=int, default=2)
+        parser.add_argument("--duration", type=float, default=5.0, help="Seconds per phase")
+
+    def handle(self, *args, **options):
+        if connection.vendor != "sqlite":
+            raise CommandError("benchmark_db measures SQLite connection settings only")
+
+        phases = (
+            ("baseline", BASELINE_PRAGMAS, False),
+            ("tuned", sqlite_pragmas(), True),
+        )
+        with tempfile.TemporaryDirectory() as directory:
+            for name, pragmas, persistent in phases:
+                # A fresh copy per phase, so the tuned run does not start on
+                # rows written by the baseline one.
+                path = os.path.join(directory, f"{name}.sqlite3")
+                copy_database(path)
+                summary = run_db_workload(
+                    path, pragmas, persistent,
+                    readers=options["readers"],
+                    writers=options["writers"],
+                    duration=options["duration"],
+                )
+                for kind, stats in summary.items():
+                    self.stdout.write(
+                        f"{name:<9} {kind:<5} ops/s={stats['ops_per_s']:<9} "
+                        f"p50={stats['p50_ms']}ms p95={stats['p95_ms']}ms locked={stats['locked']}"
+                    )
@@ -0,0 +1,54 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from alx_backend_graphql_crm.schema import schema
+from crm.benchmarks import build_catalog, compare, load_baseline, run_catalog, save_baseline
+from crm.models import Customer, Order, OrderItem, Product
+
+
+class Command(BaseCommand):
+    help = (
+        "Run the GraphQL operation catalog (every filter, deep pagination, every mutation) "
+        "and report latency percentiles, SQL statements and peak memory."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--iterations", type=int, default=20)
+        parser.add_argument("--warmup", type=int, default=2)
+        parser.add_argument("--page-size", type=int, default=20)
+        parser.add_argument("--deep-pages", type=int, default=50)
+        parser.add_argument("--only", action="append", help="Run operations whose name contains this")
+        parser.add_argument("--baseline", help="Compare against this baseline JSON file")
+        parser.add_argument("--tolerance", type=float, default=0.25,
+                            help="Allowed p95 slowdown over the baseline (fraction)")
+        parser.add_argument("--save-baseline", help="Write the results to this baseline JSON file")
+
+    def handle(self, *args, **options):
+        dataset = {
+            "customers": Customer.objects.count(),
+            "products": Product.objects.count(),
+            "orders": Order.objects.count(),
+            "order_items": OrderItem.objects.count(),
+        }
+        self.stdout.write(f"Dataset: {dataset}")
+        self.stdout.write(f"{'operation':40} {'p50':>9} {'p95':>9} {'p99':>9} {'sql':>5} {'peak KiB':>9}")
+
+        def log(name, stats):
+            self.stdout.write(
+                f"{name:40} {stats['p50_ms']:9.2f} {stats['p95_ms']:9.2f} {stats['p99_ms']:9.2f} "
+                f"{stats['sql']:5d} {stats['peak_kib']:9.1f}"
+            )
+
+        catalog = build_catalog(schema, page_size=options["page_size"], deep_pages=options["deep_pages"])
+        results = run_catalog(
+            schema, catalog, iterations=options["iterations"], warmup=options["warmup"],
+            only=options["only"], log=log,
+        )
+
+        if options["save_baseline"]:
+            save_baseline(options["save_baseline"], results, dataset)
+            self.stdout.write(f"Baseline written to {options['save_baseline']}")
+        if options["baseline"]:
+            regressions = compare(results, load_baseline(options["baseline"]), options["tolerance"])
+            if regressions:
+                raise CommandError("Regressions against the baseline:\n  " + "\n  ".join(regressions))
+            self.stdout.write(self.style.SUCCESS("No regressions against the baseline"))
@@ -0,0 +1,44 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from crm.benchmarks import generate_dataset
+from crm.rollups import rebuild_daily_revenue
+from crm.search import get_backend
+
+
+class Command(BaseCommand):
+    help = "Append a synthetic customers/products/orders dataset for benchmarking."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--customers", type=int, default=10000)
+        parser.add_argument("--products", type=int, default=1000)
+        parser.add_argument("--orders", type=int, default=50000)
+        parser.add_argument("--items-per-order", type=int, default=3)
+        parser.add_argument("--days", type=int, default=365, help="Spread of order dates")
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--skip-indexes", action="store_true",
+                            help="Do not rebuild the search index and revenue rollup tables")
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        ranges = generate_dataset(
+            options["customers"],
+            options["products"],
+            options["orders"],
+            items_per_order=options["items_per_order"],
+            days=options["days"],
+            batch_size=options["batch_size"],
+            seed=options["seed"],
+            log=lambda message: self.stdout.write(message, ending="\r"),
+        )
+        self.stdout.write("")
+        if not options["skip_indexes"]:
+            self.stdout.write("Rebuilding search index and revenue rollup tables...")
+            get_backend().rebuild(connection)
+            rebuild_daily_revenue()
+        self.stdout.write(self.style.SUCCESS(
+            f"Generated {ranges} in {time.perf_counter() - start:.1f}s"
+        ))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from crm.search import get_backend
+
+
+class Command(BaseCommand):
+    help = "Recreate the customer/product search index and its triggers."
+
+    def handle(self, *args, **options):
+        backend = get_backend()
+        with transaction.atomic():
+            backend.install(connection)
+            backend.rebuild(connection)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt search index ({type(backend).__name__})"))
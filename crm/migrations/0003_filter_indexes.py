@@ -0,0 +1,94 @@
+# Generated by Django 5.2.4 on 2026-10-17 04:28
+
+import django.db.models.functions.comparison
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+def uses_trigrams(connection):
+    path = getattr(settings, "CRM_SEARCH_BACKEND", None)
+    if path:
+        return path.rsplit(".", 1)[-1] == "TrigramSearchBackend"
+    return connection.vendor != "sqlite"
+
+
+def index_names(apps, schema_editor):
+    # Only the trigram backend reads this table; switching to it later fills
+    # it through ``rebuild_search_index``.
+    if not uses_trigrams(schema_editor.connection):
+        return
+    NameTrigram = apps.get_model("crm", "NameTrigram")
+    rows = []
+    for model_name, fields in (("customer", ("name", "email")), ("product", ("name",))):
+        model = apps.get_model("crm", model_name)
+        for obj in model.objects.only("pk", *fields).iterator(chunk_size=2000):
+            for field in fields:
+                value = (getattr(obj, field) or "").lower()
+                rows += [
+                    NameTrigram(source=f"crm.{model_name}.{field}", trigram=trigram, object_id=obj.pk)
+                    for trigram in {value[i:i + 3] for i in range(len(value) - 2)}
+                ]
+            # Flush every few thousand rows so memory stays flat on large tables.
+            if len(rows) >= 10000:
+                NameTrigram.objects.bulk_create(rows, batch_size=1000)
+                rows = []
+    NameTrigram.objects.bulk_create(rows, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crm', '0002_orderitem'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NameTrigram',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(max_length=40)),
+                ('trigram', models.CharField(max_length=3)),
+                ('object_id', models.BigIntegerField()),
+            ],
+        ),
+        migrations.AddField(
+            model_name='customer',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(fields=['created_at'], name='crm_customer_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(django.db.models.functions.comparison.Collate('phone', 'NOCASE'), name='crm_customer_phone_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['order_date', 'id'], name='crm_order_date_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['total_amount'], name='crm_order_total_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['price'], name='crm_product_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['stock'], name='crm_product_stock_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='nametrigram',
+            index=models.Index(fields=['source', 'trigram', 'object_id'], name='crm_trigram_lookup_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='nametrigram',
+            index=models.Index(fields=['object_id', 'source'], name='crm_trigram_object_idx'),
+        ),
+        migrations.RunPython(index_names, migrations.RunPython.noop),
+    ]
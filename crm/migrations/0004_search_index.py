@@ -0,0 +1,66 @@
+from django.conf import settings
+from django.db import migrations
+
+# Indexed columns per table, as of this migration.
+FTS_COLUMNS = {
+    "crm_customer": ("name", "email"),
+    "crm_product": ("name",),
+}
+
+
+def uses_fts(connection):
+    path = getattr(settings, "CRM_SEARCH_BACKEND", None)
+    if path:
+        return path.rsplit(".", 1)[-1] == "SQLiteFTSSearchBackend"
+    return connection.vendor == "sqlite"
+
+
+def install_fts(apps, schema_editor):
+    # External-content FTS5 tables kept in sync by triggers; the update
+    # trigger only fires for the indexed columns, so stock changes leave the
+    # index alone. Other backends are installed by ``rebuild_search_index``.
+    connection = schema_editor.connection
+    if connection.vendor != "sqlite" or not uses_fts(connection):
+        return
+    qn = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        for source, columns in FTS_COLUMNS.items():
+            table = f"{source}_fts"
+            names = ", ".join(qn(column) for column in columns)
+            new = ", ".join(f"new.{qn(column)}" for column in columns)
+            old = ", ".join(f"old.{qn(column)}" for column in columns)
+            delete = f"INSERT INTO {qn(table)}({qn(table)}, rowid, {names}) VALUES ('delete', old.\"id\", {old});"
+            insert = f"INSERT INTO {qn(table)}(rowid, {names}) VALUES (new.\"id\", {new});"
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE {qn(table)} USING fts5({names}, "
+                f"content='{source}', content_rowid='id', tokenize='trigram')"
+            )
+            cursor.execute(f"CREATE TRIGGER {qn(table + '_ai')} AFTER INSERT ON {qn(source)} BEGIN {insert} END")
+            cursor.execute(f"CREATE TRIGGER {qn(table + '_ad')} AFTER DELETE ON {qn(source)} BEGIN {delete} END")
+            cursor.execute(
+                f"CREATE TRIGGER {qn(table + '_au')} AFTER UPDATE OF {names} ON {qn(source)} "
+                f"BEGIN {delete} {insert} END"
+            )
+            cursor.execute(f"INSERT INTO {qn(table)}({qn(table)}) VALUES ('rebuild')")
+
+
+def drop_fts(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    with schema_editor.connection.cursor() as cursor:
+        for source in FTS_COLUMNS:
+            table = f"{source}_fts"
+            for suffix in ("_ai", "_ad", "_au"):
+                cursor.execute(f'DROP TRIGGER IF EXISTS "{table}{suffix}"')
+            cursor.execute(f'DROP TABLE IF EXISTS "{table}"')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crm', '0003_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(install_fts, drop_fts),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.4 on 2026-10-17 04:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crm', '0004_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyRevenue',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('dimension', models.CharField(choices=[('all', 'All orders'), ('product', 'Product'), ('customer', 'Customer')], default='all', max_length=10)),
+                ('object_id', models.BigIntegerField(default=0)),
+                ('order_count', models.PositiveIntegerField(default=0)),
+                ('quantity', models.PositiveIntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('dimension', 'object_id', 'day'), name='crm_daily_revenue_unique')],
+            },
+        ),
+    ]
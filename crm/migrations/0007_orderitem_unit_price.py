@@ -0,0 +1,30 @@
+# Generated by Django 5.2.4 on 2026-10-17 05:19
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def backfill_unit_price(apps, schema_editor):
+    # The price charged was not recorded before; the current price is the
+    # best estimate for existing rows.
+    OrderItem = apps.get_model("crm", "OrderItem")
+    Product = apps.get_model("crm", "Product")
+    OrderItem.objects.update(
+        unit_price=Subquery(Product.objects.filter(pk=OuterRef("product_id")).values("price")[:1])
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crm', '0005_daily_revenue'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='orderitem',
+            name='unit_price',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=10),
+        ),
+        migrations.RunPython(backfill_unit_price, migrations.RunPython.noop),
+    ]
@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models.functions import Collate
 from django.core.validators import MinValueValidator, RegexValidator
 
 # Create your models here.
@@ -15,6 +16,15 @@ class Customer(models.Model):
             )
         ]
     )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["created_at"], name="crm_customer_created_idx"),
+            # phone_pattern is a case-insensitive LIKE 'x%', which SQLite can
+            # only answer from a NOCASE index.
+            models.Index(Collate("phone", "NOCASE"), name="crm_customer_phone_idx"),
+        ]
 
     def __str__(self):
         return self.name
@@ -29,21 +39,93 @@ class Product(models.Model):
     )
     stock = models.PositiveIntegerField(default=0)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["price"], name="crm_product_price_idx"),
+            models.Index(fields=["stock"], name="crm_product_stock_idx"),
+        ]
+
     def __str__(self):
         return self.name
 
 
 class Order(models.Model):
     customer = models.ForeignKey(Customer, on_delete=models.CASCADE, related_name="orders")
-    products = models.ManyToManyField(Product, related_name="orders")
+    products = models.ManyToManyField(Product, through="OrderItem", related_name="orders")
     total_amount = models.DecimalField(max_digits=10, decimal_places=2, default=0.00)
     order_date = models.DateTimeField(auto_now_add=True)
 
-    def save(self, *args, **kwargs):
-        # Calculate total_amount from products
-        if self.pk is None:
-            self.total_amount = sum(p.price for p in self.products.all())
-        super().save(*args, **kwargs)
+    class Meta:
+        indexes = [
+            models.Index(fields=["order_date", "id"], name="crm_order_date_id_idx"),
+            models.Index(fields=["total_amount"], name="crm_order_total_idx"),
+        ]
 
     def __str__(self):
         return f"Order {self.id} - {self.customer.name}"
+
+
+class OrderItem(models.Model):
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name="items")
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="order_items")
+    quantity = models.PositiveIntegerField(default=1, validators=[MinValueValidator(1)])
+    # Price charged per unit when the order was placed, so revenue history
+    # does not follow later price changes.
+    unit_price = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+
+    class Meta:
+        # Keeps the table of the former auto-created ManyToMany through model.
+        db_table = "crm_order_products"
+        unique_together = [("order", "product")]
+
+    def __str__(self):
+        return f"{self.quantity} x {self.product.name}"
+
+
+class NameTrigram(models.Model):
+    """
+    Trigram lookup rows for the search argument and the ``*_icontains``
+    filters, maintained only while ``TrigramSearchBackend`` is in use.
+
+    ``source`` names the indexed column (e.g. ``crm.customer.name``) and
+    every lowercase three-character substring of its value gets a row, so
+    substring matches can be narrowed through an index before the ``LIKE``.
+    """
+    source = models.CharField(max_length=40)
+    trigram = models.CharField(max_length=3)
+    object_id = models.BigIntegerField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["source", "trigram", "object_id"], name="crm_trigram_lookup_idx"),
+            models.Index(fields=["object_id", "source"], name="crm_trigram_object_idx"),
+        ]
+
+
+class DailyRevenue(models.Model):
+    """
+    Revenue rolled up per day, for all orders or for one product or customer.
+
+    ``dimension`` is ``all``, ``product`` or ``customer`` and ``object_id``
+    the product or customer pk (``0`` for ``all``), so a date range costs
+    at most one row per day and dimension value.
+    """
+    ALL = "all"
+    PRODUCT = "product"
+    CUSTOMER = "customer"
+    DIMENSIONS = [(ALL, "All orders"), (PRODUCT, "Product"), (CUSTOMER, "Customer")]
+
+    day = models.DateField()
+    dimension = models.CharField(max_length=10, choices=DIMENSIONS, default=ALL)
+    object_id = models.BigIntegerField(default=0)
+    order_count = models.PositiveIntegerField(default=0)
+    quantity = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["dimension", "object_id", "day"], name="crm_daily_revenue_unique"),
+        ]
+
+    def __str__(self):
+        return f"{self.day} {self.dimension} {self.object_id}: {self.revenue}"
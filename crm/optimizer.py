@@ -0,0 +1,103 @@
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch
+from graphene.utils.str_converters import to_snake_case
+from graphql import get_named_type
+from graphql.execution.collect_fields import collect_sub_fields
+
+PAGINATION_ARGS = {"first", "last", "before", "after", "offset"}
+
+
+def optimize_queryset(queryset, info):
+    """
+    Shape a connection queryset after the GraphQL selection set.
+
+    Only the requested columns are loaded, forward relations are joined with
+    ``select_related`` and nested connections are fetched through
+    ``Prefetch`` querysets restricted the same way. The result is still a
+    lazy queryset, so filtering and pagination apply afterwards.
+    """
+    node_type, node_fields = _connection_nodes(info, info.return_type, info.field_nodes)
+    if not node_fields:
+        return queryset
+    return _optimize(queryset, info, node_type, node_fields)
+
+
+def _optimize(queryset, info, gql_type, field_nodes, required=()):
+    only, select, prefetch = _plan(info, queryset.model, gql_type, field_nodes)
+    queryset = queryset.only(*only, *required)
+    if select:
+        queryset = queryset.select_related(*select)
+    if prefetch:
+        queryset = queryset.prefetch_related(*prefetch)
+    return queryset
+
+
+def _plan(info, model, gql_type, field_nodes, prefix=""):
+    only, select, prefetch = [prefix + model._meta.pk.name], [], []
+
+    for nodes in _sub_fields(info, gql_type, field_nodes).values():
+        gql_name = nodes[0].name.value
+        try:
+            field = model._meta.get_field(to_snake_case(gql_name))
+        except FieldDoesNotExist:
+            continue
+        lookup = prefix + field.name
+        field_type = gql_type.fields[gql_name].type
+
+        if field.many_to_one or (field.one_to_one and field.concrete):
+            only.append(lookup)
+            select.append(lookup)
+            sub_only, sub_select, sub_prefetch = _plan(
+                info, field.related_model, get_named_type(field_type), nodes, lookup + "__"
+            )
+            only += sub_only
+            select += sub_select
+            prefetch += sub_prefetch
+        elif field.many_to_many or field.one_to_many:
+            # Filtered nested connections are batched by their own loader.
+            if _has_filter_arguments(nodes):
+                continue
+            node_type, node_fields = _connection_nodes(info, field_type, nodes)
+            related = field.related_model._default_manager.all()
+            if node_fields:
+                # Reverse foreign keys need their join column to be matched.
+                required = [field.field.name] if field.one_to_many else []
+                related = _optimize(related, info, node_type, node_fields, required)
+            prefetch.append(Prefetch(lookup, queryset=related))
+        elif field.concrete:
+            only.append(lookup)
+
+    return only, select, prefetch
+
+
+def _connection_nodes(info, connection_type, field_nodes):
+    """Return the node type and the ``edges { node }`` field nodes of a connection."""
+    connection_type = get_named_type(connection_type)
+    edges_field = getattr(connection_type, "fields", {}).get("edges")
+    if edges_field is None:
+        return None, []
+    edge_type = get_named_type(edges_field.type)
+    node_type = get_named_type(edge_type.fields["node"].type)
+
+    node_fields = []
+    for edges in _sub_fields(info, connection_type, field_nodes).values():
+        if edges[0].name.value != "edges":
+            continue
+        for nodes in _sub_fields(info, edge_type, edges).values():
+            if nodes[0].name.value == "node":
+                node_fields += nodes
+    return node_type, node_fields
+
+
+def _sub_fields(info, gql_type, field_nodes):
+    return collect_sub_fields(
+        info.schema, info.fragments, info.variable_values, gql_type, field_nodes
+    )
+
+
+def _has_filter_arguments(field_nodes):
+    return any(
+        argument.name.value not in PAGINATION_ARGS
+        for node in field_nodes
+        for argument in node.arguments
+    )
@@ -0,0 +1,117 @@
+import hashlib
+import json
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.cache import cache
+from graphql import GraphQLError, OperationDefinitionNode, parse, validate
+
+from graphene_django.settings import graphene_settings
+
+APQ_VERSION = 1
+CACHE_PREFIX = "crm:apq:"
+
+
+class PersistedQueryError(GraphQLError):
+    def __init__(self, message, code):
+        super().__init__(message, extensions={"code": code})
+
+
+def query_hash(query):
+    return hashlib.sha256(query.encode("utf-8")).hexdigest()
+
+
+# ----------------------------
+# Hash -> query registry
+# ----------------------------
+@lru_cache(maxsize=None)
+def _static_queries():
+    """Queries shipped with the deployment, from ``CRM_PERSISTED_QUERIES_FILE``."""
+    path = getattr(settings, "CRM_PERSISTED_QUERIES_FILE", None)
+    if not path:
+        return {}
+    with open(path) as f:
+        queries = json.load(f)
+    if isinstance(queries, list):
+        queries = {query_hash(query): query for query in queries}
+    return queries
+
+
+@lru_cache(maxsize=None)
+def persisted_operation_names():
+    """Names of the operations in the queries shipped with the deployment."""
+    names = set()
+    for query in _static_queries().values():
+        try:
+            document = parse(query)
+        except GraphQLError:
+            continue
+        names.update(
+            definition.name.value
+            for definition in document.definitions
+            if isinstance(definition, OperationDefinitionNode) and definition.name
+        )
+    return frozenset(names)
+
+
+def get_persisted_query(sha256_hash):
+    return _static_queries().get(sha256_hash) or cache.get(CACHE_PREFIX + sha256_hash)
+
+
+def register_persisted_query(query):
+    sha256_hash = query_hash(query)
+    if sha256_hash not in _static_queries():
+        timeout = getattr(settings, "CRM_PERSISTED_QUERIES_TIMEOUT", None)
+        cache.set(CACHE_PREFIX + sha256_hash, query, timeout)
+    return sha256_hash
+
+
+def resolve_query(query, extensions):
+    """
+    Apply the automatic persisted queries protocol to a request.
+
+    A request carrying ``extensions.persistedQuery.sha256Hash`` without a
+    query is answered from the registry; one carrying both registers the
+    query after checking the hash. Raises :class:`PersistedQueryError`.
+    """
+    persisted = (extensions or {}).get("persistedQuery")
+    if not persisted:
+        return query
+    if persisted.get("version") != APQ_VERSION:
+        raise PersistedQueryError("Unsupported persisted query version", "PERSISTED_QUERY_NOT_SUPPORTED")
+    sha256_hash = persisted.get("sha256Hash")
+
+    if query:
+        if query_hash(query) != sha256_hash:
+            raise PersistedQueryError("provided sha does not match query", "PERSISTED_QUERY_HASH_MISMATCH")
+        register_persisted_query(query)
+        return query
+
+    query = get_persisted_query(sha256_hash or "")
+    if query is None:
+        raise PersistedQueryError("PersistedQueryNotFound", "PERSISTED_QUERY_NOT_FOUND")
+    return query
+
+
+# ----------------------------
+# Parsed document cache
+# ----------------------------
+@lru_cache(maxsize=getattr(settings, "CRM_DOCUMENT_CACHE_SIZE", 256))
+def get_document(schema, query, validation_rules=None):
+    """
+    Parse and validate ``query`` once per schema and rule set.
+
+    Returns ``(document, errors)``; a syntax error yields ``(None, [error])``.
+    Entries are kept in an LRU of ``CRM_DOCUMENT_CACHE_SIZE`` documents.
+    """
+    try:
+        document = parse(query)
+    except GraphQLError as e:
+        return None, [e]
+    errors = validate(
+        schema,
+        document,
+        list(validation_rules) if validation_rules else None,
+        graphene_settings.MAX_VALIDATION_ERRORS,
+    )
+    return document, errors
@@ -0,0 +1,126 @@
+import asyncio
+import threading
+from collections import defaultdict
+from functools import lru_cache, partial
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+ORDER_CREATED = "crm.order_created"
+PRODUCT_STOCK_CHANGED = "crm.product_stock_changed"
+
+
+# ----------------------------
+# Backends
+# ----------------------------
+class PubSub:
+    """
+    Fan-out of JSON-serialisable messages to subscribers of a channel.
+
+    ``publish`` is synchronous and may be called from any thread;
+    ``subscribe`` is an async iterator for the life of a subscription.
+    """
+
+    def publish(self, channel, message):
+        raise NotImplementedError
+
+    async def subscribe(self, channel):
+        raise NotImplementedError
+        yield
+
+
+class InMemoryPubSub(PubSub):
+    """
+    Process-local pub/sub. Only subscribers of the publishing process are
+    reached; a subscriber that falls ``max_queue`` messages behind drops
+    the newest ones.
+    """
+
+    def __init__(self, max_queue=1000):
+        self.max_queue = max_queue
+        self._lock = threading.Lock()
+        self._subscribers = defaultdict(set)
+
+    def publish(self, channel, message):
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, ()))
+        for loop, queue in subscribers:
+            try:
+                loop.call_soon_threadsafe(_offer, queue, message)
+            except RuntimeError:
+                # The subscriber's event loop has closed.
+                pass
+
+    async def subscribe(self, channel):
+        entry = (asyncio.get_running_loop(), asyncio.Queue(self.max_queue))
+        with self._lock:
+            self._subscribers[channel].add(entry)
+        try:
+            while True:
+                yield await entry[1].get()
+        finally:
+            with self._lock:
+                self._subscribers[channel].discard(entry)
+
+
+def _offer(queue, message):
+    try:
+        queue.put_nowait(message)
+    except asyncio.QueueFull:
+        pass
+
+
+class ChannelLayerPubSub(PubSub):
+    """
+    Pub/sub over a Django Channels layer (e.g. ``channels_redis``), so events
+    reach subscribers in every process. Requires ``channels``.
+    """
+
+    def __init__(self, alias=None):
+        from channels.layers import DEFAULT_CHANNEL_LAYER, get_channel_layer
+
+        self.layer = get_channel_layer(alias or DEFAULT_CHANNEL_LAYER)
+
+    def publish(self, channel, message):
+        from asgiref.sync import async_to_sync
+
+        async_to_sync(self.layer.group_send)(channel, {"type": "crm.event", "message": message})
+
+    async def subscribe(self, channel):
+        name = await self.layer.new_channel()
+        await self.layer.group_add(channel, name)
+        try:
+            while True:
+                event = await self.layer.receive(name)
+                yield event["message"]
+        finally:
+            await self.layer.group_discard(channel, name)
+
+
+@lru_cache(maxsize=None)
+def get_pubsub():
+    """Return the ``CRM_PUBSUB_BACKEND`` instance, in-memory by default."""
+    path = getattr(settings, "CRM_PUBSUB_BACKEND", None)
+    if path:
+        return import_string(path)()
+    return InMemoryPubSub()
+
+
+# ----------------------------
+# Events
+# ----------------------------
+def publish(channel, message):
+    """Publish ``message`` once the current transaction commits."""
+    transaction.on_commit(partial(get_pubsub().publish, channel, message))
+
+
+def publish_orders_created(orders):
+    for order in orders:
+        publish(ORDER_CREATED, {"id": order.pk})
+
+
+def publish_stock_changes(stock):
+    """Publish ``{product_pk: new_stock}``."""
+    for pk, value in stock.items():
+        publish(PRODUCT_STOCK_CHANGED, {"id": pk, "stock": value})
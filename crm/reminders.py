@@ -0,0 +1,51 @@
+import json
+import os
+
+from graphql_relay import to_global_id
+
+LOG_FILE = "/tmp/order_reminders_log.txt"
+CHECKPOINT_FILE = "/tmp/order_reminders_checkpoint.json"
+
+
+def format_reminder(timestamp, order_id, order_date, customer_name, customer_email, amount):
+    return (
+        f"{timestamp} - Order ID: {order_id}, "
+        f"Date: {order_date or 'N/A'}, "
+        f"Customer: {customer_name} ({customer_email}), "
+        f"Amount: ${float(amount or 0):.2f}\n"
+    )
+
+
+def render_reminder(order, timestamp):
+    """Render the reminder line of an ``Order`` with its customer loaded."""
+    return format_reminder(
+        timestamp,
+        to_global_id("OrderType", order.pk),
+        order.order_date.isoformat(),
+        order.customer.name,
+        order.customer.email,
+        order.total_amount,
+    )
+
+
+def dispatch_reminders(lines, path=LOG_FILE):
+    """Append a batch of reminder lines with a single write."""
+    if lines:
+        with open(path, "a") as log_file:
+            log_file.write("".join(lines))
+
+
+def load_checkpoint(path=CHECKPOINT_FILE):
+    """Return the id of the last order already reminded of, or 0."""
+    try:
+        with open(path) as f:
+            return int(json.load(f).get("order_id") or 0)
+    except (FileNotFoundError, ValueError, TypeError, AttributeError):
+        return 0
+
+
+def save_checkpoint(order_id, path=CHECKPOINT_FILE):
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump({"order_id": order_id}, f)
+    os.replace(tmp, path)
@@ -0,0 +1,147 @@
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import connection, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import DailyRevenue, Order, OrderItem
+
+ZERO = Decimal("0.00")
+COUNTERS = ("order_count", "quantity", "revenue")
+
+
+def _totals():
+    return {"order_count": 0, "quantity": 0, "revenue": ZERO}
+
+
+# ----------------------------
+# Incremental updates
+# ----------------------------
+def record_orders(orders, lines, prices):
+    """
+    Add newly created orders to the daily rollup.
+
+    ``lines`` runs parallel to ``orders`` with ``{product pk: quantity}``
+    maps and ``prices`` maps product pks to the unit price charged. All
+    affected rows are upserted in one ``executemany``.
+    """
+    deltas = defaultdict(_totals)
+    for order, order_lines in zip(orders, lines):
+        day = timezone.localdate(order.order_date)
+        quantity = sum(order_lines.values())
+        for key in ((DailyRevenue.ALL, 0), (DailyRevenue.CUSTOMER, order.customer_id)):
+            row = deltas[(*key, day)]
+            row["order_count"] += 1
+            row["quantity"] += quantity
+            row["revenue"] += order.total_amount
+        for pk, line_quantity in order_lines.items():
+            row = deltas[(DailyRevenue.PRODUCT, pk, day)]
+            row["order_count"] += 1
+            row["quantity"] += line_quantity
+            row["revenue"] += prices[pk] * line_quantity
+    _upsert(deltas)
+
+
+def _upsert(deltas):
+    if not deltas:
+        return
+    qn = connection.ops.quote_name
+    opts = DailyRevenue._meta
+    table = qn(opts.db_table)
+    keys = ("dimension", "object_id", "day")
+    columns = [qn(opts.get_field(name).column) for name in keys + COUNTERS]
+    updates = ", ".join(f"{qn(name)} = {table}.{qn(name)} + excluded.{qn(name)}" for name in COUNTERS)
+    sql = (
+        f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join(['%s'] * len(columns))}) "
+        f"ON CONFLICT ({', '.join(qn(name) for name in keys)}) DO UPDATE SET {updates}"
+    )
+    fields = [opts.get_field(name) for name in keys + COUNTERS]
+    params = [
+        [field.get_db_prep_save(value, connection) for field, value in zip(fields, (*key, *[row[c] for c in COUNTERS]))]
+        for key, row in deltas.items()
+    ]
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, params)
+
+
+# ----------------------------
+# Rebuild
+# ----------------------------
+def rebuild_daily_revenue(start=None, end=None):
+    """
+    Recompute the rollup for days in ``[start, end]`` (all days by default).
+
+    Locks the rollup, deletes the affected rows and refills them from five
+    grouped queries over orders and items, all in one transaction, so a
+    concurrent :func:`record_orders` either lands before the aggregation
+    or after the commit and is never lost. Product revenue uses the unit
+    price charged on each item. Returns the number of rows written.
+    """
+    orders = Order.objects.all()
+    items = OrderItem.objects.all()
+    rows = DailyRevenue.objects.all()
+    if start is not None:
+        orders = orders.filter(order_date__date__gte=start)
+        items = items.filter(order__order_date__date__gte=start)
+        rows = rows.filter(day__gte=start)
+    if end is not None:
+        orders = orders.filter(order_date__date__lte=end)
+        items = items.filter(order__order_date__date__lte=end)
+        rows = rows.filter(day__lte=end)
+
+    with transaction.atomic():
+        _lock_rollup()
+        # On SQLite the DELETE takes the write lock before anything is read.
+        rows.delete()
+        totals = _aggregate(orders, items)
+        DailyRevenue.objects.bulk_create(
+            (
+                DailyRevenue(dimension=dimension, object_id=object_id, day=day, **counters)
+                for (dimension, object_id, day), counters in totals.items()
+            ),
+            batch_size=500,
+        )
+    return len(totals)
+
+
+def _lock_rollup():
+    # Blocks the record_orders upserts until the rebuild commits.
+    if connection.vendor == "postgresql":
+        with connection.cursor() as cursor:
+            cursor.execute(f"LOCK TABLE {connection.ops.quote_name(DailyRevenue._meta.db_table)} IN EXCLUSIVE MODE")
+
+
+def _aggregate(orders, items):
+    totals = defaultdict(_totals)
+    grouped_orders = orders.order_by().annotate(day=TruncDate("order_date"))
+    grouped_items = items.order_by().annotate(day=TruncDate("order__order_date"))
+
+    for row in grouped_orders.values("day").annotate(n=Count("pk"), total=Sum("total_amount")):
+        totals[(DailyRevenue.ALL, 0, row["day"])].update(order_count=row["n"], revenue=row["total"])
+    for row in grouped_items.values("day").annotate(units=Sum("quantity")):
+        totals[(DailyRevenue.ALL, 0, row["day"])]["quantity"] = row["units"]
+    for row in grouped_orders.values("day", "customer_id").annotate(n=Count("pk"), total=Sum("total_amount")):
+        totals[(DailyRevenue.CUSTOMER, row["customer_id"], row["day"])].update(
+            order_count=row["n"], revenue=row["total"]
+        )
+    for row in grouped_items.values("day", "order__customer_id").annotate(units=Sum("quantity")):
+        totals[(DailyRevenue.CUSTOMER, row["order__customer_id"], row["day"])]["quantity"] = row["units"]
+    for row in grouped_items.values("day", "product_id").annotate(
+        n=Count("order_id"), units=Sum("quantity"), total=Sum(F("quantity") * F("unit_price"))
+    ):
+        totals[(DailyRevenue.PRODUCT, row["product_id"], row["day"])].update(
+            order_count=row["n"], quantity=row["units"], revenue=row["total"]
+        )
+    return totals
+
+
+# ----------------------------
+# Range queries
+# ----------------------------
+def revenue_by_day(start, end, dimension=DailyRevenue.ALL, object_id=0):
+    """Return the rollup rows for one dimension value over ``[start, end]``."""
+    return DailyRevenue.objects.filter(
+        dimension=dimension, object_id=object_id, day__gte=start, day__lte=end
+    ).order_by("day")
@@ -1,13 +1,26 @@
-import re
 import graphene
 from graphene_django import DjangoObjectType
-from graphene_django.filter import DjangoFilterConnectionField
 from graphene import relay
 from django.db import transaction, IntegrityError
 from django.core.exceptions import ValidationError
-from django.utils import timezone
-from .models import Customer, Product, Order
+from .models import Customer, Product, Order, DailyRevenue
 from .filters import CustomerFilter, ProductFilter, OrderFilter
+from .fields import BatchedConnectionField, CountableConnection, KeysetConnectionField
+from .loaders import get_loaders
+from .bulk import (
+    StockConflict,
+    bulk_create_customers,
+    bulk_create_orders,
+    create_orders,
+    restock_products,
+)
+from .validators import validate_phone, validate_product
+from .optimizer import optimize_queryset
+from .search import search
+from .stats import crm_stats
+from .rollups import revenue_by_day
+from .async_graphql import async_capable, is_async
+from .pubsub import ORDER_CREATED, PRODUCT_STOCK_CHANGED, get_pubsub
 # from crm.models import Product
 
 
@@ -15,27 +28,85 @@ from .filters import CustomerFilter, ProductFilter, OrderFilter
 # GraphQL Object Types
 # ----------------------------
 class CustomerType(DjangoObjectType):
+    orders = BatchedConnectionField(lambda: OrderType)
+
     class Meta:
         model = Customer
-        fields = ("id", "name", "email", "phone")
+        fields = ("id", "name", "email", "phone", "orders")
         filterset_class = CustomerFilter
         interfaces = (relay.Node,)
+        connection_class = CountableConnection
+
+    def resolve_orders(root, info, **kwargs):
+        return get_loaders(info).customer_orders.load(root.pk)
 
 
 class ProductType(DjangoObjectType):
+    orders = BatchedConnectionField(lambda: OrderType)
+
     class Meta:
         model = Product
-        fields = ("id", "name", "price", "stock")
+        fields = ("id", "name", "price", "stock", "orders")
         filterset_class = ProductFilter
         interfaces = (relay.Node,)
+        connection_class = CountableConnection
+
+    def resolve_orders(root, info, **kwargs):
+        return get_loaders(info).product_orders.load(root.pk)
 
 
 class OrderType(DjangoObjectType):
+    products = BatchedConnectionField(ProductType)
+
     class Meta:
         model = Order
         fields = ("id", "customer", "products", "total_amount", "order_date")
         filterset_class = OrderFilter
         interfaces = (relay.Node,)
+        connection_class = CountableConnection
+
+    def resolve_customer(root, info):
+        return get_loaders(info).customer.load(root.customer_id)
+
+    def resolve_products(root, info, **kwargs):
+        return get_loaders(info).order_products.load(root.pk)
+
+
+# ----------------------------
+# Analytics Types
+# ----------------------------
+class StatsPeriod(graphene.Enum):
+    DAY = "day"
+    WEEK = "week"
+    MONTH = "month"
+
+
+class PeriodRevenueType(graphene.ObjectType):
+    period_start = graphene.DateTime()
+    order_count = graphene.Int()
+    revenue = graphene.Decimal()
+
+
+class ProductRevenueType(graphene.ObjectType):
+    product_id = graphene.ID()
+    product_name = graphene.String()
+    quantity = graphene.Int()
+    order_count = graphene.Int()
+    revenue = graphene.Decimal()
+
+
+class DailyRevenueType(DjangoObjectType):
+    class Meta:
+        model = DailyRevenue
+        fields = ("day", "order_count", "quantity", "revenue")
+
+
+class CrmStatsType(graphene.ObjectType):
+    customer_count = graphene.Int()
+    order_count = graphene.Int()
+    revenue = graphene.Decimal()
+    revenue_by_period = graphene.List(PeriodRevenueType)
+    revenue_by_product = graphene.List(ProductRevenueType)
 
 
 # =======================
@@ -56,6 +127,7 @@ class ProductInput(graphene.InputObjectType):
 class OrderInput(graphene.InputObjectType):
     customer_id = graphene.ID(required=True)
     product_ids = graphene.List(graphene.ID, required=True)
+    quantities = graphene.List(graphene.Int)
     order_date = graphene.DateTime()
 
 
@@ -71,56 +143,49 @@ class CreateCustomer(graphene.Mutation):
     message = graphene.String()
     errors = graphene.List(graphene.String)
 
-    def validate_phone(phone):
-        if not phone:
-            return True
-        pattern = r"^(\+\d{10,15}|\d{3}-\d{3}-\d{4})$"
-        return re.match(pattern, phone)
+    validate_phone = staticmethod(validate_phone)
 
     @classmethod
+    @async_capable
     def mutate(cls, root, info, input):
+        if is_async(info):
+            return cls.amutate(root, info, input)
         # Validate email uniqueness
         if Customer.objects.filter(email=input.email).exists():
-            errors.append("Email already exists")
+            return cls(customer=None, message="Email already exists")
 
         # Validate phone format
         if input.phone and not cls.validate_phone(input.phone):
             return cls(customer=None, message="Invalid phone format")
 
-        customer = Customer(name=input.name, email=input.email, phone=input.phone)
+        customer = Customer(name=input.name, email=input.email, phone=input.phone or "")
         customer.save()
         return cls(customer=customer, message="Customer created successfully")
 
+    @classmethod
+    async def amutate(cls, root, info, input):
+        if await Customer.objects.filter(email=input.email).aexists():
+            return cls(customer=None, message="Email already exists")
+        if input.phone and not cls.validate_phone(input.phone):
+            return cls(customer=None, message="Invalid phone format")
+        customer = Customer(name=input.name, email=input.email, phone=input.phone or "")
+        await customer.asave()
+        return cls(customer=customer, message="Customer created successfully")
+
 
 class BulkCreateCustomers(graphene.Mutation):
     class Arguments:
         input = graphene.List(CustomerInput, required=True)
+        chunk_size = graphene.Int()
 
     customers = graphene.List(CustomerType)
     errors = graphene.List(graphene.String)
 
     @classmethod
-    def mutate(cls, root, info, input):
-        created_customers = []
-        errors = []
-
-        with transaction.atomic():
-            for idx, customer_data in enumerate(input):
-                name = customer_data.name
-                email = customer_data.email
-                phone = customer_data.phone
-                if not name or not email:
-                    errors.append(f"Row {idx+1}: Name and email required")
-                    continue
-                if Customer.objects.filter(email=email).exists():
-                    errors.append(f"Row {idx+1}: Email already exists")
-                    continue
-                if phone and not CreateCustomer.validate_phone(phone):
-                    errors.append(f"Row {idx+1}: Invalid phone format")
-                    continue
-                customer = Customer(name=name, email=email, phone=phone)
-                customer.save()
-                created.append(customer)
+    def mutate(cls, root, info, input, chunk_size=None):
+        if chunk_size is not None and chunk_size < 1:
+            return cls(customers=[], errors=["Chunk size must be positive"])
+        created, errors = bulk_create_customers(input, chunk_size=chunk_size)
         return cls(customers=created, errors=errors)
 
 
@@ -131,15 +196,22 @@ class CreateProduct(graphene.Mutation):
     product = graphene.Field(ProductType)
     
     @classmethod
+    @async_capable
     def mutate(cls, root, info, input):
-        if input.price <= 0:
-            raise ValidationError("Price must be positive")
-        if input.stock is not None and input.stock < 0:
-            raise ValidationError("Stock cannot be negative")
+        error = validate_product(input.price, input.stock)
+        if error:
+            raise ValidationError(error)
         product = Product(name=input.name, price=input.price, stock=input.stock or 0)
+        if is_async(info):
+            return cls.asave(product)
         product.save()
         return cls(product=product)
 
+    @classmethod
+    async def asave(cls, product):
+        await product.asave()
+        return cls(product=product)
+
 
 class CreateOrder(graphene.Mutation):
     class Arguments:
@@ -150,39 +222,50 @@ class CreateOrder(graphene.Mutation):
 
     @classmethod
     def mutate(cls, root, info, input):
+        # Same stock reservation as bulkCreateOrders, so a single order
+        # cannot oversell either.
         try:
-            customer = Customer.objects.get(pk=input.customer_id)
-        except Customer.DoesNotExist:
-            return cls(order=None, message="Invalid customer ID")
-        products = Product.objects.filter(pk__in=input.product_ids)
-        if products.count() != len(input.product_ids):
-            return cls(order=None, message="One or more product IDs are invalid")
-        if not products:
-            return cls(order=None, message="At least one product must be selected")
-        order = Order(customer=customer, order_date=input.order_date or timezone.now())
-        order.save()
-        order.products.set(products)
-        total = sum([p.price for p in products])
-        order.total_amount = total
-        order.save()
-        return cls(order=order, message="Order created successfully")
+            with transaction.atomic():
+                orders, errors = create_orders([(1, input)], reserve_stock=True)
+        except StockConflict as e:
+            return cls(order=None, message=str(e))
+        if errors:
+            return cls(order=None, message=errors[0][1])
+        return cls(order=orders[0], message="Order created successfully")
+
+class BulkCreateOrders(graphene.Mutation):
+    class Arguments:
+        input = graphene.List(OrderInput, required=True)
+        chunk_size = graphene.Int()
+
+    orders = graphene.List(OrderType)
+    errors = graphene.List(graphene.String)
+
+    @classmethod
+    def mutate(cls, root, info, input, chunk_size=None):
+        if chunk_size is not None and chunk_size < 1:
+            return cls(orders=[], errors=["Chunk size must be positive"])
+        try:
+            created, errors = bulk_create_orders(input, chunk_size=chunk_size)
+        except StockConflict as e:
+            return cls(orders=[], errors=[str(e)])
+        get_loaders(info).enqueue_for(created)
+        return cls(orders=created, errors=errors)
+
 
 class UpdateLowStockProducts(graphene.Mutation):
     class Arguments:
-        pass
+        threshold = graphene.Int(default_value=10)
+        increment = graphene.Int(default_value=10)
 
     updated_products = graphene.List(ProductType)
     message = graphene.String()
 
     @classmethod
-    def mutate(cls, root, info):
-        low_stock_products = Product.objects.filter(stock__lt=10)
-        updated = []
-
-        for product in low_stock_products:
-            product.stock += 10
-            product.save()
-            updated.append(product)
+    def mutate(cls, root, info, threshold, increment):
+        if increment < 1:
+            raise ValidationError("Increment must be positive")
+        updated = restock_products(threshold=threshold, increment=increment)
 
         return cls(
             updated_products=updated,
@@ -198,6 +281,7 @@ class Mutation(graphene.ObjectType):
     bulk_create_customers = BulkCreateCustomers.Field()
     create_product = CreateProduct.Field()
     create_order = CreateOrder.Field()
+    bulk_create_orders = BulkCreateOrders.Field()
     update_low_stock_products = UpdateLowStockProducts.Field()
 
 
@@ -205,28 +289,83 @@ class Mutation(graphene.ObjectType):
 # Queries Placeholder
 # ----------------------------
 class Query(graphene.ObjectType):
-    all_customers = DjangoFilterConnectionField(CustomerType)
-    all_products = DjangoFilterConnectionField(ProductType)
-    all_orders = DjangoFilterConnectionField(OrderType)
+    all_customers = KeysetConnectionField(CustomerType, search=graphene.String())
+    all_products = KeysetConnectionField(ProductType, search=graphene.String())
+    all_orders = KeysetConnectionField(OrderType, search=graphene.String())
+    crm_stats = graphene.Field(
+        CrmStatsType,
+        period=StatsPeriod(default_value=StatsPeriod.DAY),
+        start=graphene.DateTime(),
+        end=graphene.DateTime(),
+        top_products=graphene.Int(),
+    )
+    daily_revenue = graphene.List(
+        DailyRevenueType,
+        start=graphene.Date(required=True),
+        end=graphene.Date(required=True),
+        product_id=graphene.ID(),
+        customer_id=graphene.ID(),
+    )
 
     def resolve_all_customers(root, info, **kwargs):
-        qs = Customer.objects.all()
+        qs = optimize_queryset(Customer.objects.all(), info)
+        qs = search(qs, kwargs.get('search'))
         order_by = kwargs.get('order_by')
         if order_by:
             qs = qs.order_by(order_by)
         return qs
 
     def resolve_all_products(root, info, **kwargs):
-        qs = Product.objects.all()
+        qs = optimize_queryset(Product.objects.all(), info)
+        qs = search(qs, kwargs.get('search'))
         order_by = kwargs.get('order_by')
         if order_by:
             qs = qs.order_by(order_by)
         return qs
 
     def resolve_all_orders(root, info, **kwargs):
-        qs = Order.objects.all()
+        qs = optimize_queryset(Order.objects.all(), info)
+        qs = search(qs, kwargs.get('search'))
         order_by = kwargs.get('order_by')
         if order_by:
             qs = qs.order_by(order_by)
         return qs
 
+    def resolve_crm_stats(root, info, period, start=None, end=None, top_products=None):
+        return crm_stats(start=start, end=end, period=getattr(period, "value", period), top_products=top_products)
+
+    def resolve_daily_revenue(root, info, start, end, product_id=None, customer_id=None):
+        if product_id and customer_id:
+            raise ValidationError("Filter by product or customer, not both")
+        if product_id:
+            return revenue_by_day(start, end, DailyRevenue.PRODUCT, product_id)
+        if customer_id:
+            return revenue_by_day(start, end, DailyRevenue.CUSTOMER, customer_id)
+        return revenue_by_day(start, end)
+
+
+# ----------------------------
+# Subscriptions
+# ----------------------------
+class Subscription(graphene.ObjectType):
+    order_created = graphene.Field(OrderType)
+    product_stock_changed = graphene.Field(
+        ProductType,
+        threshold=graphene.Int(description="Only report products whose stock falls below this"),
+    )
+
+    async def subscribe_order_created(root, info):
+        async for message in get_pubsub().subscribe(ORDER_CREATED):
+            order = await Order.objects.filter(pk=message["id"]).afirst()
+            if order is not None:
+                yield order
+
+    async def subscribe_product_stock_changed(root, info, threshold=None):
+        async for message in get_pubsub().subscribe(PRODUCT_STOCK_CHANGED):
+            if threshold is not None and message["stock"] >= threshold:
+                continue
+            product = await Product.objects.filter(pk=message["id"]).afirst()
+            if product is not None:
+                # Report the stock of this change, not a later one.
+                product.stock = message["stock"]
+                yield product
@@ -0,0 +1,213 @@
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+from django.utils.module_loading import import_string
+
+from .models import Customer, Order, OrderItem, Product
+from .trigrams import index_objects, matching_ids, rebuild_index, unindex_objects
+
+# Searchable columns per model; orders are searched through their
+# customer and products.
+SEARCH_FIELDS = {
+    Customer: ("name", "email"),
+    Product: ("name",),
+}
+
+# Shortest term the trigram indexes can answer; shorter ones are scanned.
+MIN_TERM_LENGTH = 3
+
+
+def search_terms(text):
+    return [term for term in (text or "").split() if term]
+
+
+# ----------------------------
+# Backends
+# ----------------------------
+class SearchBackend:
+    """
+    Turns search terms into a pk subquery for a model in ``SEARCH_FIELDS``.
+
+    Every term must occur, as a case-insensitive substring, in at least one
+    of the model's search fields. The backend's index also narrows the
+    ``*_icontains`` filters (:meth:`field_matching`), so a deployment keeps
+    a single substring index.
+    """
+
+    def matching(self, model, terms):
+        raise NotImplementedError
+
+    def field_matching(self, model, field, value):
+        """
+        Return a pk subquery of rows whose ``field`` may contain ``value``,
+        or ``None`` when the index cannot narrow it (short values).
+        """
+        return None
+
+    def index(self, model, objects):
+        """Index ``objects`` after they were saved or bulk created."""
+
+    def unindex(self, model, pks):
+        """Drop the index entries of deleted rows."""
+
+    def install(self, connection):
+        """Create whatever the backend keeps in the database."""
+
+    def rebuild(self, connection):
+        """Re-index every row from the source tables."""
+
+    def _scan(self, model, term):
+        query = Q()
+        for field in SEARCH_FIELDS[model]:
+            query |= Q(**{f"{field}__icontains": term})
+        return query
+
+
+class TrigramSearchBackend(SearchBackend):
+    """
+    Portable backend over the ``NameTrigram`` rows, written by the model
+    signals and the bulk paths through :meth:`index`.
+    """
+
+    def matching(self, model, terms):
+        queryset = model._default_manager.all()
+        for term in terms:
+            query = Q()
+            for field in SEARCH_FIELDS[model]:
+                ids = self.field_matching(model, field, term)
+                lookup = Q(**{f"{field}__icontains": term})
+                query |= lookup if ids is None else Q(pk__in=ids) & lookup
+            queryset = queryset.filter(query)
+        return queryset.values("pk")
+
+    def field_matching(self, model, field, value):
+        return matching_ids(model, field, value)
+
+    def index(self, model, objects):
+        index_objects(model, objects)
+
+    def unindex(self, model, pks):
+        unindex_objects(model, pks)
+
+    def rebuild(self, connection):
+        rebuild_index()
+
+
+class SQLiteFTSSearchBackend(SearchBackend):
+    """
+    SQLite FTS5 backend using the ``trigram`` tokenizer.
+
+    Each model gets an external-content ``<table>_fts`` table that indexes
+    the source table in place, kept in sync by triggers so ``bulk_create``
+    and ``QuerySet.update`` are covered too; updates that leave the indexed
+    columns alone (stock changes) do not touch it. A term matches as a
+    quoted phrase, which the trigram tokenizer treats as a substring.
+
+    Rebuilding a source table (as SQLite ``ALTER`` migrations do) drops its
+    triggers; run ``manage.py rebuild_search_index`` after such migrations.
+    """
+
+    def fts_table(self, model):
+        return f"{model._meta.db_table}_fts"
+
+    def matching(self, model, terms):
+        queryset = model._default_manager.all()
+        long_terms = [term for term in terms if len(term) >= MIN_TERM_LENGTH]
+        if long_terms:
+            table = connection.ops.quote_name(self.fts_table(model))
+            expression = " AND ".join('"{}"'.format(term.replace('"', '""')) for term in long_terms)
+            queryset = queryset.filter(
+                pk__in=RawSQL(f"SELECT rowid FROM {table} WHERE {table} MATCH %s", [expression])
+            )
+        for term in terms:
+            if len(term) < MIN_TERM_LENGTH:
+                queryset = queryset.filter(self._scan(model, term))
+        return queryset.values("pk")
+
+    def field_matching(self, model, field, value):
+        if len(value or "") < MIN_TERM_LENGTH or field not in SEARCH_FIELDS.get(model, ()):
+            return None
+        table = connection.ops.quote_name(self.fts_table(model))
+        column = model._meta.get_field(field).column
+        expression = '{%s} : "%s"' % (column, value.replace('"', '""'))
+        return RawSQL(f"SELECT rowid FROM {table} WHERE {table} MATCH %s", [expression])
+
+    def install(self, connection):
+        with connection.cursor() as cursor:
+            for model, fields in SEARCH_FIELDS.items():
+                for statement in self._ddl(connection, model, fields):
+                    cursor.execute(statement)
+
+    def rebuild(self, connection):
+        qn = connection.ops.quote_name
+        with connection.cursor() as cursor:
+            for model in SEARCH_FIELDS:
+                table = qn(self.fts_table(model))
+                cursor.execute(f"INSERT INTO {table}({table}) VALUES ('rebuild')")
+
+    def _ddl(self, connection, model, fields):
+        qn = connection.ops.quote_name
+        source = model._meta.db_table
+        table = self.fts_table(model)
+        pk = model._meta.pk.column
+        columns = [model._meta.get_field(field).column for field in fields]
+        names = ", ".join(qn(column) for column in columns)
+        new = ", ".join(f"new.{qn(column)}" for column in columns)
+        old = ", ".join(f"old.{qn(column)}" for column in columns)
+        delete = f"INSERT INTO {qn(table)}({qn(table)}, rowid, {names}) VALUES ('delete', old.{qn(pk)}, {old});"
+        insert = f"INSERT INTO {qn(table)}(rowid, {names}) VALUES (new.{qn(pk)}, {new});"
+        return [
+            f"DROP TABLE IF EXISTS {qn(table)}",
+            f"CREATE VIRTUAL TABLE {qn(table)} USING fts5({names}, "
+            f"content='{source}', content_rowid='{pk}', tokenize='trigram')",
+            f"DROP TRIGGER IF EXISTS {qn(table + '_ai')}",
+            f"CREATE TRIGGER {qn(table + '_ai')} AFTER INSERT ON {qn(source)} BEGIN {insert} END",
+            f"DROP TRIGGER IF EXISTS {qn(table + '_ad')}",
+            f"CREATE TRIGGER {qn(table + '_ad')} AFTER DELETE ON {qn(source)} BEGIN {delete} END",
+            f"DROP TRIGGER IF EXISTS {qn(table + '_au')}",
+            f"CREATE TRIGGER {qn(table + '_au')} AFTER UPDATE OF {names} ON {qn(source)} "
+            f"BEGIN {delete} {insert} END",
+        ]
+
+
+@lru_cache(maxsize=None)
+def get_backend():
+    """Return the ``CRM_SEARCH_BACKEND`` instance, FTS5 on SQLite by default."""
+    path = getattr(settings, "CRM_SEARCH_BACKEND", None)
+    if path:
+        return import_string(path)()
+    if connection.vendor == "sqlite":
+        return SQLiteFTSSearchBackend()
+    return TrigramSearchBackend()
+
+
+# ----------------------------
+# Queryset search
+# ----------------------------
+def search(queryset, text, backend=None):
+    """
+    Restrict a customer, product or order queryset to ``text`` matches.
+
+    Orders match when each term is found in the customer or in one of the
+    ordered products. The result stays a lazy queryset for the filterset
+    and pagination to apply to.
+    """
+    terms = search_terms(text)
+    if not terms:
+        return queryset
+    backend = backend or get_backend()
+    model = queryset.model
+    if model in SEARCH_FIELDS:
+        return queryset.filter(pk__in=backend.matching(model, terms))
+    if model is Order:
+        for term in terms:
+            products = backend.matching(Product, [term])
+            queryset = queryset.filter(
+                Q(customer__in=backend.matching(Customer, [term]))
+                | Q(pk__in=OrderItem.objects.filter(product__in=products).values("order_id"))
+            )
+        return queryset
+    raise ValueError(f"{model._meta.label} is not searchable")
@@ -0,0 +1,278 @@
+import multiprocessing
+import random
+from dataclasses import dataclass, replace
+from datetime import timedelta
+from decimal import Decimal
+
+import django
+from django.db import connection, connections, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from .models import Customer, Order, OrderItem, Product
+
+FIRST_NAMES = ("Alice", "Bob", "Carol", "Dave", "Erin", "Frank", "Grace", "Heidi", "Ivan", "Judy")
+LAST_NAMES = ("Smith", "Jones", "Brown", "Taylor", "Wilson", "Davies", "Evans", "Thomas", "Roberts")
+PRODUCT_WORDS = ("Laptop", "Phone", "Tablet", "Monitor", "Keyboard", "Mouse", "Camera", "Speaker")
+
+# Applied to every loading connection; all of them are per-connection, so
+# they end with the connection.
+LOAD_PRAGMAS = {
+    "synchronous": "OFF",
+    "temp_store": "MEMORY",
+    "cache_size": "-65536",
+    "foreign_keys": "OFF",
+    "busy_timeout": "60000",
+}
+
+
+@dataclass(frozen=True)
+class SeedPlan:
+    """
+    What to generate. Rows are a pure function of ``seed`` and their id, so
+    any id range can be produced by any process with the same result.
+    """
+    customers: int = 0
+    products: int = 0
+    orders: int = 0
+    items_per_order: int = 3
+    days: int = 365
+    seed: int = 0
+    chunk_size: int = 10000
+    first_customer: int = 1
+    first_product: int = 1
+    first_order: int = 1
+    now: object = None
+
+    def with_next_ids(self):
+        def next_id(model):
+            return (model.objects.aggregate(top=Max("pk"))["top"] or 0) + 1
+        return replace(
+            self,
+            first_customer=next_id(Customer),
+            first_product=next_id(Product),
+            first_order=next_id(Order),
+            now=self.now or timezone.now(),
+        )
+
+    def ranges(self):
+        """Return the inclusive ``(first, last)`` ids planned per model."""
+        return {
+            "customers": (self.first_customer, self.first_customer + self.customers - 1),
+            "products": (self.first_product, self.first_product + self.products - 1),
+            "orders": (self.first_order, self.first_order + self.orders - 1),
+        }
+
+    def chunks(self, kind):
+        total = getattr(self, kind)
+        return [(kind, start, min(start + self.chunk_size, total)) for start in range(0, total, self.chunk_size)]
+
+
+# ----------------------------
+# Row generators
+# ----------------------------
+def _rng(plan, kind, start):
+    return random.Random(f"{plan.seed}:{kind}:{start}")
+
+
+def _date(rng, plan):
+    return plan.now - timedelta(seconds=rng.randrange(plan.days * 86400))
+
+
+def build_customers(plan, start, stop):
+    rng = _rng(plan, "customers", start)
+    customers = []
+    for i in range(start, stop):
+        pk = plan.first_customer + i
+        customers.append(Customer(
+            pk=pk,
+            name=f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)} {pk}",
+            email=f"seed{pk}@example.com",
+            phone=f"+1{rng.randrange(10**9, 10**10)}" if rng.random() < 0.7 else "",
+            created_at=_date(rng, plan),
+        ))
+    return customers
+
+
+def build_products(plan, start, stop):
+    rng = _rng(plan, "products", start)
+    return [
+        Product(
+            pk=plan.first_product + i,
+            name=f"{rng.choice(PRODUCT_WORDS)} {plan.first_product + i}",
+            price=Decimal(rng.randrange(100, 200000)) / 100,
+            stock=rng.randrange(0, 500),
+        )
+        for i in range(start, stop)
+    ]
+
+
+def product_prices(plan):
+    """Regenerate ``{pk: price}`` of the planned products without a query."""
+    return {
+        product.pk: product.price
+        for _, start, stop in plan.chunks("products")
+        for product in build_products(plan, start, stop)
+    }
+
+
+def order_targets(plan):
+    """
+    Return the customer ids and ``{pk: price}`` orders are drawn from: the
+    planned rows, or the existing ones when the plan adds none.
+    """
+    if plan.customers:
+        customer_ids = range(plan.first_customer, plan.first_customer + plan.customers)
+    else:
+        customer_ids = list(Customer.objects.order_by("pk").values_list("pk", flat=True))
+    prices = product_prices(plan) if plan.products else dict(Product.objects.order_by("pk").values_list("pk", "price"))
+    return customer_ids, prices
+
+
+def build_orders(plan, start, stop, targets):
+    """Return orders and their ``OrderItem`` through rows, totals included."""
+    customer_ids, prices = targets
+    rng = _rng(plan, "orders", start)
+    product_ids = list(prices)
+    max_items = max(1, min(2 * plan.items_per_order - 1, len(product_ids)))
+    orders, items = [], []
+    for i in range(start, stop):
+        pk = plan.first_order + i
+        lines = {product: rng.randint(1, 3) for product in rng.sample(product_ids, rng.randint(1, max_items))}
+        orders.append(Order(
+            pk=pk,
+            customer_id=rng.choice(customer_ids),
+            total_amount=sum(prices[product] * quantity for product, quantity in lines.items()),
+            order_date=_date(rng, plan),
+        ))
+        items += [
+            OrderItem(order_id=pk, product_id=product, quantity=quantity, unit_price=prices[product])
+            for product, quantity in lines.items()
+        ]
+    return orders, items
+
+
+# ----------------------------
+# Loading
+# ----------------------------
+def _insert(model, rows):
+    """
+    ``executemany`` an INSERT of ``rows`` (unsaved instances of ``model``).
+
+    Unlike ``bulk_create`` this skips ``pre_save``, so the generated
+    ``auto_now_add`` dates are written as they are.
+    """
+    if not rows:
+        return
+    opts = model._meta
+    # Rows without a pk (order items) get theirs from the database.
+    fields = [field for field in opts.concrete_fields if field is not opts.auto_field or rows[0].pk is not None]
+    qn = connection.ops.quote_name
+    columns = ", ".join(qn(field.column) for field in fields)
+    sql = f"INSERT INTO {qn(opts.db_table)} ({columns}) VALUES ({', '.join(['%s'] * len(fields))})"
+    params = [
+        tuple(field.get_db_prep_save(getattr(row, field.attname), connection) for field in fields)
+        for row in rows
+    ]
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, params)
+
+
+def apply_load_pragmas(conn=connection):
+    if conn.vendor == "sqlite":
+        with conn.cursor() as cursor:
+            for name, value in LOAD_PRAGMAS.items():
+                cursor.execute(f"PRAGMA {name} = {value}")
+
+
+def load_chunk(plan, kind, start, stop, targets=None):
+    """Generate and insert one id range; returns ``{kind: rows}`` written."""
+    # Build rows before the transaction so parallel workers only hold the
+    # write lock while inserting.
+    if kind == "customers":
+        batches = [(Customer, build_customers(plan, start, stop))]
+    elif kind == "products":
+        batches = [(Product, build_products(plan, start, stop))]
+    else:
+        orders, items = build_orders(plan, start, stop, targets)
+        # Direct through-table insert for Order.products.
+        batches = [(Order, orders), (OrderItem, items)]
+    with transaction.atomic():
+        for model, rows in batches:
+            _insert(model, rows)
+    written = {kind: len(batches[0][1])}
+    if kind == "orders":
+        written["items"] = len(batches[1][1])
+    return written
+
+
+_worker_targets = None
+
+
+def _init_worker(plan, pragmas):
+    global _worker_targets
+    django.setup()
+    connections.close_all()
+    if connection.vendor == "sqlite":
+        # Take the write lock when each chunk's transaction begins, so
+        # workers queue on busy_timeout instead of failing to upgrade a
+        # read lock.
+        connection.settings_dict["OPTIONS"] = {
+            **connection.settings_dict.get("OPTIONS", {}), "transaction_mode": "IMMEDIATE",
+        }
+    if pragmas:
+        apply_load_pragmas()
+    _worker_targets = order_targets(plan) if plan.orders else None
+
+
+def _load_worker(args):
+    plan, kind, start, stop = args
+    return kind, load_chunk(plan, kind, start, stop, _worker_targets)
+
+
+def _add(counts, written):
+    for key, rows in written.items():
+        counts[key] += rows
+
+
+def seed(plan, workers=1, pragmas=True, log=None):
+    """
+    Insert the rows of ``plan`` after the current maximum ids.
+
+    Id ranges of ``chunk_size`` rows are generated and written with batched
+    INSERTs by ``workers`` processes (in-process for 1), customers and
+    products first, then orders with their items; orders without any
+    customer or product to draw from are skipped. With ``pragmas`` the
+    loading connections run with ``LOAD_PRAGMAS``; ``log(kind, done, total)``
+    reports progress. Returns the plan, its first ids filled in, and the
+    row counts.
+    """
+    log = log or (lambda kind, done, total: None)
+    plan = plan.with_next_ids()
+    if not ((plan.customers or Customer.objects.exists()) and (plan.products or Product.objects.exists())):
+        plan = replace(plan, orders=0)
+    counts = {"customers": 0, "products": 0, "orders": 0, "items": 0}
+    phases = [plan.chunks("customers") + plan.chunks("products"), plan.chunks("orders")]
+
+    if workers <= 1:
+        if pragmas:
+            apply_load_pragmas()
+        targets = order_targets(plan) if plan.orders else None
+        try:
+            for phase in phases:
+                for kind, start, stop in phase:
+                    _add(counts, load_chunk(plan, kind, start, stop, targets))
+                    log(kind, counts[kind], getattr(plan, kind))
+        finally:
+            # Hand the tuned connection back to Django with its defaults.
+            if pragmas:
+                connection.close()
+        return plan, counts
+
+    connections.close_all()
+    with multiprocessing.get_context().Pool(workers, _init_worker, (plan, pragmas)) as pool:
+        for phase in phases:
+            for kind, written in pool.imap_unordered(_load_worker, [(plan, *chunk) for chunk in phase]):
+                _add(counts, written)
+                log(kind, counts[kind], getattr(plan, kind))
+    return plan, counts
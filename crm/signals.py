@@ -0,0 +1,49 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from .cache import invalidate
+from .models import Customer, Order, OrderItem, Product
+from .pubsub import publish_orders_created, publish_stock_changes
+from .search import get_backend
+
+
+@receiver(post_save, sender=Customer)
+@receiver(post_save, sender=Product)
+@receiver(post_save, sender=Order)
+@receiver(post_save, sender=OrderItem)
+@receiver(post_delete, sender=Customer)
+@receiver(post_delete, sender=Product)
+@receiver(post_delete, sender=Order)
+@receiver(post_delete, sender=OrderItem)
+def invalidate_responses(sender, **kwargs):
+    invalidate(sender)
+
+
+@receiver(m2m_changed, sender=Order.products.through)
+def invalidate_order_products(sender, action, **kwargs):
+    if action.startswith("post_"):
+        invalidate(Order)
+
+
+@receiver(post_save, sender=Customer)
+@receiver(post_save, sender=Product)
+def index_search(sender, instance, **kwargs):
+    get_backend().index(sender, [instance])
+
+
+@receiver(post_delete, sender=Customer)
+@receiver(post_delete, sender=Product)
+def unindex_search(sender, instance, **kwargs):
+    get_backend().unindex(sender, [instance.pk])
+
+
+@receiver(post_save, sender=Order)
+def publish_order_created(sender, instance, created, **kwargs):
+    if created:
+        publish_orders_created([instance])
+
+
+@receiver(post_save, sender=Product)
+def publish_stock_change(sender, instance, update_fields=None, **kwargs):
+    if update_fields is None or "stock" in update_fields:
+        publish_stock_changes({instance.pk: instance.stock})
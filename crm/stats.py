@@ -0,0 +1,71 @@
+from decimal import Decimal
+
+from django.db.models import Count, DecimalField, F, Sum
+from django.db.models.functions import Coalesce, Trunc
+
+from .models import Customer, Order, OrderItem
+
+PERIODS = ("day", "week", "month")
+ZERO = Decimal("0.00")
+
+
+def _money(expression):
+    return Coalesce(expression, ZERO, output_field=DecimalField(max_digits=12, decimal_places=2))
+
+
+def crm_stats(start=None, end=None, period="day", top_products=None):
+    """
+    Aggregate CRM totals in SQL, optionally for orders in ``[start, end)``.
+
+    Returns customer, order and revenue totals, revenue per ``period``
+    (``day``, ``week`` or ``month``) and per product, each computed by a
+    single grouped query, so the result size does not grow with the data.
+    Product revenue is ``quantity * unit_price``, the prices charged.
+    """
+    if period not in PERIODS:
+        raise ValueError(f"Period must be one of {', '.join(PERIODS)}")
+    if top_products is not None and top_products < 0:
+        raise ValueError("Top products must not be negative")
+    orders = Order.objects.all()
+    if start is not None:
+        orders = orders.filter(order_date__gte=start)
+    if end is not None:
+        orders = orders.filter(order_date__lt=end)
+
+    totals = orders.aggregate(order_count=Count("pk"), revenue=_money(Sum("total_amount")))
+    by_period = (
+        orders.order_by()
+        .annotate(period_start=Trunc("order_date", period))
+        .values("period_start")
+        .annotate(order_count=Count("pk"), revenue=_money(Sum("total_amount")))
+        .order_by("period_start")
+    )
+    by_product = (
+        OrderItem.objects.filter(order__in=orders.values("pk"))
+        .values("product_id", "product__name")
+        .annotate(
+            units=Sum("quantity"),
+            order_count=Count("order_id"),
+            revenue=_money(Sum(F("quantity") * F("unit_price"))),
+        )
+        .order_by("-revenue", "product_id")
+    )
+    if top_products:
+        by_product = by_product[:top_products]
+
+    return {
+        "customer_count": Customer.objects.count(),
+        "order_count": totals["order_count"],
+        "revenue": totals["revenue"],
+        "revenue_by_period": list(by_period),
+        "revenue_by_product": [
+            {
+                "product_id": row["product_id"],
+                "product_name": row["product__name"],
+                "quantity": row["units"],
+                "order_count": row["order_count"],
+                "revenue": row["revenue"],
+            }
+            for row in by_product
+        ],
+    }
@@ -0,0 +1,260 @@
+import asyncio
+import json
+from contextlib import nullcontext
+from inspect import isawaitable
+from types import SimpleNamespace
+
+from asgiref.sync import ThreadSensitiveContext, sync_to_async
+from django.db import connections
+from graphene_django.settings import graphene_settings
+from graphene_django.views import instantiate_middleware
+from graphql import (
+    ExecutionResult,
+    GraphQLError,
+    OperationType,
+    execute,
+    get_operation_ast,
+    validate,
+)
+from graphql.execution import create_source_event_stream
+
+from .async_graphql import ASYNC_FLAG, SyncResolverMiddleware
+from .complexity import QueryCostError, charge_budget, cost_rule
+from .database import use_writer
+from .persisted_queries import get_document
+from .views import ExecutionPlan, atomic_mutations, client_id
+
+PROTOCOL = "graphql-transport-ws"
+
+# graphql-transport-ws close codes
+INVALID_MESSAGE = 4400
+UNAUTHORIZED = 4401
+SUBSCRIBER_EXISTS = 4409
+TOO_MANY_INIT = 4429
+
+
+class GraphQLWebSocket:
+    """
+    ASGI application serving GraphQL operations over a WebSocket with the
+    ``graphql-transport-ws`` protocol (the ``graphql-ws`` client, GraphiQL).
+
+    Subscriptions push one ``next`` message per event of their source
+    stream; queries and mutations are answered once and completed. Every
+    event executes with a fresh context through the async execution of
+    :class:`~crm.views.AsyncCRMGraphQLView`, and each connection gets its
+    own database thread. As over HTTP, operations are charged to the
+    client's cost budget and mutations run on the writer database, in a
+    transaction under ``ATOMIC_MUTATIONS``.
+    """
+
+    def __init__(self, schema=None):
+        self._schema = schema
+
+    @property
+    def schema(self):
+        if self._schema is None:
+            from alx_backend_graphql_crm.schema import schema
+
+            self._schema = schema
+        return self._schema
+
+    async def __call__(self, scope, receive, send):
+        event = await receive()
+        if event["type"] != "websocket.connect":
+            return
+        if PROTOCOL not in scope.get("subprotocols", ()):
+            await send({"type": "websocket.close", "code": INVALID_MESSAGE})
+            return
+        await send({"type": "websocket.accept", "subprotocol": PROTOCOL})
+
+        async with ThreadSensitiveContext():
+            session = _Session(self.schema.graphql_schema, scope, send)
+            try:
+                while not session.closed:
+                    event = await receive()
+                    if event["type"] == "websocket.disconnect":
+                        break
+                    if event["type"] == "websocket.receive":
+                        await session.receive(event.get("text") or event.get("bytes"))
+            finally:
+                await session.stop_all()
+                await sync_to_async(connections.close_all)()
+
+
+class _Session:
+    def __init__(self, schema, scope, send):
+        self.schema = schema
+        self.scope = scope
+        self._send = send
+        self.acknowledged = False
+        self.closed = False
+        self.operations = {}
+        self.middleware = list(instantiate_middleware(graphene_settings.MIDDLEWARE or ()))
+
+    async def send(self, message):
+        if not self.closed:
+            await self._send({"type": "websocket.send", "text": json.dumps(message)})
+
+    async def close(self, code, reason=""):
+        if not self.closed:
+            self.closed = True
+            await self._send({"type": "websocket.close", "code": code, "reason": reason})
+
+    async def receive(self, text):
+        try:
+            message = json.loads(text)
+            kind = message["type"]
+        except (ValueError, TypeError, KeyError):
+            return await self.close(INVALID_MESSAGE, "Invalid message")
+
+        if kind == "connection_init":
+            if self.acknowledged:
+                return await self.close(TOO_MANY_INIT, "Too many initialisation requests")
+            self.acknowledged = True
+            await self.send({"type": "connection_ack"})
+        elif kind == "ping":
+            await self.send({"type": "pong"})
+        elif kind == "pong":
+            pass
+        elif kind == "subscribe":
+            if not self.acknowledged:
+                return await self.close(UNAUTHORIZED, "Unauthorized")
+            op_id = message.get("id")
+            if op_id in self.operations:
+                return await self.close(SUBSCRIBER_EXISTS, f"Subscriber for {op_id} already exists")
+            payload = message.get("payload") or {}
+            self.operations[op_id] = asyncio.create_task(self.run(op_id, payload))
+        elif kind == "complete":
+            task = self.operations.pop(message.get("id"), None)
+            if task is not None:
+                task.cancel()
+        else:
+            await self.close(INVALID_MESSAGE, f"Unexpected message type {kind}")
+
+    async def stop_all(self):
+        tasks = list(self.operations.values())
+        self.operations.clear()
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    # ----------------------------
+    # Operations
+    # ----------------------------
+    async def run(self, op_id, payload):
+        variables = payload.get("variables")
+        operation_name = payload.get("operationName")
+        try:
+            document, errors = await sync_to_async(self.plan)(
+                payload.get("query") or "", variables, operation_name
+            )
+            if errors:
+                await self.send({"id": op_id, "type": "error", "payload": [e.formatted for e in errors]})
+                return
+            operation = get_operation_ast(document, operation_name)
+            if operation.operation == OperationType.SUBSCRIPTION:
+                await self.stream(op_id, document, variables, operation_name)
+            else:
+                mutation = operation.operation == OperationType.MUTATION
+                if mutation and atomic_mutations():
+                    result = await sync_to_async(ExecutionPlan(
+                        self.schema,
+                        document,
+                        {
+                            "context_value": self.context(is_async=False),
+                            "variable_values": variables,
+                            "operation_name": operation_name,
+                            "middleware": self.middleware,
+                        },
+                        atomic=True,
+                        writer=True,
+                    ).execute)()
+                else:
+                    with use_writer() if mutation else nullcontext():
+                        result = await self.execute(document, None, variables, operation_name)
+                await self.send({"id": op_id, "type": "next", "payload": result.formatted})
+            await self.send({"id": op_id, "type": "complete"})
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            await self.send({"id": op_id, "type": "error", "payload": [GraphQLError(str(e)).formatted]})
+        finally:
+            self.operations.pop(op_id, None)
+
+    def plan(self, query, variables, operation_name):
+        """
+        Return ``(document, errors)`` after validation, the cost check and
+        charging the client's budget.
+        """
+        document, errors = get_document(self.schema, query)
+        if document is None or errors:
+            return document, errors
+        if get_operation_ast(document, operation_name) is None:
+            return document, [GraphQLError("Unknown or ambiguous operation")]
+        report = {}
+        errors = validate(self.schema, document, [cost_rule(variables, operation_name, report)])
+        if errors:
+            return document, errors
+        client = self.scope.get("client") or ("",)
+        try:
+            charge_budget(client_id(self.scope.get("user"), client[0]), report.get("cost", 0))
+        except QueryCostError as e:
+            return document, [e]
+        return document, []
+
+    async def stream(self, op_id, document, variables, operation_name):
+        source = await create_source_event_stream(
+            self.schema,
+            document,
+            context_value=self.context(),
+            variable_values=variables,
+            operation_name=operation_name,
+        )
+        if isinstance(source, ExecutionResult):
+            await self.send({"id": op_id, "type": "error", "payload": [e.formatted for e in source.errors]})
+            return
+        try:
+            async for event in source:
+                result = await self.execute(document, event, variables, operation_name)
+                await self.send({"id": op_id, "type": "next", "payload": result.formatted})
+        finally:
+            if hasattr(source, "aclose"):
+                await source.aclose()
+
+    async def execute(self, document, root_value, variables, operation_name):
+        result = execute(
+            self.schema,
+            document,
+            root_value=root_value,
+            context_value=self.context(),
+            variable_values=variables,
+            operation_name=operation_name,
+            middleware=[*self.middleware, SyncResolverMiddleware()],
+        )
+        if isawaitable(result):
+            result = await result
+        return result
+
+    def context(self, is_async=True):
+        # A fresh context per event keeps the DataLoaders from serving
+        # rows cached by an earlier one.
+        return SimpleNamespace(scope=self.scope, **{ASYNC_FLAG: is_async})
+
+
+def websocket_router(application, path=None):
+    """
+    Wrap the Django ASGI ``application`` so WebSocket connections to the
+    ``SUBSCRIPTION_PATH`` are served by :class:`GraphQLWebSocket`.
+    """
+    path = (path or graphene_settings.SUBSCRIPTION_PATH or "/graphql").rstrip("/")
+    graphql_ws = GraphQLWebSocket()
+
+    async def router(scope, receive, send):
+        if scope["type"] != "websocket":
+            return await application(scope, receive, send)
+        if scope["path"].rstrip("/") == path:
+            return await graphql_ws(scope, receive, send)
+        await receive()
+        await send({"type": "websocket.close", "code": 1000})
+
+    return router
@@ -1,34 +1,35 @@
 import logging
-from celery import shared_task
-from datetime import datetime
-from gql import gql, Client
-from gql.transport.requests import RequestsHTTPTransport
-import requests
-
-# GraphQL setup
-transport = RequestsHTTPTransport(
-    url="http://localhost:8000/graphql/",
-    verify=False,
-    retries=3,
-)
-client = Client(transport=transport, fetch_schema_from_transport=True)
+from celery import chord, shared_task
+from datetime import datetime, timedelta
+from django.db.models import Max, Min
+from django.utils import timezone
+from gql import gql
+
+from .export import export_tables
+from .models import Order
+from .reminders import dispatch_reminders, load_checkpoint, render_reminder, save_checkpoint
+from .rollups import rebuild_daily_revenue
+from .transport import local_client
+
+# GraphQL setup: operations run in the worker, not over HTTP
+client = local_client()
 
 logger = logging.getLogger(__name__)
 
 @shared_task
 def generate_crm_report():
     try:
+        # Totals are aggregated by the server, so the payload stays constant.
         query = gql("""
         {
-            customers { id }
-            orders { id totalamount }
+            crmStats { customerCount orderCount revenue }
         }
         """)
         response = client.execute(query)
 
-        total_customers = len(response["customers"])
-        total_orders = len(response["orders"])
-        total_revenue = sum(float(order["totalamount"]) for order in response["orders"])
+        total_customers = response["crmStats"]["customerCount"]
+        total_orders = response["crmStats"]["orderCount"]
+        total_revenue = float(response["crmStats"]["revenue"])
 
         timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         report = f"{timestamp} - Report: {total_customers} customers, {total_orders} orders, {total_revenue} revenue"
@@ -41,3 +42,86 @@ def generate_crm_report():
     except Exception as e:
         logger.error("Error generating CRM report: %s", e)
 
+
+@shared_task
+def rebuild_revenue_rollup(start=None, end=None, days=None):
+    """
+    Recompute the DailyRevenue rows, for ISO dates ``start``..``end`` if
+    given, or for the ``days`` days before today.
+    """
+    start = datetime.fromisoformat(start).date() if start else None
+    end = datetime.fromisoformat(end).date() if end else None
+    if days:
+        today = timezone.localdate()
+        start, end = today - timedelta(days=days), today - timedelta(days=1)
+    written = rebuild_daily_revenue(start=start, end=end)
+    logger.info("Rebuilt %s daily revenue rows", written)
+    return written
+
+
+@shared_task
+def export_analytics(directory, tables=None, fmt=None):
+    """Export the CRM tables into ``directory``; returns the manifest."""
+    manifest = export_tables(directory, tables=tables, fmt=fmt)
+    logger.info(
+        "Exported %s to %s as %s", ", ".join(manifest["tables"]), directory, manifest["format"]
+    )
+    return manifest
+
+
+# ----------------------------
+# Order reminders
+# ----------------------------
+REMINDER_CHUNK_SIZE = 500
+
+
+@shared_task
+def send_order_reminders(days=7, chunk_size=REMINDER_CHUNK_SIZE):
+    """
+    Fan the reminders for the last ``days`` of orders out to workers.
+
+    The window's id span is split into ranges of ``chunk_size`` ids, each
+    handled by a ``send_reminder_chunk`` subtask in a chord whose callback
+    aggregates the counts. Works with ``CELERY_TASK_ALWAYS_EAGER``.
+
+    Orders up to the checkpoint are skipped; the callback moves it to the
+    last order once every chunk has been sent, so a repeated or retried
+    run does not remind the same customers again. Returns the number of
+    chunks and the chord id (``None`` when there was nothing to send).
+    """
+    since = timezone.now() - timedelta(days=days)
+    orders = Order.objects.filter(order_date__gte=since, pk__gt=load_checkpoint())
+    bounds = orders.aggregate(low=Min("pk"), high=Max("pk"))
+    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    if bounds["low"] is None:
+        dispatch_reminders([f"{timestamp} - No recent orders found\n"])
+        return {"chunks": 0, "chord": None}
+
+    chunks = [
+        send_reminder_chunk.s(start, min(start + chunk_size - 1, bounds["high"]), since.isoformat(), timestamp)
+        for start in range(bounds["low"], bounds["high"] + 1, chunk_size)
+    ]
+    result = chord(chunks)(summarize_reminders.s(bounds["high"]))
+    return {"chunks": len(chunks), "chord": result.id}
+
+
+@shared_task
+def send_reminder_chunk(start_id, end_id, since, timestamp):
+    """Render and dispatch the reminders for orders ``start_id..end_id``."""
+    orders = (
+        Order.objects.filter(pk__gte=start_id, pk__lte=end_id, order_date__gte=datetime.fromisoformat(since))
+        .select_related("customer")
+        .only("pk", "order_date", "total_amount", "customer__name", "customer__email")
+        .order_by("pk")
+    )
+    lines = [render_reminder(order, timestamp) for order in orders.iterator(chunk_size=REMINDER_CHUNK_SIZE)]
+    dispatch_reminders(lines)
+    return {"sent": len(lines), "start_id": start_id, "end_id": end_id}
+
+
+@shared_task
+def summarize_reminders(results, last_order_id):
+    save_checkpoint(last_order_id)
+    summary = {"sent": sum(result["sent"] for result in results), "chunks": len(results)}
+    logger.info("Order reminders processed: %(sent)s reminders in %(chunks)s chunks", summary)
+    return summary
@@ -1,3 +1,657 @@
-from django.test import TestCase
+import asyncio
+import csv
+import gzip
+import hashlib
+import json
+import os
+import re
+import tempfile
+from contextlib import nullcontext
+from datetime import datetime, timezone
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import AsyncRequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from .filters import CustomerFilter, OrderFilter, ProductFilter
+from .models import Customer, Order, OrderItem, Product
+
+SAMPLE_VALUES = {
+    "CharFilter": "alice",
+    "TrigramFilter": "alice",
+    "NumberFilter": 10,
+    "DateTimeFilter": datetime(2025, 1, 1, tzinfo=timezone.utc),
+}
+
+
+class FilterIndexTests(TestCase):
+    """Every filter argument must be answered without a full table scan."""
+
+    def assertIndexed(self, filterset_class, name, value):
+        qs = filterset_class({name: value}, queryset=filterset_class._meta.model.objects.all()).qs
+        plan = qs.explain()
+        scans = [line for line in plan.splitlines() if re.search(r"\bSCAN \w+$", line.strip())]
+        self.assertFalse(scans, f"{filterset_class.__name__}.{name} scans a table:\n{plan}")
+
+    def test_filters_use_indexes(self):
+        if connection.vendor != "sqlite":
+            self.skipTest("Query plans are checked against SQLite")
+        for filterset_class in (CustomerFilter, ProductFilter, OrderFilter):
+            for name, filter_ in filterset_class.base_filters.items():
+                with self.subTest(filterset=filterset_class.__name__, filter=name):
+                    value = "+1" if name == "phone_pattern" else SAMPLE_VALUES[type(filter_).__name__]
+                    self.assertIndexed(filterset_class, name, value)
+
+
+# ----------------------------
+# GraphQL behaviour
+# ----------------------------
+
+def post_graphql(client, query, variables=None, **body):
+    response = client.post(
+        "/graphql",
+        json.dumps({"query": query, "variables": variables or {}, **body}),
+        content_type="application/json",
+    )
+    return response.json()
+
+
+def error_codes(result):
+    return [error.get("extensions", {}).get("code") for error in result.get("errors", ())]
+
+
+class GraphQLTestCase(TestCase):
+    def setUp(self):
+        # Response cache, APQ registry and cost budgets all live in the cache.
+        cache.clear()
+
+
+class KeysetPaginationTests(GraphQLTestCase):
+    PAGE = """
+    query($first: Int, $last: Int, $after: String, $before: String, $orderBy: String) {
+      allProducts(first: $first, last: $last, after: $after, before: $before, orderBy: $orderBy) {
+        edges { cursor node { name } }
+        pageInfo { hasNextPage hasPreviousPage startCursor endCursor }
+      }
+    }
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        # Repeated prices make the pk the tie-breaker of the sort key.
+        for i, price in enumerate([5, 3, 5, 1, 3, 5, 2]):
+            Product.objects.create(name=f"P{i}", price=price, stock=1)
+        cls.expected = list(Product.objects.order_by("price", "pk").values_list("name", flat=True))
+
+    def page(self, **variables):
+        result = post_graphql(self.client, self.PAGE, variables)
+        self.assertNotIn("errors", result)
+        return result["data"]["allProducts"]
+
+    def test_forward_pages_cover_every_row_once_in_order(self):
+        names, after = [], None
+        while True:
+            page = self.page(first=2, after=after, orderBy="price")
+            names += [edge["node"]["name"] for edge in page["edges"]]
+            if not page["pageInfo"]["hasNextPage"]:
+                break
+            after = page["pageInfo"]["endCursor"]
+        self.assertEqual(names, self.expected)
+
+    def test_backward_page_before_cursor(self):
+        page = self.page(first=5, orderBy="price")
+        before = page["edges"][4]["cursor"]
+        page = self.page(last=2, before=before, orderBy="price")
+        self.assertEqual([edge["node"]["name"] for edge in page["edges"]], self.expected[2:4])
+        self.assertTrue(page["pageInfo"]["hasPreviousPage"])
+        self.assertTrue(page["pageInfo"]["hasNextPage"])
+
+    def test_cursor_of_another_order_is_rejected(self):
+        after = self.page(first=1, orderBy="price")["pageInfo"]["endCursor"]
+        result = post_graphql(self.client, self.PAGE, {"first": 1, "after": after, "orderBy": "-price"})
+        self.assertEqual(result["errors"][0]["message"], "Cursor does not match the requested order_by")
+
+
+class NestedLoadingTests(GraphQLTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        for i in range(12):
+            customer = Customer.objects.create(name=f"C{i}", email=f"c{i}@example.com")
+            product = Product.objects.create(name=f"P{i}", price=1, stock=1)
+            for _ in range(2):
+                order = Order.objects.create(customer=customer, total_amount=1)
+                OrderItem.objects.create(order=order, product=product)
+
+    def assertConstantQueries(self, query):
+        counts = []
+        for first in (3, 10):
+            with CaptureQueriesContext(connection) as queries:
+                result = post_graphql(self.client, query, {"n": first})
+            self.assertNotIn("errors", result)
+            counts.append(len(queries))
+        self.assertEqual(counts[0], counts[1])
+
+    def test_orders_of_order_customers(self):
+        self.assertConstantQueries("""
+        query($n: Int) { allOrders(first: $n) { edges { node {
+          customer { orders { edges { node { id } } } }
+        } } } }
+        """)
+
+    def test_filtered_nested_connections(self):
+        query = """
+        query($n: Int) { allOrders(first: $n) { edges { node {
+          products(nameIcontains: "P1") { edges { node { name } } }
+        } } } }
+        """
+        self.assertConstantQueries(query)
+        result = post_graphql(self.client, query, {"n": 12})
+        names = [
+            [edge["node"]["name"] for edge in order["node"]["products"]["edges"]]
+            for order in result["data"]["allOrders"]["edges"]
+        ]
+        expected = [
+            [item.product.name] if "P1" in item.product.name else []
+            for item in OrderItem.objects.select_related("product").order_by("order_id")[:12]
+        ]
+        self.assertEqual(names, expected)
+
+    def test_orders_of_loaded_customers(self):
+        self.assertConstantQueries("""
+        query($n: Int) { allProducts(first: $n) { edges { node {
+          orders { edges { node { customer { orders { edges { node { id } } } } } } }
+        } } } }
+        """)
+
+
+class OrderCreationTests(GraphQLTestCase):
+    CREATE = """
+    mutation($input: OrderInput!) {
+      createOrder(input: $input) { message order { id totalAmount } }
+    }
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = Customer.objects.create(name="Alice", email="alice@example.com")
+        cls.laptop = Product.objects.create(name="Laptop", price=Decimal("100.00"), stock=10)
+        cls.mouse = Product.objects.create(name="Mouse", price=Decimal("20.00"), stock=10)
+
+    def create(self, product_ids, quantities=None):
+        result = post_graphql(self.client, self.CREATE, {"input": {
+            "customerId": str(self.customer.pk),
+            "productIds": [str(pk) for pk in product_ids],
+            "quantities": quantities,
+        }})
+        self.assertNotIn("errors", result)
+        return result["data"]["createOrder"]
+
+    def test_quantities_merge_repeated_products_and_price_the_total(self):
+        data = self.create([self.laptop.pk, self.mouse.pk, self.laptop.pk], [1, 2, 3])
+        self.assertEqual(data["message"], "Order created successfully")
+        self.assertEqual(Decimal(data["order"]["totalAmount"]), Decimal("440.00"))
+        items = dict(OrderItem.objects.values_list("product_id", "quantity"))
+        self.assertEqual(items, {self.laptop.pk: 4, self.mouse.pk: 2})
+        self.assertEqual(set(OrderItem.objects.values_list("unit_price", flat=True)), {Decimal("100.00"), Decimal("20.00")})
+
+    def test_mismatched_quantities_are_rejected(self):
+        data = self.create([self.laptop.pk, self.mouse.pk], [1])
+        self.assertEqual(data["message"], "Quantities must match product IDs")
+        self.assertFalse(Order.objects.exists())
+
+    def test_single_order_cannot_oversell(self):
+        self.assertEqual(self.create([self.laptop.pk], [10])["message"], "Order created successfully")
+        self.assertEqual(self.create([self.laptop.pk], [1])["message"], "Insufficient stock")
+        self.laptop.refresh_from_db()
+        self.assertEqual(self.laptop.stock, 0)
+
+
+class StockReservationTests(GraphQLTestCase):
+    BULK = """
+    mutation($input: [OrderInput]!) {
+      bulkCreateOrders(input: $input) { orders { id } errors }
+    }
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = Customer.objects.create(name="Alice", email="alice@example.com")
+        cls.product = Product.objects.create(name="Laptop", price=Decimal("100.00"), stock=3)
+
+    def bulk(self, *quantities):
+        rows = [
+            {"customerId": str(self.customer.pk), "productIds": [str(self.product.pk)], "quantities": [quantity]}
+            for quantity in quantities
+        ]
+        result = post_graphql(self.client, self.BULK, {"input": rows})
+        self.assertNotIn("errors", result)
+        return result["data"]["bulkCreateOrders"]
+
+    def test_orders_beyond_the_stock_are_rejected(self):
+        data = self.bulk(2, 2, 1)
+        self.assertEqual(len(data["orders"]), 2)
+        self.assertEqual(data["errors"], ["Row 2: Insufficient stock"])
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, 0)
+
+    def test_stock_conflict_rolls_back_the_batch(self):
+        from . import bulk
+
+        reserve = bulk._reserve_stock
+
+        def concurrent_sale(demand):
+            # Another writer takes the stock between the read and the UPDATE.
+            Product.objects.filter(pk=self.product.pk).update(stock=0)
+            return reserve(demand)
+
+        with mock.patch.object(bulk, "_reserve_stock", concurrent_sale):
+            data = self.bulk(1, 1)
+        self.assertEqual(data, {"orders": [], "errors": ["Stock changed while reserving, please retry"]})
+        self.assertFalse(Order.objects.exists())
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, 3)
+
+
+    def test_published_stock_is_read_after_the_reservation(self):
+        from . import bulk
+
+        reserve = bulk._reserve_stock
+
+        def concurrent_sale(demand):
+            Product.objects.filter(pk=self.product.pk).update(stock=2)
+            return reserve(demand)
+
+        with mock.patch.object(bulk, "_reserve_stock", concurrent_sale), \
+                mock.patch.object(bulk, "publish_stock_changes") as publish:
+            self.assertEqual(self.bulk(1)["errors"], [])
+        publish.assert_called_once_with({self.product.pk: 1})
+
+
+class RestockTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        for i, stock in enumerate([0, 5, 9, 10, 50]):
+            Product.objects.create(name=f"P{i}", price=1, stock=stock)
+
+    def restock(self, queries=None):
+        from .bulk import restock_products
+
+        with mock.patch("crm.bulk.publish_stock_changes") as publish, nullcontext() if queries is None else queries:
+            products = restock_products(threshold=10, increment=10)
+        self.assertEqual([(product.name, product.stock) for product in products],
+                         [("P0", 10), ("P1", 15), ("P2", 19)])
+        self.assertEqual(products[0].price, Decimal("1.00"))
+        publish.assert_called_once_with({product.pk: product.stock for product in products})
+        self.assertEqual(list(Product.objects.order_by("pk").values_list("stock", flat=True)), [10, 15, 19, 10, 50])
+
+    def test_single_update_returns_the_rows(self):
+        queries = CaptureQueriesContext(connection)
+        self.restock(queries)
+        statements = [query["sql"] for query in queries if not query["sql"].startswith(("SAVEPOINT", "RELEASE"))]
+        self.assertEqual(len(statements), 1)
+        self.assertIn("RETURNING", statements[0])
+
+    @override_settings(CRM_BULK_CHUNK_SIZE=2)
+    def test_chunked_without_returning(self):
+        with mock.patch("crm.bulk._supports_update_returning", return_value=False):
+            self.restock()
+
+
+class PersistedQueryTests(GraphQLTestCase):
+    QUERY = "{ allProducts(first: 1) { edges { node { name } } } }"
+
+    def persisted(self, sha256_hash, query=None):
+        extensions = {"persistedQuery": {"version": 1, "sha256Hash": sha256_hash}}
+        return post_graphql(self.client, query, extensions=extensions)
+
+    def test_unknown_hash_asks_for_the_query(self):
+        result = self.persisted(hashlib.sha256(self.QUERY.encode()).hexdigest())
+        self.assertEqual(error_codes(result), ["PERSISTED_QUERY_NOT_FOUND"])
+        self.assertEqual(result["errors"][0]["message"], "PersistedQueryNotFound")
+
+    def test_hash_mismatch_is_rejected(self):
+        result = self.persisted("0" * 64, self.QUERY)
+        self.assertEqual(error_codes(result), ["PERSISTED_QUERY_HASH_MISMATCH"])
+
+    def test_registered_query_is_served_by_hash(self):
+        sha256_hash = hashlib.sha256(self.QUERY.encode()).hexdigest()
+        self.assertNotIn("errors", self.persisted(sha256_hash, self.QUERY))
+        result = self.persisted(sha256_hash)
+        self.assertEqual(result, {"data": {"allProducts": {"edges": []}}})
+
+
+class ResponseCacheTests(GraphQLTestCase):
+    QUERY = "{ allProducts { edges { node { name stock } } } }"
+
+    def stocks(self):
+        result = post_graphql(self.client, self.QUERY)
+        return [edge["node"]["stock"] for edge in result["data"]["allProducts"]["edges"]]
+
+    def test_saves_invalidate_cached_responses(self):
+        product = Product.objects.create(name="Laptop", price=1, stock=5)
+        self.assertEqual(self.stocks(), [5])
+        # A write that skips the signals is not seen: the response is cached.
+        Product.objects.filter(pk=product.pk).update(stock=6)
+        self.assertEqual(self.stocks(), [5])
+        with self.captureOnCommitCallbacks(execute=True):
+            product.stock = 7
+            product.save()
+        self.assertEqual(self.stocks(), [7])
+
+    def test_mutations_are_not_cached(self):
+        mutation = "mutation { updateLowStockProducts(threshold: 10) { message } }"
+        Product.objects.create(name="Laptop", price=1, stock=5)
+        first = post_graphql(self.client, mutation)["data"]["updateLowStockProducts"]["message"]
+        second = post_graphql(self.client, mutation)["data"]["updateLowStockProducts"]["message"]
+        self.assertEqual((first, second), ("Updated 1 low-stock products", "Updated 0 low-stock products"))
+
+
+class AsyncBatchTests(GraphQLTestCase):
+    async def run_batch(self, *roots):
+        from .views import AsyncCRMGraphQLView
+
+        batch = [
+            {"id": root, "operationName": root, "query": f"query {root} {{ {root}(first: 1) {{ totalCount }} }}"}
+            for root in roots
+        ]
+        request = AsyncRequestFactory().post(
+            "/graphql/async", json.dumps(batch), content_type="application/json", headers={"X-CRM-Debug": "1"},
+        )
+        response = await AsyncCRMGraphQLView.as_view(batch=True)(request)
+        return {entry["id"]: entry["extensions"]["timing"] for entry in json.loads(response.content)}
+
+    async def test_each_entry_has_its_own_trace(self):
+        alone = await self.run_batch("allProducts")
+        cache.clear()
+        timings = await self.run_batch("allProducts", "allCustomers")
+        for root, timing in timings.items():
+            self.assertEqual(timing["operation"], root)
+            self.assertEqual(list(timing["resolvers"]), [f"Query.{root}"])
+        # Statements of the concurrent entry are not counted.
+        self.assertEqual(timings["allProducts"]["sql"]["count"], alone["allProducts"]["sql"]["count"])
+
+
+class CreateCustomerTests(GraphQLTestCase):
+    CREATE = """
+    mutation { createCustomer(input: {name: "Alice", email: "alice@example.com"}) { message customer { phone } } }
+    """
+
+    def assertCreatedWithoutPhone(self, result):
+        self.assertEqual(result["data"]["createCustomer"]["message"], "Customer created successfully")
+        self.assertEqual(Customer.objects.get(email="alice@example.com").phone, "")
+
+    def test_phone_is_optional(self):
+        self.assertCreatedWithoutPhone(post_graphql(self.client, self.CREATE))
+
+    async def test_phone_is_optional_async(self):
+        from .views import AsyncCRMGraphQLView
+
+        request = AsyncRequestFactory().post(
+            "/graphql/async", json.dumps({"query": self.CREATE}), content_type="application/json",
+        )
+        response = await AsyncCRMGraphQLView.as_view()(request)
+        await sync_to_async(self.assertCreatedWithoutPhone)(json.loads(response.content))
+
+
+class QueryCostTests(GraphQLTestCase):
+    NESTED = """
+    { allCustomers(first: 50) { edges { node { orders(first: 50) { edges { node { id } } } } } } }
+    """
+
+    @override_settings(CRM_QUERY_MAX_COST=100)
+    def test_costly_query_is_rejected_before_execution(self):
+        with self.assertNumQueries(0):
+            result = post_graphql(self.client, self.NESTED)
+        self.assertEqual(error_codes(result), ["QUERY_TOO_COMPLEX"])
+        self.assertNotIn("data", result)
+
+    @override_settings(CRM_QUERY_MAX_DEPTH=3)
+    def test_deep_query_is_rejected(self):
+        self.assertIn("QUERY_TOO_DEEP", error_codes(post_graphql(self.client, self.NESTED)))
+
+    def test_orders_with_customer_and_products_fit_the_default_limits(self):
+        query = """
+        { allOrders(first: 100) { edges { node { customer { name } products { edges { node { name } } } } } } }
+        """
+        self.assertEqual(post_graphql(self.client, query), {"data": {"allOrders": {"edges": []}}})
+
+    @override_settings(CRM_NESTED_PAGE_SIZE=3)
+    def test_nested_pages_default_to_the_costed_size(self):
+        customer = Customer.objects.create(name="Alice", email="alice@example.com")
+        order = Order.objects.create(customer=customer, total_amount=5)
+        for i in range(5):
+            OrderItem.objects.create(order=order, product=Product.objects.create(name=f"P{i}", price=1, stock=1))
+        query = "{ allOrders(first: 1) { edges { node { products { edges { node { name } } pageInfo { hasNextPage } } } } } }"
+        products = post_graphql(self.client, query)["data"]["allOrders"]["edges"][0]["node"]["products"]
+        self.assertEqual([edge["node"]["name"] for edge in products["edges"]], ["P0", "P1", "P2"])
+        self.assertTrue(products["pageInfo"]["hasNextPage"])
+
+    @override_settings(CRM_QUERY_COST_BUDGET=2000, CRM_QUERY_COST_WINDOW=60)
+    def test_client_budget_is_enforced(self):
+        query = "{ allCustomers(first: 50) { edges { node { orders(first: 30) { edges { node { id } } } } } } }"
+        self.assertNotIn("errors", post_graphql(self.client, query))
+        result = post_graphql(self.client, query)
+        self.assertEqual(error_codes(result), ["QUERY_BUDGET_EXCEEDED"])
+        self.assertEqual(result["errors"][0]["extensions"]["retryAfter"], 60)
+
+
+class WebSocketTests(TransactionTestCase):
+    """Operations over graphql-transport-ws, on the real database thread."""
+
+    def setUp(self):
+        cache.clear()
+
+    async def exchange(self, *payloads):
+        from .subscriptions import PROTOCOL, GraphQLWebSocket
+
+        messages = [{"type": "websocket.connect"}, {"type": "connection_init"}]
+        messages += [{"type": "subscribe", "id": str(i), "payload": p} for i, p in enumerate(payloads)]
+        inbox, sent = asyncio.Queue(), []
+        for message in messages:
+            inbox.put_nowait(message if message["type"] == "websocket.connect" else {
+                "type": "websocket.receive", "text": json.dumps(message),
+            })
+
+        async def receive():
+            # Disconnect once every operation has completed or failed.
+            while inbox.empty():
+                if sum(m.get("type") in ("complete", "error") for m in sent) == len(payloads):
+                    return {"type": "websocket.disconnect"}
+                await asyncio.sleep(0.01)
+            return inbox.get_nowait()
+
+        async def send(event):
+            if event["type"] == "websocket.send":
+                sent.append(json.loads(event["text"]))
+
+        scope = {"type": "websocket", "path": "/graphql", "subprotocols": [PROTOCOL], "client": ("10.0.0.1", 1)}
+        await GraphQLWebSocket()(scope, receive, send)
+        return {m["id"]: m for m in sent if m.get("type") in ("next", "error")}
+
+    @override_settings(CRM_QUERY_COST_BUDGET=150, CRM_QUERY_COST_WINDOW=60)
+    async def test_operations_are_charged_to_the_budget(self):
+        query = {"query": "{ allProducts(first: 100) { edges { node { name } } } }"}
+        results = await self.exchange(query, query)
+        self.assertEqual(results["0"]["type"], "next")
+        self.assertEqual(results["1"]["type"], "error")
+        self.assertEqual(results["1"]["payload"][0]["extensions"]["code"], "QUERY_BUDGET_EXCEEDED")
+
+    async def test_atomic_mutations_run_in_a_transaction(self):
+        from . import views
+
+        execute = views.ExecutionPlan.execute
+        plans = []
+
+        def record(plan):
+            plans.append(plan)
+            return execute(plan)
+
+        mutation = {
+            "query": 'mutation { createProduct(input: {name: "Laptop", price: 10, stock: 1}) { product { name } } }',
+        }
+        with mock.patch.object(views.graphene_settings, "ATOMIC_MUTATIONS", True), \
+                mock.patch.object(views.ExecutionPlan, "execute", record):
+            results = await self.exchange(mutation)
+        self.assertEqual(results["0"]["payload"], {"data": {"createProduct": {"product": {"name": "Laptop"}}}})
+        self.assertEqual([(plan.atomic, plan.writer) for plan in plans], [(True, True)])
+        self.assertTrue(await Product.objects.filter(name="Laptop").aexists())
+
+
+class ImportStreamTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = Customer.objects.create(name="Alice", email="alice@example.com")
+        cls.product = Product.objects.create(name="Laptop", price=Decimal("100.00"), stock=10)
+
+    def import_ndjson(self, kind, lines, batch_size=2):
+        response = self.client.post(
+            f"/import/{kind}?batch_size={batch_size}",
+            "\n".join(lines).encode(),
+            content_type="application/x-ndjson",
+        )
+        self.assertEqual(response.status_code, 200)
+        return [json.loads(line) for line in b"".join(response.streaming_content).splitlines()]
+
+    def test_bad_rows_become_line_errors(self):
+        good = json.dumps({"customer_id": self.customer.pk, "product_ids": [self.product.pk]})
+        events = self.import_ndjson("orders", [
+            json.dumps({"customer_id": "abc", "product_ids": [self.product.pk]}),
+            json.dumps({"customer_id": self.customer.pk, "product_ids": "zz"}),
+            "{not json",
+            good,
+            json.dumps({"customer_id": self.customer.pk, "product_ids": [999999]}),
+        ])
+        errors = [event for event in events if "error" in event]
+        self.assertEqual(errors, [
+            {"line": 1, "error": "Invalid customer ID"},
+            {"line": 2, "error": "Invalid product ID"},
+            {"line": 3, "error": "Invalid JSON object"},
+            {"line": 5, "error": "One or more product IDs are invalid"},
+        ])
+        self.assertEqual([event["batch"] for event in events if "batch" in event], [1, 2, 3])
+        self.assertEqual(events[-1], {"done": True, "processed": 5, "created": 1, "errors": 4})
+        self.assertEqual(Order.objects.count(), 1)
+
+    def test_orders_reserve_stock(self):
+        order = json.dumps({"customer_id": self.customer.pk, "product_ids": [self.product.pk], "quantities": [4]})
+        events = self.import_ndjson("orders", [order] * 3)
+        self.assertEqual([event for event in events if "error" in event], [{"line": 3, "error": "Insufficient stock"}])
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, 2)
+
+    def test_stock_conflict_fails_the_batch_lines(self):
+        from . import bulk
+
+        order = json.dumps({"customer_id": self.customer.pk, "product_ids": [self.product.pk]})
+        with mock.patch.object(bulk, "_reserve_stock", side_effect=bulk.StockConflict("Stock changed")):
+            events = self.import_ndjson("orders", [order, "{not json", order])
+        self.assertEqual([event for event in events if "error" in event], [
+            {"line": 1, "error": "Stock changed"},
+            {"line": 2, "error": "Invalid JSON object"},
+            {"line": 3, "error": "Stock changed"},
+        ])
+        self.assertEqual(events[-1], {"done": True, "processed": 3, "created": 0, "errors": 3})
+        self.assertFalse(Order.objects.exists())
+
+    def test_unstorable_values_become_line_errors(self):
+        events = self.import_ndjson("products", [
+            json.dumps({"name": "A", "price": "NaN", "stock": 1}),
+            json.dumps({"name": "B", "price": "Infinity", "stock": 1}),
+            json.dumps({"name": "C", "price": "1e20", "stock": 1}),
+            json.dumps({"name": "D", "price": "5", "stock": 10 ** 30}),
+            json.dumps({"name": ["E"], "price": "5"}),
+            json.dumps({"name": "F", "price": "9.99", "stock": 2}),
+        ], batch_size=4)
+        self.assertEqual([event for event in events if "error" in event], [
+            {"line": 1, "error": "Invalid price"},
+            {"line": 2, "error": "Invalid price"},
+            {"line": 3, "error": "Invalid price"},
+            {"line": 4, "error": "Invalid stock"},
+            {"line": 5, "error": "Invalid name"},
+        ])
+        self.assertEqual(events[-1], {"done": True, "processed": 6, "created": 1, "errors": 5})
+
+        phone = json.dumps({"name": "Bob", "email": "bob@example.com", "phone": 5551234567})
+        events = self.import_ndjson("customers", [phone])
+        self.assertEqual(events[0], {"line": 1, "error": "Invalid phone format"})
+
+    def test_customers_are_committed_per_batch(self):
+        events = self.import_ndjson("customers", [
+            json.dumps({"name": "Bob", "email": "bob@example.com"}),
+            json.dumps({"name": "Bob again", "email": "bob@example.com"}),
+            json.dumps({"name": "Carol", "email": "carol@example.com", "phone": "bad"}),
+        ])
+        self.assertEqual(
+            [event for event in events if "error" in event],
+            [{"line": 2, "error": "Email already exists"}, {"line": 3, "error": "Invalid phone format"}],
+        )
+        self.assertTrue(Customer.objects.filter(email="bob@example.com").exists())
+
+
+class ExportTests(TestCase):
+    def test_failed_export_leaves_no_partial_file(self):
+        from .export import CSVGzipWriter, EXPORT_TABLES, export_table
+
+        Product.objects.create(name="Laptop", price=1, stock=1)
+        model, columns = EXPORT_TABLES["products"]
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "products.csv.gz")
+            with mock.patch.object(CSVGzipWriter, "write", side_effect=OSError("disk full")):
+                with self.assertRaises(OSError):
+                    export_table(model, columns, path, CSVGzipWriter)
+            self.assertEqual(os.listdir(directory), [])
+            self.assertEqual(export_table(model, columns, path, CSVGzipWriter), 1)
+            self.assertEqual(os.listdir(directory), ["products.csv.gz"])
+
+    def test_order_items_carry_their_unit_price(self):
+        from .export import export_tables
+
+        customer = Customer.objects.create(name="Alice", email="alice@example.com")
+        product = Product.objects.create(name="Laptop", price=999, stock=1)
+        order = Order.objects.create(customer=customer, total_amount=999)
+        OrderItem.objects.create(order=order, product=product, quantity=1, unit_price=Decimal("899.50"))
+        with tempfile.TemporaryDirectory() as directory:
+            export_tables(directory, ["order_items"], fmt="csv")
+            with gzip.open(os.path.join(directory, "order_items.csv.gz"), "rt") as file:
+                rows = list(csv.reader(file))
+        self.assertEqual(rows[0], ["id", "order_id", "product_id", "quantity", "unit_price"])
+        self.assertEqual(rows[1][-1], "899.50")
+
+
+class OrderItemMigrationTests(TransactionTestCase):
+    """0002 keeps the rows of the old ManyToMany table as items of quantity 1."""
+
+    before = [("crm", "0001_initial")]
+
+    def setUp(self):
+        executor = MigrationExecutor(connection)
+        self.after = [key for key in executor.loader.graph.leaf_nodes() if key[0] == "crm"]
+        executor.migrate(self.before)
+        self.old_apps = executor.loader.project_state(self.before).apps
+
+    def tearDown(self):
+        MigrationExecutor(connection).migrate(self.after)
+
+    def test_existing_order_products_become_items(self):
+        OldCustomer = self.old_apps.get_model("crm", "Customer")
+        OldProduct = self.old_apps.get_model("crm", "Product")
+        OldOrder = self.old_apps.get_model("crm", "Order")
+        customer = OldCustomer.objects.create(name="Alice", email="alice@example.com")
+        laptop = OldProduct.objects.create(name="Laptop", price=Decimal("100.00"), stock=1)
+        mouse = OldProduct.objects.create(name="Mouse", price=Decimal("20.00"), stock=1)
+        order = OldOrder.objects.create(customer=customer, total_amount=Decimal("120.00"))
+        order.products.add(laptop, mouse)
+
+        executor = MigrationExecutor(connection)
+        executor.migrate(self.after)
+        apps = executor.loader.project_state(self.after).apps
+        items = apps.get_model("crm", "OrderItem").objects.filter(order_id=order.pk)
+        self.assertEqual(
+            sorted(items.values_list("product_id", "quantity", "unit_price")),
+            [(laptop.pk, 1, Decimal("100.00")), (mouse.pk, 1, Decimal("20.00"))],
+        )
@@ -0,0 +1,60 @@
+from types import SimpleNamespace
+
+from django.db import transaction
+from gql import Client
+from gql.transport.transport import Transport
+from graphql import ExecutionResult, OperationType, execute, get_operation_ast, validate
+
+from graphene_django.settings import graphene_settings
+from graphene_django.views import instantiate_middleware
+
+
+class LocalSchemaTransport(Transport):
+    """
+    ``gql`` transport that runs operations on the in-process schema.
+
+    Scheduled jobs keep their operation strings but skip the HTTP round
+    trip, the serialization and the schema introspection. Each request gets
+    a fresh context, so the dataloaders are scoped to it as in the view, and
+    mutations run in a transaction like ``ATOMIC_MUTATIONS`` requests.
+    """
+
+    def __init__(self, schema=None):
+        self._schema = schema
+
+    @property
+    def schema(self):
+        if self._schema is None:
+            from alx_backend_graphql_crm.schema import schema
+
+            self._schema = schema
+        return self._schema
+
+    def execute(self, request, *args, **kwargs):
+        graphql_schema = self.schema.graphql_schema
+        errors = validate(
+            graphql_schema, request.document, max_errors=graphene_settings.MAX_VALIDATION_ERRORS
+        )
+        if errors:
+            return ExecutionResult(data=None, errors=errors)
+
+        operation = get_operation_ast(request.document, request.operation_name)
+        kwargs = dict(
+            document=request.document,
+            variable_values=request.variable_values,
+            operation_name=request.operation_name,
+            context_value=SimpleNamespace(),
+            middleware=list(instantiate_middleware(graphene_settings.MIDDLEWARE or ())),
+        )
+        if operation is not None and operation.operation == OperationType.MUTATION:
+            with transaction.atomic():
+                result = execute(graphql_schema, **kwargs)
+                if result.errors:
+                    transaction.set_rollback(True)
+                return result
+        return execute(graphql_schema, **kwargs)
+
+
+def local_client(schema=None):
+    """Return a ``gql`` client bound to :class:`LocalSchemaTransport`."""
+    return Client(transport=LocalSchemaTransport(schema))
@@ -0,0 +1,86 @@
+from itertools import islice
+
+from django.db.models import Count
+
+from .models import Customer, NameTrigram, Product
+
+# Objects indexed per batch, bounding the trigram rows held in memory.
+INDEX_CHUNK_SIZE = 500
+
+# Columns behind the ``*_icontains`` filters, per model.
+TRIGRAM_FIELDS = {
+    Customer: ("name", "email"),
+    Product: ("name",),
+}
+
+
+def source_for(model, field):
+    return f"{model._meta.label_lower}.{field}"
+
+
+def trigrams(value):
+    """Return the set of lowercase three-character substrings of ``value``."""
+    value = (value or "").lower()
+    return {value[i:i + 3] for i in range(len(value) - 2)}
+
+
+# ----------------------------
+# Maintenance
+# ----------------------------
+def index_objects(model, objects, replace=True):
+    """
+    Write the trigram rows of ``objects`` after they were written, in
+    batches of :data:`INDEX_CHUNK_SIZE` objects. With ``replace`` their
+    existing rows are deleted first.
+    """
+    if model not in TRIGRAM_FIELDS:
+        return
+    objects = (obj for obj in objects if obj.pk is not None)
+    while batch := list(islice(objects, INDEX_CHUNK_SIZE)):
+        if replace:
+            unindex_objects(model, [obj.pk for obj in batch])
+        NameTrigram.objects.bulk_create(
+            NameTrigram(source=source_for(model, field), trigram=trigram, object_id=obj.pk)
+            for field in TRIGRAM_FIELDS[model]
+            for obj in batch
+            for trigram in trigrams(getattr(obj, field))
+        )
+
+
+def unindex_objects(model, pks):
+    if model in TRIGRAM_FIELDS and pks:
+        NameTrigram.objects.filter(
+            source__in=[source_for(model, field) for field in TRIGRAM_FIELDS[model]],
+            object_id__in=pks,
+        ).delete()
+
+
+def rebuild_index():
+    """Recreate every trigram row from the current table contents."""
+    NameTrigram.objects.all().delete()
+    for model in TRIGRAM_FIELDS:
+        objects = model._default_manager.only("pk", *TRIGRAM_FIELDS[model]).iterator(chunk_size=INDEX_CHUNK_SIZE)
+        index_objects(model, objects, replace=False)
+
+
+# ----------------------------
+# Lookups
+# ----------------------------
+def matching_ids(model, field, value):
+    """
+    Return a subquery of pks whose ``field`` may contain ``value``.
+
+    Rows are candidates when they carry every trigram of the search value,
+    which the ``(source, trigram, object_id)`` index answers without touching
+    the table. Returns ``None`` for values shorter than three characters.
+    """
+    wanted = trigrams(value)
+    if not wanted:
+        return None
+    return (
+        NameTrigram.objects.filter(source=source_for(model, field), trigram__in=wanted)
+        .values("object_id")
+        .annotate(matched=Count("trigram", distinct=True))
+        .filter(matched=len(wanted))
+        .values("object_id")
+    )
@@ -0,0 +1,19 @@
+import re
+
+PHONE_PATTERN = re.compile(r"^(\+\d{10,15}|\d{3}-\d{3}-\d{4})$")
+
+
+def validate_phone(phone):
+    """Accept an empty phone, ``+`` followed by 10-15 digits, or ``123-456-7890``."""
+    if not phone:
+        return True
+    return PHONE_PATTERN.match(phone)
+
+
+def validate_product(price, stock):
+    """Return the first product rule violated by ``price``/``stock``, if any."""
+    if price is None or price <= 0:
+        return "Price must be positive"
+    if stock is not None and stock < 0:
+        return "Stock cannot be negative"
+    return None
@@ -1,3 +1,329 @@
-from django.shortcuts import render
+import asyncio
+import json
+from contextlib import nullcontext
+from copy import copy
+from dataclasses import dataclass
+from inspect import isawaitable
 
-# Create your views here.
+from asgiref.sync import sync_to_async
+from django.db import connection, transaction
+from django.http import (
+    HttpResponse,
+    HttpResponseBadRequest,
+    HttpResponseNotAllowed,
+    JsonResponse,
+    StreamingHttpResponse,
+)
+from django.utils.functional import classproperty
+from django.views.decorators.http import require_POST
+from graphene_django.constants import MUTATION_ERRORS_FLAG
+from graphene_django.settings import graphene_settings
+from graphene_django.views import GraphQLView, HttpError
+from graphql import ExecutionResult, OperationType, execute, get_operation_ast, validate, validate_schema
+
+from .async_graphql import ASYNC_FLAG, SyncResolverMiddleware, execute_wrapper
+from .bulk import get_chunk_size
+from .cache import get_cache, response_cache_key
+from .complexity import QueryCostError, charge_budget, cost_rule
+from .database import use_writer
+from .importers import IMPORTERS, import_rows, read_csv, read_ndjson
+from .instrumentation import OperationTrace, metrics, wants_extensions
+from .persisted_queries import PersistedQueryError, get_document, resolve_query
+
+
+def atomic_mutations():
+    """graphene-django's ``ATOMIC_MUTATIONS``, set globally or on the database."""
+    return (
+        graphene_settings.ATOMIC_MUTATIONS is True
+        or connection.settings_dict.get("ATOMIC_MUTATIONS", False) is True
+    )
+
+
+def client_id(user, address):
+    """Cost budget key of a client: its user when signed in, else its address."""
+    if user is not None and user.is_authenticated:
+        return f"user:{user.pk}"
+    return f"ip:{address}"
+
+
+@dataclass
+class ExecutionPlan:
+    """A validated operation ready to execute, and how to run and cache it."""
+    schema: object
+    document: object
+    options: dict
+    atomic: bool = False
+    writer: bool = False
+    cache_key: tuple = None
+
+    def execute(self):
+        """
+        Execute synchronously, in a transaction when the plan is atomic,
+        rolled back when a mutation reports errors. Mutations read from the
+        writer database.
+        """
+        with use_writer() if self.writer else nullcontext():
+            if not self.atomic:
+                return execute(self.schema, self.document, **self.options)
+            with transaction.atomic():
+                result = execute(self.schema, self.document, **self.options)
+                if getattr(self.options.get("context_value"), MUTATION_ERRORS_FLAG, False) is True:
+                    transaction.set_rollback(True)
+            return result
+
+
+class CRMGraphQLView(GraphQLView):
+    """
+    GraphQL endpoint with persisted queries and a parsed-document cache.
+
+    Clients may send ``extensions.persistedQuery`` (automatic persisted
+    queries) instead of the query text, and every operation is parsed and
+    validated once per process, then served from an LRU of documents.
+    Read-only connection queries are answered from the response cache.
+    Operations over the depth/cost limits, or over the client's cost
+    budget, are rejected before they execute.
+
+    Every operation is traced (resolver timings and SQL statements) into
+    the process metrics; with an ``X-CRM-Debug: 1`` header the trace is
+    also returned under ``extensions.timing``.
+    """
+
+    def get_client_id(self, request):
+        return client_id(getattr(request, "user", None), request.META.get("REMOTE_ADDR", ""))
+
+    def get_response(self, request, data, show_graphiql=False):
+        operation_name = data.get("operationName") or request.GET.get("operationName")
+        request.crm_trace = trace = OperationTrace(operation_name)
+        try:
+            with connection.execute_wrapper(trace):
+                return super().get_response(request, data, show_graphiql)
+        finally:
+            metrics.observe(trace)
+
+    def json_encode(self, request, d, pretty=False):
+        trace = getattr(request, "crm_trace", None)
+        if trace is not None and wants_extensions(request):
+            d = {**d, "extensions": trace.as_extensions()}
+        return super().json_encode(request, d, pretty)
+
+    def get_extensions(self, request, data):
+        extensions = data.get("extensions") or request.GET.get("extensions")
+        if isinstance(extensions, str):
+            try:
+                extensions = json.loads(extensions)
+            except ValueError:
+                raise HttpError(HttpResponseBadRequest("Extensions are invalid JSON."))
+        return extensions
+
+    def plan_execution(self, request, data, query, variables, operation_name, show_graphiql=False):
+        """
+        Everything before execution: persisted query lookup, validation, the
+        cost checks and the response cache. Returns an :class:`ExecutionPlan`,
+        or the ``ExecutionResult`` (or ``None``) that answers the request
+        without executing.
+
+        Only valid documents are planned here, from the parsed-document
+        cache; a missing query, syntax or validation errors and mutations
+        over GET are answered by graphene-django's own request handling.
+        """
+        try:
+            query = resolve_query(query, self.get_extensions(request, data))
+        except PersistedQueryError as e:
+            return ExecutionResult(data=None, errors=[e])
+
+        schema = self.schema.graphql_schema
+        rules = tuple(self.validation_rules) if self.validation_rules else None
+        document, validation_errors = get_document(schema, query, rules) if query else (None, None)
+        operation_ast = get_operation_ast(document, operation_name) if document else None
+        if (
+            document is None
+            or validation_errors
+            or validate_schema(schema)
+            or (
+                request.method.lower() == "get"
+                and operation_ast is not None
+                and operation_ast.operation != OperationType.QUERY
+            )
+        ):
+            return super().execute_graphql_request(
+                request, data, query, variables, operation_name, show_graphiql
+            )
+
+        # Costs depend on the variables, so they are checked per request.
+        report = {}
+        cost_errors = validate(schema, document, [cost_rule(variables, operation_name, report)])
+        if cost_errors:
+            return ExecutionResult(data=None, errors=cost_errors)
+        try:
+            charge_budget(self.get_client_id(request), report.get("cost", 0))
+        except QueryCostError as e:
+            return ExecutionResult(data=None, errors=[e])
+
+        try:
+            execute_options = {
+                "root_value": self.get_root_value(request),
+                "context_value": self.get_context(request),
+                "variable_values": variables,
+                "operation_name": operation_name,
+                "middleware": self.get_middleware(request),
+            }
+            if self.execution_context_class:
+                execute_options["execution_context_class"] = self.execution_context_class
+
+            if operation_ast is not None and operation_ast.operation == OperationType.MUTATION:
+                return ExecutionPlan(schema, document, execute_options, atomic=atomic_mutations(), writer=True)
+
+            cache_key = response_cache_key(schema, query, variables, operation_name)
+            if cache_key is not None:
+                data = get_cache().get(cache_key[0])
+                if data is not None:
+                    return ExecutionResult(data=data)
+            return ExecutionPlan(schema, document, execute_options, cache_key=cache_key)
+        except Exception as e:
+            return ExecutionResult(errors=[e])
+
+    def execute_plan(self, request, plan):
+        """
+        Execute ``plan`` synchronously, in a transaction when it is atomic
+        (graphene-django's ``ATOMIC_MUTATIONS``). See :meth:`ExecutionPlan.execute`.
+        """
+        return plan.execute()
+
+    def store_result(self, plan, result):
+        if plan.cache_key is not None and not result.errors:
+            key, ttl = plan.cache_key
+            get_cache().set(key, result.data, ttl)
+
+    def execute_graphql_request(
+        self, request, data, query, variables, operation_name, show_graphiql=False
+    ):
+        plan = self.plan_execution(request, data, query, variables, operation_name, show_graphiql)
+        if not isinstance(plan, ExecutionPlan):
+            return plan
+        try:
+            result = self.execute_plan(request, plan)
+            self.store_result(plan, result)
+            return result
+        except Exception as e:
+            return ExecutionResult(errors=[e])
+
+
+class AsyncCRMGraphQLView(CRMGraphQLView):
+    """
+    :class:`CRMGraphQLView` for ASGI, executing with graphql-core's async
+    execution so a worker is not held while queries wait on the database.
+
+    Sibling fields resolve concurrently. The root connections, ``totalCount``
+    and the mutations use the async ORM; other resolvers run through
+    ``sync_to_async`` (see :class:`~crm.async_graphql.SyncResolverMiddleware`).
+    Planning (validation, costs, caches) runs off the event loop, and atomic
+    mutations execute synchronously inside their transaction.
+    """
+
+    @classproperty
+    def view_is_async(cls):
+        return True
+
+    async def dispatch(self, request, *args, **kwargs):
+        try:
+            if request.method.lower() not in ("get", "post"):
+                raise HttpError(
+                    HttpResponseNotAllowed(
+                        ["GET", "POST"], "GraphQL only supports GET and POST requests."
+                    )
+                )
+            data = self.parse_body(request)
+            if self.graphiql and self.can_display_graphiql(request, data):
+                return await sync_to_async(super().dispatch)(request, *args, **kwargs)
+
+            if self.batch:
+                responses = await asyncio.gather(*(self.aget_response(request, entry) for entry in data))
+                result = "[{}]".format(",".join(response[0] for response in responses))
+                status_code = max((response[1] for response in responses), default=200)
+            else:
+                result, status_code = await self.aget_response(request, data)
+            return HttpResponse(status=status_code, content=result, content_type="application/json")
+        except HttpError as e:
+            response = e.response
+            response["Content-Type"] = "application/json"
+            response.content = self.json_encode(request, {"errors": [self.format_error(e)]})
+            return response
+
+    async def aget_response(self, request, data):
+        # Batch entries run concurrently, so each gets its own copy of the
+        # request to carry its trace and execution flags.
+        request = copy(request)
+        query, variables, operation_name, id = self.get_graphql_params(request, data)
+        request.crm_trace = trace = OperationTrace(operation_name)
+        try:
+            async with execute_wrapper(trace):
+                execution_result = await self.aexecute_graphql_request(
+                    request, data, query, variables, operation_name
+                )
+        finally:
+            metrics.observe(trace)
+
+        status_code = 200
+        response = {}
+        if execution_result.errors:
+            response["errors"] = [self.format_error(e) for e in execution_result.errors]
+        if execution_result.errors and any(not getattr(e, "path", None) for e in execution_result.errors):
+            status_code = 400
+        else:
+            response["data"] = execution_result.data
+        if self.batch:
+            response["id"] = id
+            response["status"] = status_code
+        return self.json_encode(request, response), status_code
+
+    async def aexecute_graphql_request(self, request, data, query, variables, operation_name):
+        plan = await sync_to_async(self.plan_execution)(request, data, query, variables, operation_name)
+        if not isinstance(plan, ExecutionPlan):
+            return plan
+        try:
+            if plan.atomic:
+                return await sync_to_async(self.execute_plan)(request, plan)
+            setattr(request, ASYNC_FLAG, True)
+            with use_writer() if plan.writer else nullcontext():
+                result = execute(
+                    plan.schema,
+                    plan.document,
+                    **{**plan.options, "middleware": [*plan.options["middleware"], SyncResolverMiddleware()]},
+                )
+                if isawaitable(result):
+                    result = await result
+            await sync_to_async(self.store_result)(plan, result)
+            return result
+        except Exception as e:
+            return ExecutionResult(errors=[e])
+
+
+@require_POST
+def bulk_import(request, kind):
+    """
+    Stream a CSV or NDJSON body of customers, products or orders into the DB.
+
+    The body is read line by line and committed in batches of ``batch_size``
+    rows (default ``CRM_BULK_CHUNK_SIZE``). The response is NDJSON: one
+    object per rejected line, one progress object per committed batch and a
+    final ``{"done": true, ...}`` summary.
+    """
+    if kind not in IMPORTERS:
+        return JsonResponse({"error": f"Unknown import type '{kind}'"}, status=404)
+    try:
+        batch_size = get_chunk_size(int(request.GET.get("batch_size", 0)))
+    except ValueError:
+        return JsonResponse({"error": "batch_size must be a positive integer"}, status=400)
+
+    content_type = request.content_type or ""
+    fmt = request.GET.get("format") or ("csv" if "csv" in content_type else "ndjson")
+    if fmt not in ("csv", "ndjson"):
+        return JsonResponse({"error": "format must be 'csv' or 'ndjson'"}, status=400)
+
+    lines = (line.decode("utf-8-sig") for line in request)
+    rows = read_csv(lines) if fmt == "csv" else read_ndjson(lines)
+    events = import_rows(kind, rows, batch_size)
+    return StreamingHttpResponse(
+        (json.dumps(event) + "\n" for event in events),
+        content_type="application/x-ndjson",
+    )